@@ -0,0 +1,54 @@
+import pandas as pd
+
+# Percentis de PL calculados por tipo de fundo
+PERCENTIS = {"p10": 0.10, "p25": 0.25, "p75": 0.75, "p90": 0.90}
+
+
+# Estatísticas de Patrimônio Líquido do mercado por Tipo_Fundo, em uma passada por agregação.
+# Resultado indexado por Tipo_Fundo com colunas: fundos, media, mediana, p10, p25, p75, p90.
+def market_pl_stats(registro_fundo):
+    grupos = registro_fundo.groupby("Tipo_Fundo", observed=True)["Patrimonio_Liquido"]
+    estatisticas = grupos.agg(fundos="count", media="mean", mediana="median")
+
+    percentis = grupos.quantile(list(PERCENTIS.values())).unstack()
+    percentis.columns = list(PERCENTIS)
+    return estatisticas.join(percentis)
+
+
+# Lê uma estatística do tipo de fundo; NaN quando o tipo não existe no mercado
+def market_stat(estatisticas, tipo_fundo, coluna="media"):
+    if tipo_fundo in estatisticas.index:
+        return estatisticas.at[tipo_fundo, coluna]
+    return float('nan')
+
+
+# Emissões concedidas por semana (segunda a sexta) e tipo de valor mobiliário.
+# Resultado com colunas: Semana (segunda-feira), Valor_Mobiliario, Emissoes, Volume.
+def weekly_issuance(ofertas):
+    concedidas = ofertas[ofertas["Status_Requerimento"] == "Registro Concedido"]
+    datas = concedidas["Data_Registro"]
+    uteis = datas.dt.dayofweek < 5
+    semana = (datas - pd.to_timedelta(datas.dt.dayofweek, unit="D")).dt.normalize()
+
+    semanal = concedidas[uteis].groupby(
+        [semana[uteis].rename("Semana"), "Valor_Mobiliario"], observed=True
+    )["Valor_Total_Registrado"].agg(Emissoes="size", Volume="sum")
+    return semanal.reset_index()
+
+
+# Semanas com emissões, da mais recente para a mais antiga
+def issuance_weeks(semanal):
+    return sorted(pd.DatetimeIndex(semanal["Semana"].unique()), reverse=True)
+
+
+# Emissões de uma semana por categoria e variação do volume contra a semana anterior
+# (NaN quando a categoria não teve emissões na semana anterior)
+def week_over_week(semanal, semana):
+    semana = pd.Timestamp(semana)
+    por_categoria = semanal.set_index("Valor_Mobiliario")
+    atual = por_categoria.loc[por_categoria["Semana"] == semana, ["Emissoes", "Volume"]]
+    anterior = por_categoria.loc[por_categoria["Semana"] == semana - pd.Timedelta(days=7), "Volume"]
+
+    comparacao = atual.copy()
+    comparacao["Variacao"] = (atual["Volume"] / anterior.reindex(atual.index) - 1) * 100
+    return comparacao.sort_values("Emissoes", ascending=False)
@@ -0,0 +1,314 @@
+# Consultas aos agregados do dashboard sem Streamlit: linha de comando e servidor HTTP/JSON.
+# O processo carrega tabelas, índice e agregados uma vez por versão dos snapshots e atende
+# consultas e lotes de várias gestoras a partir desse estado, sem os reruns do Streamlit.
+# Uso: python api.py gestoras [--busca texto]
+#      python api.py consulta "GESTORA A" "GESTORA B" [--itens setores prazos ...]
+#      python api.py emissoes [--semana 2025-03-10]
+#      python api.py servir [--host 127.0.0.1] [--porta 8502]
+import argparse
+import functools
+import json
+import math
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+import aggregates
+import metrics
+import queries
+import search
+import storage
+
+# Itens que uma consulta por gestora pode pedir: grupos de metrics.METRICAS (totais da
+# gestora) e listagens por fundo/oferta
+ITENS_METRICAS = list(metrics.METRICAS)
+ITENS_LISTAS = ["inadimplencia", "fundos", "ofertas", "consolidado", "cotas"]
+ITENS = ITENS_METRICAS + ITENS_LISTAS
+
+# Gestoras por lote (POST /consulta) e resultados memorizados por (gestora, itens, versão)
+MAX_LOTE = 200
+MAX_RESULTADOS = 1024
+
+# Estado da versão atual; uma versão nova substitui o dict inteiro, então quem já tem o estado
+# de uma requisição continua com tabelas e resultados memorizados da mesma versão
+_estado = {"atual": {"versao": None}}
+_estado_lock = threading.Lock()
+
+
+def _version():
+    return (queries.data_version(), queries.facts_version(), queries.quotas_version())
+
+
+# Estado da versão atual dos snapshots, carregado na primeira consulta e recarregado quando
+# o ingest grava uma versão nova (o manifesto só é relido se mudou no disco)
+def warm():
+    versao = _version()
+    if _estado["atual"]["versao"] == versao:
+        return _estado["atual"]
+    with _estado_lock:
+        if _estado["atual"]["versao"] != versao:
+            tabelas = queries.load_tables()
+            indice = queries.build_index(tabelas)
+            fatos = queries.fact_table()
+            novo = {
+                "tabelas": tabelas,
+                "indice": indice,
+                "estatisticas": queries.market_stats(lambda: tabelas),
+                "semanal": queries.weekly_issuance(lambda: tabelas),
+                "fatos": fatos,
+                "rankings": queries.fidc_rankings(lambda: fatos),
+                "cotas": queries.quota_engine(),
+                # Qualquer grafia (com ou sem acento, "LTDA"...) leva à gestora canônica
+                "chaves": {search.alias_key(nome): nome for nome in indice["aliases"]},
+                # Lidas depois da carga: snapshots que faltavam foram gravados por ela, e a
+                # próxima consulta precisa ver a mesma versão para não recarregar tudo
+                "versao": _version(),
+                "manifesto": storage.manifest_version(),
+            }
+            # Resultados por (gestora, itens), memorizados junto com o estado da versão
+            novo["resultados"] = functools.lru_cache(maxsize=MAX_RESULTADOS)(
+                functools.partial(build_gestora_items, novo))
+            novo["json"] = functools.lru_cache(maxsize=MAX_RESULTADOS)(
+                lambda gestora, itens: _dumps(novo["resultados"](gestora, itens)))
+            _estado["atual"] = novo
+    return _estado["atual"]
+
+
+# Nome canônico da gestora ou None se não existir
+def resolve_gestora(estado, nome):
+    if nome in estado["indice"]["aliases"]:
+        return nome
+    return estado["chaves"].get(search.alias_key(nome))
+
+
+def _json_value(valor):
+    if isinstance(valor, (np.generic, pd.Timestamp)):
+        valor = valor.isoformat() if isinstance(valor, pd.Timestamp) else valor.item()
+    if isinstance(valor, float) and not math.isfinite(valor):
+        return None
+    if valor is pd.NaT or valor is pd.NA:
+        return None
+    return valor
+
+
+def _series(serie):
+    return {str(chave): _json_value(valor) for chave, valor in serie.items()}
+
+
+def _records(df):
+    colunas = list(df.columns)
+    return [dict(zip(colunas, map(_json_value, linha))) for linha in df.itertuples(index=False, name=None)]
+
+
+# Resultado (já em tipos do JSON) dos itens pedidos para uma gestora canônica. As consultas
+# usam a versão memorizada em estado["resultados"] (e o JSON em bytes em estado["json"]);
+# não altere o dict devolvido por elas
+def build_gestora_items(estado, gestora, itens=tuple(ITENS)):
+    selecao = queries.select_gestora(estado["tabelas"], estado["indice"], gestora)
+    resultado = {
+        "gestora": gestora,
+        "grafias": estado["indice"]["aliases"][gestora],
+        "fidcs": int(len(selecao["fidc_tab_ii"])),
+    }
+    grupos = [item for item in itens if item in ITENS_METRICAS]
+    if grupos:
+        for grupo, serie in queries.fidc_metrics(selecao, grupos).items():
+            resultado[grupo] = _series(serie)
+    if "inadimplencia" in itens:
+        resultado["inadimplencia"] = _records(queries.delinquency_by_fidc(selecao))
+    if "fundos" in itens:
+        resultado["fundos"] = _records(queries.fund_summary(selecao, estado["estatisticas"]))
+    if "ofertas" in itens:
+        resultado["ofertas"] = _records(queries.offer_summary(selecao))
+    if "consolidado" in itens:
+        resultado["consolidado"] = _records(queries.fund_view(selecao, estado["fatos"], estado["rankings"]))
+    if "cotas" in itens:
+        estrutura = queries.quota_view(selecao, estado["cotas"], estado["fatos"])
+        resultado["cotas"] = {"classes": _series(estrutura["classes"]), "fundos": _records(estrutura["fundos"])}
+    return resultado
+
+
+def _check_items(itens):
+    if itens is not None and (not isinstance(itens, (list, tuple)) or not all(isinstance(item, str) for item in itens)):
+        raise ValueError("Os itens devem ser uma lista de nomes")
+    itens = ITENS if not itens else list(itens)
+    desconhecidos = [item for item in itens if item not in ITENS]
+    if desconhecidos:
+        raise ValueError(f"Itens desconhecidos: {', '.join(desconhecidos)} (disponíveis: {', '.join(ITENS)})")
+    # Ordem fixa: o mesmo pedido em outra ordem reaproveita o resultado memorizado
+    return tuple(item for item in ITENS if item in itens)
+
+
+# Gestoras pedidas (qualquer grafia, sem repetição) -> nome canônico; as inexistentes à parte
+def _resolve_batch(estado, nomes):
+    if len(nomes) > MAX_LOTE:
+        raise ValueError(f"Lote com {len(nomes)} gestoras; o limite é {MAX_LOTE}")
+    canonicas, nao_encontradas = {}, []
+    for nome in dict.fromkeys(nomes):
+        gestora = resolve_gestora(estado, nome)
+        if gestora is None:
+            nao_encontradas.append(nome)
+        else:
+            canonicas[nome] = gestora
+    return canonicas, nao_encontradas
+
+
+# Consulta em lote: cada gestora é calculada uma vez, com o estado carregado uma vez para o
+# lote inteiro. Resultado: {"versao", "resultados": {nome pedido: resultado}, "nao_encontradas"}
+def query_gestoras(nomes, itens=None):
+    itens = _check_items(itens)
+    estado = warm()
+    canonicas, nao_encontradas = _resolve_batch(estado, nomes)
+    resultados = {nome: estado["resultados"](gestora, itens) for nome, gestora in canonicas.items()}
+    return {"versao": estado["manifesto"], "resultados": resultados, "nao_encontradas": nao_encontradas}
+
+
+# O mesmo resultado de query_gestoras já em JSON (bytes), montado a partir do JSON memorizado
+# de cada gestora: as gestoras grandes não são serializadas de novo a cada requisição
+def query_gestoras_json(nomes, itens=None):
+    itens = _check_items(itens)
+    estado = warm()
+    canonicas, nao_encontradas = _resolve_batch(estado, nomes)
+    resultados = b",".join(
+        _dumps(nome) + b":" + estado["json"](gestora, itens) for nome, gestora in canonicas.items()
+    )
+    return (b'{"versao":' + _dumps(estado["manifesto"]) + b',"resultados":{' + resultados
+            + b'},"nao_encontradas":' + _dumps(nao_encontradas) + b"}")
+
+
+def query_gestora(nome, itens=None):
+    lote = query_gestoras([nome], itens)
+    if not lote["resultados"]:
+        raise KeyError(nome)
+    return lote["resultados"][nome]
+
+
+# Gestoras canônicas; com `busca`, as mais parecidas primeiro (search.search)
+def list_gestoras(busca=None, limite=search.LIMITE_RESULTADOS):
+    indice = warm()["indice"]
+    if busca:
+        return search.search(indice["busca"], busca, limite)
+    return indice["gestoras"]
+
+
+# Semanas com emissões ou, com `semana`, as emissões da semana por categoria e a variação
+# do volume contra a semana anterior (aggregates.week_over_week). Qualquer dia vale pela
+# semana que o contém (as semanas começam na segunda-feira)
+def query_issuance(semana=None):
+    semanal = warm()["semanal"]
+    if semana is None:
+        return {"semanas": [_json_value(data) for data in aggregates.issuance_weeks(semanal)]}
+    semana = pd.Timestamp(semana)
+    if semana is pd.NaT:
+        raise ValueError("Informe a semana como uma data (AAAA-MM-DD)")
+    semana = semana.normalize() - pd.Timedelta(days=semana.dayofweek)
+    comparacao = aggregates.week_over_week(semanal, semana).reset_index()
+    return {"semana": _json_value(semana), "categorias": _records(comparacao)}
+
+
+def _dumps(dados):
+    return json.dumps(dados, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _query_list(parametros, nome):
+    return [item for valor in parametros.get(nome, []) for item in valor.split(",") if item]
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    def _send(self, status, dados):
+        corpo = dados if isinstance(dados, bytes) else _dumps(dados)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def _handle(self, rota, parametros, corpo=None):
+        if rota == "/saude":
+            estado = warm()
+            return {"versao": estado["manifesto"], "gestoras": len(estado["indice"]["gestoras"])}
+        if rota == "/gestoras":
+            limite = int(parametros.get("limite", [search.LIMITE_RESULTADOS])[0])
+            return {"gestoras": list_gestoras(parametros.get("busca", [None])[0], limite)}
+        if rota == "/gestora":
+            if "nome" not in parametros:
+                raise ValueError("Informe a gestora em ?nome=")
+            return query_gestoras_json(parametros["nome"][:1], _query_list(parametros, "itens"))
+        if rota == "/consulta" and corpo is not None:
+            pedido = json.loads(corpo or b"{}")
+            gestoras = pedido.get("gestoras") if isinstance(pedido, dict) else None
+            if not isinstance(gestoras, list) or not all(isinstance(nome, str) for nome in gestoras):
+                raise ValueError('Envie {"gestoras": [...], "itens": [...]}')
+            return query_gestoras_json(gestoras, pedido.get("itens"))
+        if rota == "/emissoes":
+            return query_issuance(parametros.get("semana", [None])[0])
+        return None
+
+    def _answer(self, corpo=None):
+        url = urlparse(self.path)
+        try:
+            dados = self._handle(url.path, parse_qs(url.query), corpo)
+        except (ValueError, KeyError, TypeError) as erro:
+            self._send(400, {"erro": str(erro)})
+            return
+        if dados is None:
+            self._send(404, {"erro": f"Rota desconhecida: {url.path}"})
+        else:
+            self._send(200, dados)
+
+    def do_GET(self):
+        self._answer()
+
+    def do_POST(self):
+        self._answer(self.rfile.read(int(self.headers.get("Content-Length") or 0)))
+
+    # Sem uma linha de log por requisição no stderr
+    def log_message(self, formato, *args):
+        pass
+
+
+def serve(host, porta):
+    warm()
+    servidor = ThreadingHTTPServer((host, porta), QueryHandler)
+    print(f"Servindo consultas em http://{host}:{servidor.server_port} "
+          f"(GET /saude, /gestoras, /gestora, /emissoes; POST /consulta)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    comandos = parser.add_subparsers(dest="comando", required=True)
+    gestoras = comandos.add_parser("gestoras")
+    gestoras.add_argument("--busca")
+    consulta = comandos.add_parser("consulta")
+    consulta.add_argument("gestoras", nargs="+")
+    consulta.add_argument("--itens", nargs="+", choices=ITENS)
+    emissoes = comandos.add_parser("emissoes")
+    emissoes.add_argument("--semana")
+    servir = comandos.add_parser("servir")
+    servir.add_argument("--host", default="127.0.0.1")
+    servir.add_argument("--porta", type=int, default=8502)
+    args = parser.parse_args()
+
+    if args.comando == "servir":
+        serve(args.host, args.porta)
+        return
+    if args.comando == "gestoras":
+        dados = {"gestoras": list_gestoras(args.busca)}
+    elif args.comando == "consulta":
+        dados = query_gestoras(args.gestoras, args.itens)
+    else:
+        dados = query_issuance(args.semana)
+    print(json.dumps(dados, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# Vazão do modo de consultas (api.py) com o processo aquecido.
+# Sobe o servidor HTTP em uma porta livre e mede: a carga inicial (tabelas, índice e
+# agregados), o primeiro e os demais lotes de gestoras chamados direto no módulo, e as
+# requisições por segundo de C clientes concorrentes enviando lotes de G gestoras por POST.
+# Uso: python -m benchmarks.bench_api [--clientes 8] [--gestoras-lote 10] [--segundos 5]
+#          [--itens setores prazos inadimplencia]
+import argparse
+import http.client
+import json
+import threading
+import time
+
+import numpy as np
+
+import api
+
+
+def _post(porta, corpo):
+    conexao = http.client.HTTPConnection("127.0.0.1", porta)
+    try:
+        conexao.request("POST", "/consulta", body=corpo, headers={"Content-Type": "application/json"})
+        resposta = conexao.getresponse()
+        resposta.read()
+        return resposta.status
+    finally:
+        conexao.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clientes", type=int, default=8)
+    parser.add_argument("--gestoras-lote", type=int, default=10)
+    parser.add_argument("--segundos", type=float, default=5)
+    parser.add_argument("--itens", nargs="+", choices=api.ITENS)
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    estado = api.warm()
+    print(f"Carga inicial: {time.perf_counter() - inicio:.2f}s ({len(estado['indice']['gestoras'])} gestoras)")
+
+    # Lotes das gestoras com mais fundos e ofertas, as mais caras de calcular
+    gestoras = sorted(estado["indice"]["gestoras"],
+                      key=lambda nome: -len(estado["indice"]["fundos"].get(nome, ())))
+    lotes = [gestoras[i:i + args.gestoras_lote] for i in range(0, min(len(gestoras), 20 * args.gestoras_lote),
+                                                               args.gestoras_lote)]
+    for rotulo in ["lote frio", "lote quente"]:
+        inicio = time.perf_counter()
+        api.query_gestoras(lotes[0], args.itens)
+        print(f"  {rotulo}: {(time.perf_counter() - inicio) * 1000:.1f} ms ({len(lotes[0])} gestoras)")
+    for lote in lotes:
+        api.query_gestoras(lote, args.itens)
+
+    servidor = api.ThreadingHTTPServer(("127.0.0.1", 0), api.QueryHandler)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    porta = servidor.server_port
+    corpos = [json.dumps({"gestoras": lote, "itens": args.itens}).encode("utf-8") for lote in lotes]
+
+    tempos, erros = [], []
+    fim = time.perf_counter() + args.segundos
+
+    def client(semente):
+        proximo = semente
+        while time.perf_counter() < fim:
+            inicio = time.perf_counter()
+            status = _post(porta, corpos[proximo % len(corpos)])
+            tempos.append(time.perf_counter() - inicio)
+            if status != 200:
+                erros.append(status)
+            proximo += 1
+
+    clientes = [threading.Thread(target=client, args=(numero,)) for numero in range(args.clientes)]
+    inicio = time.perf_counter()
+    for cliente in clientes:
+        cliente.start()
+    for cliente in clientes:
+        cliente.join()
+    decorrido = time.perf_counter() - inicio
+    servidor.shutdown()
+    servidor.server_close()
+
+    latencias = np.array(tempos) * 1000
+    print(f"HTTP: {args.clientes} clientes, lotes de {len(lotes[0])} gestoras")
+    print(f"  {len(tempos) / decorrido:.0f} requisições/s ({len(tempos) * len(lotes[0]) / decorrido:.0f} gestoras/s)"
+          f"  mediana {np.median(latencias):.1f} ms  p99 {np.percentile(latencias, 99):.1f} ms  erros {len(erros)}")
+
+
+if __name__ == "__main__":
+    main()
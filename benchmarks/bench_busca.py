@@ -0,0 +1,60 @@
+# Tempo de resposta da busca de gestoras (search.search) em um índice com muitos nomes.
+# Gera nomes sintéticos com grafias variadas (acentos, LTDA, S.A.) e mede o agrupamento das
+# grafias, a montagem do índice e a mediana/p99 de consultas por prefixo e com erro de digitação.
+# Uso: python -m benchmarks.bench_busca [--nomes 20000] [--consultas 2000]
+import argparse
+import time
+
+import numpy as np
+
+import search
+
+PALAVRAS = ["GESTÃO", "GESTAO", "ASSET", "CAPITAL", "INVESTIMENTOS", "RECURSOS", "PARTNERS", "CRÉDITO",
+            "ITAÚ", "BRADESCO", "VÉRTICE", "ÁGORA", "SÃO", "PAULO", "RIO", "NORTE", "SUL", "ALFA", "ÔMEGA"]
+SUFIXOS = ["", " LTDA", " S.A.", " DE RECURSOS LTDA"]
+
+
+# Nomes-base aleatórios, cada um em até quatro grafias (sufixos societários, com e sem acento)
+def synthetic_names(quantidade, semente=0):
+    rng = np.random.default_rng(semente)
+    nomes = {}
+    for numero in range(quantidade // len(SUFIXOS)):
+        base = f"{' '.join(rng.choice(PALAVRAS, size=rng.integers(1, 4)))} {numero:05d}"
+        for posicao, sufixo in enumerate(SUFIXOS):
+            grafia = base if posicao % 2 == 0 else base.replace("Ã", "A").replace("É", "E").replace("Ú", "U")
+            nomes[grafia + sufixo] = int(rng.integers(1, 200))
+    return nomes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nomes", type=int, default=20000)
+    parser.add_argument("--consultas", type=int, default=2000)
+    args = parser.parse_args()
+
+    contagens = synthetic_names(args.nomes)
+    inicio = time.perf_counter()
+    aliases = search.alias_groups(contagens)
+    indice = search.build_search_index(aliases, contagens)
+    print(f"{len(contagens)} grafias -> {len(aliases)} gestoras; índice em {time.perf_counter() - inicio:.2f}s")
+
+    rng = np.random.default_rng(1)
+    nomes = list(aliases)
+    consultas = {
+        "prefixo curto": [nome[:3] for nome in rng.choice(nomes, args.consultas)],
+        "duas palavras": [" ".join(nome.split()[:2]) for nome in rng.choice(nomes, args.consultas)],
+        "sem acento": [nome.replace("Ã", "A").replace("É", "E")[:12] for nome in rng.choice(nomes, args.consultas)],
+        "erro de digitação": [nome[:6] + nome[7:14] for nome in rng.choice(nomes, args.consultas)],
+    }
+    for tipo, textos in consultas.items():
+        tempos = []
+        for texto in textos:
+            inicio = time.perf_counter()
+            search.search(indice, texto)
+            tempos.append(time.perf_counter() - inicio)
+        tempos = np.array(tempos) * 1000
+        print(f"  {tipo:18s} mediana {np.median(tempos):.3f} ms  p99 {np.percentile(tempos, 99):.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
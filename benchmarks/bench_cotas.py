@@ -0,0 +1,65 @@
+# Motor de cotas (cotas.py) contra o cálculo direto nas tabelas X do informe mensal.
+# Mede a montagem da tabela compacta, a criação do motor e a estrutura de cotas (valor por
+# classe e subordinação) de todos os fundos, comparada a um groupby do pandas sobre a X_2
+# com a classe tirada do texto da série a cada chamada. Mostra também a memória das duas formas.
+# Uso: python -m benchmarks.bench_cotas [--repeticoes 50]
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+import cotas
+import storage
+
+
+# Estrutura de cotas pelo caminho direto: classe pelo texto e groupby por CNPJ e classe
+def pandas_structure(x_2):
+    classe = x_2["TAB_X_CLASSE_SERIE"].astype(str).map(cotas.quota_class)
+    valor = x_2["TAB_X_QT_COTA"] * x_2["TAB_X_VL_COTA"]
+    por_classe = valor.groupby([x_2["CNPJ_FUNDO_CLASSE"], classe]).sum().unstack(fill_value=0)
+    total = por_classe.sum(axis=1)
+    return ((por_classe.get(cotas.MEZANINO, 0) + por_classe.get(cotas.SUBORDINADA, 0)) / total * 100).where(total > 0)
+
+
+def _median_ms(funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return np.median(tempos) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeticoes", type=int, default=50)
+    args = parser.parse_args()
+
+    brutas = {tabela: storage.load_table(storage.fidc_table_name(tabela)) for tabela in cotas.COLUNAS_COTAS}
+    linhas = sum(len(df) for df in brutas.values())
+    memoria_bruta = sum(df.memory_usage(deep=True).sum() for df in brutas.values()) / 1e6
+
+    inicio = time.perf_counter()
+    tabela = cotas.load_quota_table()
+    montagem = time.perf_counter() - inicio
+    motor = cotas.quota_engine(tabela)
+    print(f"Tabelas X: {linhas} linhas, {memoria_bruta:.1f} MB -> compacta: {len(tabela)} linhas, "
+          f"{tabela.memory_usage(deep=True).sum() / 1e6:.1f} MB, {len(motor['cnpjs'])} fundos "
+          f"(montada em {montagem:.2f}s)")
+
+    print(f"  motor (offsets por CNPJ): {_median_ms(lambda: cotas.quota_engine(tabela), args.repeticoes):.2f} ms")
+    motor_ms = _median_ms(lambda: cotas.subordination(motor), args.repeticoes)
+    pandas_ms = _median_ms(lambda: pandas_structure(brutas["X_2"]), max(1, args.repeticoes // 5))
+    print(f"  estrutura de cotas de todos os fundos: motor {motor_ms:.2f} ms | pandas {pandas_ms:.2f} ms "
+          f"({pandas_ms / motor_ms:.0f}x)")
+
+    # Mesmo resultado nos fundos com valor de cotas
+    esperado = pandas_structure(brutas["X_2"]).dropna()
+    esperado.index = pd.to_numeric(esperado.index).astype(np.int64)
+    obtido = cotas.subordination(motor)["Subordinação (%)"].reindex(esperado.index)
+    print(f"  subordinação igual à do pandas: {'sim' if np.allclose(obtido, esperado, equal_nan=True) else 'NÃO'}")
+
+
+if __name__ == "__main__":
+    main()
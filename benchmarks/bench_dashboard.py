@@ -0,0 +1,291 @@
+# Benchmark de ponta a ponta do dashboard: roda dash2.py sem navegador (AppTest do Streamlit).
+# Para cada escala, copia o código para uma pasta de trabalho, gera os CSVs replicando
+# registros e informe mensal N vezes (cada cópia com CNPJs novos) e mede, em um processo novo:
+#   - leitura das tabelas do dashboard sem snapshots (CSV -> snapshot) e com snapshots
+#   - primeira execução do script sem snapshots, com snapshots e um rerun em cache
+#   - rerun por gestora: tempo total, tempo de cada visão (Fundos, Ofertas...) e tamanho das mensagens enviadas
+#   - pico de RSS do processo
+# O resultado vai para um JSON; --comparar mostra a razão contra um JSON de outro commit.
+# Uso: python -m benchmarks.bench_dashboard [--escalas 1 10 100] [--gestoras 3]
+#          [--saida benchmarks/bench_dashboard.json] [--comparar anterior.json]
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import platform
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Resultado padrão, ao lado do script (ignorado pelo git)
+SAIDA_PADRAO = os.path.join(RAIZ, "benchmarks", "bench_dashboard.json")
+
+# Além dos .py, arquivos do app copiados para a pasta de trabalho de cada escala
+ARQUIVOS_APP = ["logo_bamboo.png"]
+
+# Colunas de CNPJ que ligam registros e informe mensal (as mesmas limpas pelo storage)
+COLUNAS_CNPJ = ["CNPJ_Fundo", "CNPJ_Emissor", "CNPJ_FUNDO_CLASSE"]
+
+# Deslocamento dos CNPJs de cada cópia, para que as cópias sejam fundos distintos
+PASSO_CNPJ = 7_919_000_000
+
+ROTULO_GESTORA = "Escolha uma Gestora:"
+
+# Chave do seletor de visão (Fundos, Ofertas, FIDCs, Emissões) no dash2.py
+CHAVE_ABAS = "aba"
+
+
+def _read_raw(caminho):
+    return pd.read_csv(caminho, encoding='latin1', sep=';', dtype=str, keep_default_na=False,
+                       on_bad_lines='skip')
+
+
+def _write_raw(df, caminho):
+    df.to_csv(caminho, encoding='latin1', sep=';', index=False)
+
+
+# CNPJs deslocados para a cópia de número `copia`, no formato 00.000.000/0000-00
+def _shift_cnpjs(serie, copia):
+    digitos = pd.to_numeric(serie.str.replace(r'[^0-9]', '', regex=True), errors='coerce')
+    novos = ((digitos + copia * PASSO_CNPJ) % 10**14).astype("Int64")
+    texto = novos.map(lambda n: f"{n:014d}", na_action='ignore')
+    formatado = (texto.str[:2] + "." + texto.str[2:5] + "." + texto.str[5:8] + "/"
+                 + texto.str[8:12] + "-" + texto.str[12:])
+    return formatado.where(digitos.notna(), serie)
+
+
+# Replica um CSV da CVM `fator` vezes; as cópias ganham CNPJs novos e consistentes entre tabelas
+def scale_csv(origem, destino, fator):
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    if fator == 1:
+        shutil.copyfile(origem, destino)
+        return
+    df = _read_raw(origem)
+    colunas = [coluna for coluna in COLUNAS_CNPJ if coluna in df]
+    copias = []
+    for copia in range(fator):
+        parte = df.copy()
+        for coluna in colunas:
+            parte[coluna] = _shift_cnpjs(df[coluna], copia) if copia else df[coluna]
+        copias.append(parte)
+    _write_raw(pd.concat(copias, ignore_index=True), destino)
+
+
+# Gera a pasta de trabalho de uma escala: código do app + registros e informes replicados
+def scale_sources(origem, destino, fator):
+    os.makedirs(destino, exist_ok=True)
+    for arquivo in os.listdir(origem):
+        if arquivo.endswith(".py") or arquivo in ARQUIVOS_APP:
+            shutil.copy(os.path.join(origem, arquivo), destino)
+
+    for arquivo in ["registro_fundo.csv", "oferta_resolucao_160.csv"]:
+        if os.path.exists(os.path.join(origem, arquivo)):
+            scale_csv(os.path.join(origem, arquivo), os.path.join(destino, arquivo), fator)
+
+    for pasta in sorted(os.listdir(origem)):
+        if not re.match(r"^inf_mensal_fidc_\d{6}$", pasta):
+            continue
+        for arquivo in sorted(os.listdir(os.path.join(origem, pasta))):
+            if arquivo.endswith(".csv"):
+                scale_csv(os.path.join(origem, pasta, arquivo), os.path.join(destino, pasta, arquivo), fator)
+
+
+# Guarda o tamanho (bytes) das mensagens que a última execução enviaria ao navegador
+def _measure_messages(mensagens):
+    from streamlit.testing.v1.local_script_runner import LocalScriptRunner
+    original = LocalScriptRunner.forward_msgs
+
+    def forward_msgs(self):
+        msgs = original(self)
+        mensagens["bytes"] = sum(msg.ByteSize() for msg in msgs)
+        mensagens["quantidade"] = len(msgs)
+        mensagens["conteudo"] = hashlib.sha1(b"".join(
+            msg.delta.SerializeToString() for msg in msgs if msg.HasField("delta"))).hexdigest()
+        return msgs
+
+    LocalScriptRunner.forward_msgs = forward_msgs
+
+
+def _timed_run(app, mensagens):
+    inicio = time.perf_counter()
+    app.run()
+    return {
+        "segundos": time.perf_counter() - inicio,
+        "mensagens_bytes": mensagens.get("bytes"),
+        "mensagens": mensagens.get("quantidade"),
+        "conteudo": mensagens.get("conteudo"),
+        "erros": [str(erro.value) for erro in app.exception],
+    }
+
+
+# Executado no processo filho, dentro da pasta de trabalho de uma escala
+def _run_scale(pasta, qtd_gestoras, fila):
+    import resource
+    import warnings
+
+    warnings.filterwarnings("ignore")
+    os.chdir(pasta)
+    sys.path.insert(0, pasta)
+    import schemas
+    import search
+    import storage
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+
+    tabelas = {
+        tabela: tabela if tabela in storage.FONTES else storage.fidc_table_name(tabela)
+        for tabela in schemas.VISOES["dashboard"]
+    }
+    resultado = {}
+
+    def load_tables():
+        inicio = time.perf_counter()
+        dados = [storage.load_table(nome, schemas.VISOES["dashboard"][tabela]) for tabela, nome in tabelas.items()]
+        return time.perf_counter() - inicio, sum(len(df) for df in dados)
+
+    shutil.rmtree(storage.SNAPSHOT_DIR, ignore_errors=True)
+    resultado["load_data_fria"], resultado["linhas"] = load_tables()
+    resultado["load_data_quente"], _ = load_tables()
+
+    mensagens = {}
+    _measure_messages(mensagens)
+
+    shutil.rmtree(storage.SNAPSHOT_DIR, ignore_errors=True)
+    app = AppTest.from_file(os.path.join(pasta, "dash2.py"), default_timeout=3600)
+    resultado["execucao_sem_snapshots"] = _timed_run(app, mensagens)
+
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    app = AppTest.from_file(os.path.join(pasta, "dash2.py"), default_timeout=3600)
+    resultado["execucao_com_snapshots"] = _timed_run(app, mensagens)
+    resultado["rerun_em_cache"] = _timed_run(app, mensagens)
+
+    # Gestoras com mais fundos (pior caso) e a com menos fundos, com as grafias reunidas como no seletor
+    registro = storage.load_table("registro_fundo", ["Gestor"])
+    contagem = registro["Gestor"].value_counts()
+    aliases = search.alias_groups(contagem.to_dict())
+    contagem = pd.Series({gestora: contagem[grafias].sum() for gestora, grafias in aliases.items()})
+    contagem = contagem.sort_values(ascending=False, kind="stable")
+    gestoras = list(contagem.index[:qtd_gestoras]) + list(contagem.index[-1:])
+
+    resultado["gestoras"] = {}
+    for gestora in dict.fromkeys(gestoras):
+        seletor = next(s for s in app.selectbox if s.label == ROTULO_GESTORA)
+        seletor.select(gestora)
+        medida = _timed_run(app, mensagens)
+        medida["fundos"] = int(contagem[gestora])
+
+        # Cada visão é montada só quando escolhida: mede uma a uma. O seletor é buscado de novo a
+        # cada execução, porque o elemento da execução anterior não altera mais o app
+        opcoes = app.radio(key=CHAVE_ABAS).options
+        medida["abas"] = {}
+        for aba in opcoes:
+            app.radio(key=CHAVE_ABAS).set_value(aba)
+            medida["abas"][aba] = _timed_run(app, mensagens)
+        conteudos = [aba_medida["conteudo"] for aba_medida in medida["abas"].values()]
+        assert len(set(conteudos)) == len(conteudos), f"visões com o mesmo conteúdo para {gestora}"
+        app.radio(key=CHAVE_ABAS).set_value(opcoes[0])
+        resultado["gestoras"][str(gestora)] = medida
+
+    resultado["pico_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    fila.put(resultado)
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(escalas, qtd_gestoras, origem):
+    contexto = multiprocessing.get_context("spawn")
+    resultados = {}
+    for fator in escalas:
+        with tempfile.TemporaryDirectory(prefix=f"bench_dashboard_{fator}x_") as pasta:
+            inicio = time.perf_counter()
+            scale_sources(origem, pasta, fator)
+            geracao = time.perf_counter() - inicio
+
+            fila = contexto.Queue()
+            processo = contexto.Process(target=_run_scale, args=(pasta, qtd_gestoras, fila))
+            processo.start()
+            resultado = fila.get()
+            processo.join()
+            resultado["geracao_dados"] = geracao
+            resultados[str(fator)] = resultado
+            _print_scale(fator, resultado)
+    return resultados
+
+
+def _print_scale(fator, resultado):
+    print(f"Escala {fator}x ({resultado['linhas']} linhas nas tabelas do dashboard)")
+    print(f"  load_data fria {resultado['load_data_fria']:.2f}s | quente {resultado['load_data_quente']:.3f}s")
+    for nome in ["execucao_sem_snapshots", "execucao_com_snapshots", "rerun_em_cache"]:
+        medida = resultado[nome]
+        print(f"  {nome:24s} {medida['segundos']:7.2f}s  {medida['mensagens_bytes'] / 1e6:7.2f} MB enviados")
+    for gestora, medida in resultado["gestoras"].items():
+        abas = ", ".join(f"{aba} {aba_medida['segundos']:.2f}s" for aba, aba_medida in medida["abas"].items())
+        print(f"  {gestora[:30]:30s} ({medida['fundos']} fundos) {medida['segundos']:6.2f}s "
+              f"{medida['mensagens_bytes'] / 1e6:6.2f} MB | {abas}")
+    print(f"  pico de RSS: {resultado['pico_rss_mb']:.0f} MB")
+
+
+# Razão atual/anterior das medidas principais de cada escala
+def compare(atual, anterior):
+    print(f"Comparação com {anterior.get('commit')} (razão atual/anterior; > 1 é mais lento/maior):")
+    for fator, resultado in atual["escalas"].items():
+        antigo = anterior["escalas"].get(fator)
+        if antigo is None:
+            continue
+        medidas = {
+            "load_data_fria": (resultado["load_data_fria"], antigo["load_data_fria"]),
+            "load_data_quente": (resultado["load_data_quente"], antigo["load_data_quente"]),
+            "rerun_em_cache": (resultado["rerun_em_cache"]["segundos"], antigo["rerun_em_cache"]["segundos"]),
+            "pico_rss_mb": (resultado["pico_rss_mb"], antigo["pico_rss_mb"]),
+        }
+        for gestora, medida in resultado["gestoras"].items():
+            if gestora in antigo["gestoras"]:
+                medidas[f"rerun {gestora[:20]}"] = (medida["segundos"], antigo["gestoras"][gestora]["segundos"])
+        print(f"  Escala {fator}x")
+        for nome, (novo, velho) in medidas.items():
+            razao = novo / velho if velho else np.nan
+            print(f"    {nome:28s} {razao:6.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--escalas", type=int, nargs="+", default=[1, 10])
+    parser.add_argument("--gestoras", type=int, default=3, help="Quantas gestoras com mais fundos medir")
+    parser.add_argument("--origem", default=RAIZ, help="Pasta com os CSVs da CVM de referência")
+    parser.add_argument("--saida", default=SAIDA_PADRAO)
+    parser.add_argument("--comparar", help="JSON de uma execução anterior")
+    args = parser.parse_args()
+
+    resultado = {
+        "commit": _commit(),
+        "data": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "escalas": run(args.escalas, args.gestoras, args.origem),
+    }
+    with open(args.saida, 'w', encoding='utf-8') as f:
+        json.dump(resultado, f, indent=2, ensure_ascii=False)
+    print(f"Resultados em {args.saida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            compare(resultado, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# Escalabilidade do ingest paralelo: de 1 a N processos.
+# Copia o código e os CSVs para uma pasta de trabalho, replica a competência de referência
+# em M competências (simula uma carga de histórico) e roda `ingest.py --forcar --processos P`
+# para cada P, do zero (sem snapshots). Mostra tempo, aceleração sobre 1 processo e se os
+# snapshots gerados são idênticos aos da execução com 1 processo.
+# Uso: python -m benchmarks.bench_ingest [--processos 1 2 4 8] [--competencias 6]
+#          [--origem pasta com os CSVs]
+import argparse
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# Pasta de trabalho com o código, os registros e `competencias` cópias do informe mensal
+def prepare(origem, destino, competencias):
+    for arquivo in os.listdir(origem):
+        if arquivo.endswith(".py"):
+            shutil.copy(os.path.join(origem, arquivo), destino)
+    for arquivo in ["registro_fundo.csv", "oferta_resolucao_160.csv"]:
+        if os.path.exists(os.path.join(origem, arquivo)):
+            shutil.copy(os.path.join(origem, arquivo), destino)
+
+    pastas = sorted(p for p in os.listdir(origem) if re.match(r"^inf_mensal_fidc_\d{6}$", p))
+    if not pastas:
+        raise SystemExit(f"Nenhuma pasta inf_mensal_fidc_YYYYMM em {origem}")
+    referencia = pastas[-1][-6:]
+    for indice in range(competencias):
+        # Competências anteriores à de referência, mês a mês
+        ano, mes = divmod(int(referencia[:4]) * 12 + int(referencia[4:]) - 1 - indice, 12)
+        competencia = f"{ano}{mes + 1:02d}"
+        pasta = os.path.join(destino, f"inf_mensal_fidc_{competencia}")
+        os.makedirs(pasta, exist_ok=True)
+        for arquivo in os.listdir(os.path.join(origem, pastas[-1])):
+            if arquivo.endswith(f"_{referencia}.csv"):
+                shutil.copy(os.path.join(origem, pastas[-1], arquivo),
+                            os.path.join(pasta, arquivo.replace(f"_{referencia}.csv", f"_{competencia}.csv")))
+
+
+def _snapshot_hashes(pasta):
+    snapshots = os.path.join(pasta, "snapshots")
+    hashes = {}
+    for arquivo in sorted(os.listdir(snapshots)):
+        if arquivo.endswith(".arrow"):
+            with open(os.path.join(snapshots, arquivo), 'rb') as f:
+                hashes[arquivo] = hashlib.sha1(f.read()).hexdigest()
+    return hashes
+
+
+def run(pasta, processos):
+    shutil.rmtree(os.path.join(pasta, "snapshots"), ignore_errors=True)
+    inicio = time.perf_counter()
+    subprocess.run([sys.executable, "ingest.py", "--forcar", "--processos", str(processos)],
+                   cwd=pasta, check=True, capture_output=True)
+    return time.perf_counter() - inicio, _snapshot_hashes(pasta)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--processos", type=int, nargs="+",
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    parser.add_argument("--competencias", type=int, default=6)
+    parser.add_argument("--origem", default=RAIZ, help="Pasta com os CSVs da CVM de referência")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        prepare(args.origem, pasta, args.competencias)
+        arquivos = sum(len(os.listdir(os.path.join(pasta, p))) for p in os.listdir(pasta)
+                       if p.startswith("inf_mensal_fidc_"))
+        print(f"{args.competencias} competências, {arquivos} arquivos do informe mensal; "
+              f"{os.cpu_count()} núcleos disponíveis")
+
+        base, referencia = None, None
+        for processos in sorted(set(args.processos)):
+            segundos, hashes = run(pasta, processos)
+            if base is None:
+                base, referencia = segundos, hashes
+            identico = "sim" if hashes == referencia else "NÃO"
+            print(f"  {processos:3d} processos: {segundos:6.1f}s  aceleração {base / segundos:5.2f}x  "
+                  f"snapshots idênticos: {identico}")
+
+
+if __name__ == "__main__":
+    main()
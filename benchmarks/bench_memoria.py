@@ -0,0 +1,92 @@
+# Memória ocupada pelas tabelas: leitura antiga (CSV inteiro, tipos inferidos)
+# contra leitura com schema (colunas projetadas e dtypes explícitos).
+# Cada modo roda em um processo novo para medir também o pico de RSS.
+# Mede ainda o pico de RSS para gerar o snapshot de cada tabela com o CSV lido em blocos
+# de tamanhos diferentes (streaming.LINHAS_POR_BLOCO).
+# Uso: python -m benchmarks.bench_memoria
+import multiprocessing
+import os
+import resource
+import tempfile
+
+import schemas
+import storage
+import streaming
+
+# Tabelas que o dashboard carrega e a visão usada para projetar as colunas
+TABELAS_DASHBOARD = ["registro_fundo", "oferta_resolucao_160", "II", "VI", "VII"]
+
+# Linhas por bloco na geração dos snapshots; o primeiro equivale a ler o arquivo inteiro
+BLOCOS_GRAVACAO = [10**9, 50_000, 10_000]
+
+
+def _snapshot_name(tabela):
+    return tabela if tabela in storage.FONTES else storage.fidc_table_name(tabela)
+
+
+def _existing(tabela):
+    caminho = os.path.join(storage.BASE_DIR, storage.source(_snapshot_name(tabela))["arquivo"])
+    return os.path.exists(caminho)
+
+
+def _load(modo, tabela):
+    nome = _snapshot_name(tabela)
+    if modo == "csv_inferido":
+        return storage.read_cvm_csv(os.path.join(storage.BASE_DIR, storage.source(nome)["arquivo"]))
+    if modo == "csv_schema":
+        return storage.read_source(nome, schemas.VISOES["dashboard"].get(tabela))
+    return storage.load_table(nome, schemas.VISOES["dashboard"].get(tabela))
+
+
+# Executado no processo filho: carrega as tabelas e devolve bytes em DataFrames e pico de RSS
+def _measure(modo, tabelas):
+    dados = [_load(modo, tabela) for tabela in tabelas]
+    em_uso = sum(int(df.memory_usage(deep=True).sum()) for df in dados)
+    pico_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return em_uso, pico_kb
+
+
+# Executado no processo filho: gera o snapshot lendo o CSV em blocos de `linhas_por_bloco`,
+# numa pasta temporária para não substituir os snapshots (e a quarentena) do dashboard
+def _measure_snapshot(nome, linhas_por_bloco):
+    streaming.LINHAS_POR_BLOCO = linhas_por_bloco
+    with tempfile.TemporaryDirectory() as pasta:
+        storage.SNAPSHOT_DIR = pasta
+        storage.QUARENTENA_DIR = os.path.join(pasta, "quarentena")
+        storage.write_snapshot(nome)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def main():
+    # Garante snapshots atualizados antes de medir a leitura por eles
+    for tabela in TABELAS_DASHBOARD:
+        if _existing(tabela):
+            storage.load_table(_snapshot_name(tabela))
+
+    tabelas = [tabela for tabela in TABELAS_DASHBOARD if _existing(tabela)]
+    print(f"Tabelas: {', '.join(tabelas)}")
+
+    contexto = multiprocessing.get_context("spawn")
+    resultados = {}
+    for modo in ["csv_inferido", "csv_schema", "snapshot_schema"]:
+        with contexto.Pool(1) as pool:
+            resultados[modo] = pool.apply(_measure, (modo, tabelas))
+
+    base = resultados["csv_inferido"][0]
+    for modo, (em_uso, pico_kb) in resultados.items():
+        print(f"{modo:16s} DataFrames: {em_uso / 1e6:7.1f} MB ({em_uso / base:5.1%})"
+              f"  pico RSS: {pico_kb / 1024:7.1f} MB")
+
+    print("Pico de RSS ao gerar o snapshot, por linhas por bloco:")
+    for tabela in tabelas:
+        medidas = []
+        for linhas in BLOCOS_GRAVACAO:
+            with contexto.Pool(1) as pool:
+                pico_kb = pool.apply(_measure_snapshot, (_snapshot_name(tabela), linhas))
+            rotulo = "arquivo inteiro" if linhas == BLOCOS_GRAVACAO[0] else f"{linhas}"
+            medidas.append(f"{rotulo}: {pico_kb / 1024:6.1f} MB")
+        print(f"  {_snapshot_name(tabela):22s} " + "  ".join(medidas))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# Compara o tempo de clean_cnpj/clean_name aplicados linha a linha com a versão vetorizada
+# (a equivalência dos resultados é verificada em tests/test_normalize.py).
+# Uso: python -m benchmarks.bench_normalize [--linhas 150000]
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from normalize import clean_cnpj, clean_name, normalize_cnpjs, normalize_names
+
+# Tamanho aproximado do cadastro completo de fundos da CVM
+LINHAS_REGISTRO = 150_000
+
+
+# Gera colunas com a mesma cara do cadastro: CNPJs formatados e poucos gestores repetidos
+def synthetic_registry(linhas, seed=0):
+    rng = np.random.default_rng(seed)
+    numeros = rng.integers(10**11, 10**14, size=linhas)
+    cnpjs = pd.Series([f"{n:014d}" for n in numeros], dtype=object)
+    cnpjs = cnpjs.str[:2] + "." + cnpjs.str[2:5] + "." + cnpjs.str[5:8] + "/" + cnpjs.str[8:12] + "-" + cnpjs.str[12:]
+    cnpjs[rng.random(linhas) < 0.01] = np.nan
+
+    base = ["Bamboo Gestão de Recursos Ltda.", "  itaú unibanco  asset 2 ", "XP Gestão S/A",
+            "Vinci Partners\tInvestimentos", "Kinea - Investimentos", "BTG PACTUAL ÿ ß"]
+    gestores = np.array(base + [f"Gestora {i} Ltda." for i in range(4000)], dtype=object)
+    nomes = pd.Series(gestores[rng.integers(0, len(gestores), size=linhas)], dtype=object)
+    nomes[rng.random(linhas) < 0.02] = np.nan
+    return cnpjs, nomes
+
+
+def cronometrar(funcao):
+    inicio = time.perf_counter()
+    resultado = funcao()
+    return resultado, time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--linhas", type=int, default=LINHAS_REGISTRO)
+    args = parser.parse_args()
+
+    cnpjs, nomes = synthetic_registry(args.linhas)
+
+    # CNPJs passam por astype(str) antes da limpeza, como em storage.clean_table
+    _, t_ref_cnpj = cronometrar(lambda: cnpjs.astype(str).apply(clean_cnpj))
+    _, t_vet_cnpj = cronometrar(lambda: normalize_cnpjs(cnpjs.astype(str)))
+    _, t_ref_nome = cronometrar(lambda: nomes.apply(clean_name))
+    vet_nome, t_vet_nome = cronometrar(lambda: normalize_names(nomes))
+    cat_nome, t_cat_nome = cronometrar(lambda: normalize_names(nomes, categorical=True))
+
+    print(f"Linhas: {args.linhas:,}")
+    print(f"CNPJ  apply: {t_ref_cnpj:.3f}s  vetorizado: {t_vet_cnpj:.3f}s  ({t_ref_cnpj / t_vet_cnpj:.1f}x)")
+    print(f"Nome  apply: {t_ref_nome:.3f}s  vetorizado: {t_vet_nome:.3f}s  ({t_ref_nome / t_vet_nome:.1f}x)")
+    print(f"Nome  categórico: {t_cat_nome:.3f}s")
+
+    # Filtro de igualdade: texto contra códigos inteiros
+    alvo = vet_nome.iloc[0]
+    _, t_filtro_obj = cronometrar(lambda: vet_nome == alvo)
+    _, t_filtro_cat = cronometrar(lambda: cat_nome == alvo)
+    print(f"Filtro == objeto: {t_filtro_obj * 1000:.2f}ms  categórico: {t_filtro_cat * 1000:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
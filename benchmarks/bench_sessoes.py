@@ -0,0 +1,112 @@
+# Teste de carga de memória por sessão e por processo.
+#  1) Sessões no mesmo processo: cada acerto de st.cache_data devolve uma cópia
+#     desserializada; st.cache_resource devolve o mesmo objeto.
+#  2) Processos: cada worker carrega as tabelas do dashboard lendo o CSV (cópia
+#     privada) ou mapeando os snapshots Arrow (páginas compartilhadas). Mede o
+#     PSS (memória proporcional) somado dos workers.
+# Uso: python -m benchmarks.bench_sessoes [--sessoes 1 5 10] [--processos 1 2 4]
+import argparse
+import multiprocessing
+import pickle
+import tracemalloc
+
+import schemas
+import storage
+
+TABELAS = {
+    "registro_fundo": "registro_fundo",
+    "oferta_resolucao_160": "oferta_resolucao_160",
+    "II": storage.fidc_table_name("II"),
+    "VI": storage.fidc_table_name("VI"),
+    "VII": storage.fidc_table_name("VII"),
+}
+
+
+def load_tables(modo):
+    if modo == "csv":
+        return [storage.read_source(nome, schemas.VISOES["dashboard"][tabela]) for tabela, nome in TABELAS.items()]
+    return [storage.load_table(nome, schemas.VISOES["dashboard"][tabela]) for tabela, nome in TABELAS.items()]
+
+
+# Sem o runtime do Streamlit os caches não persistem; reproduz a semântica de cada um:
+# st.cache_data guarda o resultado serializado e desserializa uma cópia a cada acerto,
+# st.cache_resource devolve sempre o mesmo objeto
+def sessions_in_process(qtd_sessoes):
+    tabelas = load_tables("snapshot")
+    serializado = pickle.dumps(tabelas, protocol=pickle.HIGHEST_PROTOCOL)
+    modos = {
+        "cache_data": lambda: pickle.loads(serializado),
+        "cache_resource": lambda: tabelas,
+    }
+    for nome, acerto in modos.items():
+        tracemalloc.start()
+        sessoes = [acerto() for _ in range(qtd_sessoes)]
+        retido, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"  {nome:15s} {qtd_sessoes:3d} sessões: {retido / 1e6:8.1f} MB "
+              f"({retido / qtd_sessoes / 1e6:.2f} MB por sessão)")
+        del sessoes
+
+
+# Memória do processo atual segundo o kernel (Linux): o Pss divide as páginas compartilhadas
+def _smaps_rollup():
+    valores = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for linha in f:
+            partes = linha.split()
+            if len(partes) >= 2 and partes[0].endswith(":") and partes[1].isdigit():
+                valores[partes[0][:-1]] = int(partes[1])
+    return valores
+
+
+def _worker(modo, barreira, fila):
+    antes = _smaps_rollup()
+    tabelas = load_tables(modo)
+    # Toca todas as colunas numéricas, como os gráficos fazem
+    for df in tabelas:
+        df.select_dtypes("number").sum()
+    barreira.wait()
+    depois = _smaps_rollup()
+    fila.put((depois["Pss"] - antes["Pss"], depois["Private_Clean"] + depois["Private_Dirty"]
+              - antes["Private_Clean"] - antes["Private_Dirty"]))
+    barreira.wait()
+    del tabelas
+
+
+def processes(modo, qtd_processos):
+    contexto = multiprocessing.get_context("spawn")
+    barreira = contexto.Barrier(qtd_processos)
+    fila = contexto.Queue()
+    workers = [contexto.Process(target=_worker, args=(modo, barreira, fila)) for _ in range(qtd_processos)]
+    for worker in workers:
+        worker.start()
+    medidas = [fila.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+    pss_total = sum(pss for pss, _ in medidas) / 1024
+    privado = sum(privado for _, privado in medidas) / 1024 / qtd_processos
+    print(f"  {modo:8s} {qtd_processos:3d} processos: PSS dos dados {pss_total:8.1f} MB "
+          f"({pss_total / qtd_processos:.1f} MB por processo, privado {privado:.1f} MB)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessoes", type=int, nargs="+", default=[1, 5, 10])
+    parser.add_argument("--processos", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    # Garante os snapshots antes de medir
+    load_tables("snapshot")
+
+    print("Sessões no mesmo processo (memória retida pelos resultados do cache):")
+    for qtd in args.sessoes:
+        sessions_in_process(qtd)
+
+    print("Workers em processos separados:")
+    for modo in ["csv", "snapshot"]:
+        for qtd in args.processos:
+            processes(modo, qtd)
+
+
+if __name__ == "__main__":
+    main()
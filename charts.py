@@ -0,0 +1,89 @@
+import numpy as np
+import plotly.graph_objects as go
+
+# Dados dos gráficos com tamanho limitado: o que vai ao navegador não cresce com o número de
+# fundos. Séries com um valor por fundo viram as maiores barras + "Outros" (soma do resto) ou
+# uma distribuição em faixas. Os dados saem como arrays do NumPy, prontos para go.Bar.
+MAX_BARRAS = 30
+ROTULO_OUTROS = "Outros"
+
+# Limite de pontos por gráfico (soma de todas as séries); acima dele a figura é reduzida
+MAX_PONTOS_FIGURA = 2000
+
+# Faixas da taxa de inadimplência (%) na distribuição por FIDC; a última é aberta
+FAIXAS_INADIMPLENCIA = [0, 0.5, 1, 2, 5, 10, 20, 50, 100, np.inf]
+
+
+# As maiores barras por valor (NaN fica de fora); acima do limite, as últimas viram uma barra
+# "Outros (n)" com a soma, de modo que o gráfico tem no máximo `limite` barras.
+# Resultado: {"tipo": "barras", "x": rótulos, "y": valores, "agrupados": itens em "Outros"}
+def top_n(rotulos, valores, limite=MAX_BARRAS):
+    rotulos = np.asarray(rotulos, dtype=object)
+    valores = np.asarray(valores, dtype="float64")
+    validos = ~np.isnan(valores)
+    rotulos, valores = rotulos[validos], valores[validos]
+
+    if len(valores) <= limite:
+        ordem = np.argsort(-valores, kind="stable")
+        return {"tipo": "barras", "x": rotulos[ordem], "y": valores[ordem], "agrupados": 0}
+
+    # argpartition separa os maiores sem ordenar a série inteira
+    maiores = np.argpartition(-valores, limite - 2)[:limite - 1]
+    maiores = maiores[np.argsort(-valores[maiores], kind="stable")]
+    resto = np.ones(len(valores), dtype=bool)
+    resto[maiores] = False
+    agrupados = int(resto.sum())
+    return {
+        "tipo": "barras",
+        "x": np.append(rotulos[maiores], f"{ROTULO_OUTROS} ({agrupados})"),
+        "y": np.append(valores[maiores], valores[resto].sum()),
+        "agrupados": agrupados,
+    }
+
+
+# Quantidade de itens por faixa [borda, próxima borda); valores fora das bordas ficam de fora.
+# Resultado: {"tipo": "faixas", "x": rótulos das faixas, "y": contagens, "agrupados": itens contados}
+def histogram(valores, bordas, sufixo=""):
+    valores = np.asarray(valores, dtype="float64")
+    contagem, bordas = np.histogram(valores[~np.isnan(valores)], bins=bordas)
+    rotulos = [
+        f"Acima de {inicio:g}{sufixo}" if np.isinf(fim) else f"{inicio:g}{sufixo} a {fim:g}{sufixo}"
+        for inicio, fim in zip(bordas[:-1], bordas[1:])
+    ]
+    return {"tipo": "faixas", "x": np.array(rotulos, dtype=object), "y": contagem,
+            "agrupados": int(contagem.sum())}
+
+
+# Barras por item quando cabem no limite; senão, a distribuição em faixas
+def bars_or_histogram(rotulos, valores, bordas, sufixo="", limite=MAX_BARRAS):
+    if np.count_nonzero(~np.isnan(np.asarray(valores, dtype="float64"))) <= limite:
+        return top_n(rotulos, valores, limite)
+    return histogram(valores, bordas, sufixo)
+
+
+def bar_figure(dados, titulo, nome=None):
+    return go.Figure(go.Bar(x=dados["x"], y=dados["y"], name=nome), layout={"title": titulo})
+
+
+# Pontos de uma série com eixo x (barras, linhas); pizzas e afins contam zero
+def _series_points(serie):
+    x = getattr(serie, "x", None)
+    return 0 if x is None else len(x)
+
+
+def figure_points(fig):
+    return sum(_series_points(serie) for serie in fig.data)
+
+
+# Corta cada série da figura ao seu quinhão de MAX_PONTOS_FIGURA; devolve quantos pontos saíram
+def bound_figure(fig, limite=MAX_PONTOS_FIGURA):
+    pontos = figure_points(fig)
+    if pontos <= limite:
+        return 0
+    por_serie = max(1, limite // len(fig.data))
+    for serie in fig.data:
+        if _series_points(serie) > por_serie:
+            serie.x = serie.x[:por_serie]
+            if serie.y is not None:
+                serie.y = serie.y[:por_serie]
+    return pontos - figure_points(fig)
@@ -0,0 +1,149 @@
+import numpy as np
+import pandas as pd
+
+import storage
+from normalize import cnpj_keys, fold_name
+
+# Cotas dos FIDCs por classe/série (tabelas X_1, X_2, X_3 e X_6 do informe mensal, uma linha
+# por fundo × classe/série) em forma compacta: as quatro tabelas viram uma só, ordenada pela
+# chave inteira do CNPJ, com a série como código de dicionário, a classe (sênior, mezanino,
+# subordinada) interpretada uma vez por texto distinto e os valores em arrays contíguos.
+# As linhas do fundo i ficam em [inicio[i], inicio[i + 1]) (offsets no estilo CSR), então
+# totais por fundo e classe saem de um único bincount sobre todos os fundos.
+
+# Classes de cota, da primeira à última no pagamento
+CLASSES = ["Sênior", "Mezanino", "Subordinada", "Outra"]
+SENIOR, MEZANINO, SUBORDINADA, OUTRA = range(len(CLASSES))
+
+# Valores lidos de cada tabela: coluna do informe -> coluna da tabela compacta
+COLUNAS_COTAS = {
+    "X_1": {"TAB_X_NR_COTST": "cotistas"},
+    "X_2": {"TAB_X_QT_COTA": "quantidade", "TAB_X_VL_COTA": "valor_cota"},
+    "X_3": {"TAB_X_VL_RENTAB_MES": "rentabilidade"},
+    "X_6": {"TAB_X_PR_DESEMP_ESPERADO": "desempenho_esperado", "TAB_X_PR_DESEMP_REAL": "desempenho_real"},
+}
+
+
+# Classe de um texto livre como "Subclasse Subordinada Mezanino 1 | Série 2"
+# (sem acentos, então "Sênior", "Senior" e "S?rie" dão no mesmo)
+def quota_class(texto):
+    dobrado = fold_name(texto).split()
+    if "MEZANINO" in dobrado:
+        return MEZANINO
+    if "SUBORDINADA" in dobrado:
+        return SUBORDINADA
+    if "SENIOR" in dobrado:
+        return SENIOR
+    return OUTRA
+
+
+# Snapshots de que a tabela compacta de uma competência (padrão: a mais recente) depende
+def quota_sources(competencia=None):
+    competencia = competencia or storage.current_month()
+    return [storage.fidc_table_name(tabela, competencia) for tabela in COLUNAS_COTAS]
+
+
+# Junta as tabelas {"X_1": df, ...} em uma linha por (CNPJ, classe/série), ordenada por CNPJ.
+# Linhas repetidas do mesmo par (reenvios) ficam com a primeira; valores que uma tabela não
+# informa ficam NaN. Colunas: CNPJ (int64), SERIE (categoria), CLASSE (int8) e as de COLUNAS_COTAS.
+def build_quota_table(tabelas):
+    textos = pd.Series([serie for df in tabelas.values() for serie in df["TAB_X_CLASSE_SERIE"].dropna().unique()],
+                       dtype=object)
+    series = pd.Index(textos.astype(str).unique()).sort_values()
+
+    chaves, codigos = {}, {}
+    for tabela, df in tabelas.items():
+        chaves[tabela] = cnpj_keys(df["CNPJ_FUNDO_CLASSE"])
+        codigos[tabela] = series.get_indexer(df["TAB_X_CLASSE_SERIE"].astype(object))
+    pares = np.column_stack([np.concatenate(list(chaves.values())), np.concatenate(list(codigos.values()))])
+    unicos, inverso = np.unique(pares, axis=0, return_inverse=True)
+    inverso = inverso.reshape(-1)
+
+    classes = np.array([quota_class(serie) for serie in series] + [OUTRA], dtype=np.int8)
+    compacta = {
+        "CNPJ": unicos[:, 0],
+        "SERIE": pd.Categorical.from_codes(unicos[:, 1], categories=series),
+        "CLASSE": classes[unicos[:, 1]],
+    }
+    inicio = 0
+    for tabela, df in tabelas.items():
+        posicoes = inverso[inicio:inicio + len(df)]
+        inicio += len(df)
+        for coluna, nome in COLUNAS_COTAS[tabela].items():
+            valores = np.full(len(unicos), np.nan)
+            # Atribuição de trás para frente: entre repetidas, vale a primeira linha
+            valores[posicoes[::-1]] = df[coluna].to_numpy(dtype="float64")[::-1]
+            compacta[nome] = valores
+
+    compacta = pd.DataFrame(compacta)
+    return compacta[compacta["CNPJ"] != 0].reset_index(drop=True)
+
+
+# Lê dos snapshots só as colunas usadas e monta a tabela compacta da competência
+def load_quota_table(competencia=None):
+    competencia = competencia or storage.current_month()
+    tabelas = {
+        tabela: storage.load_table(storage.fidc_table_name(tabela, competencia),
+                                   ["CNPJ_FUNDO_CLASSE", "TAB_X_CLASSE_SERIE"] + list(colunas))
+        for tabela, colunas in COLUNAS_COTAS.items()
+    }
+    return build_quota_table(tabelas)
+
+
+# Arrays do motor de cotas a partir da tabela compacta (ordenada por CNPJ): CNPJs distintos,
+# offsets das linhas de cada fundo, fundo de cada linha, série e classe de cada linha, e os
+# valores (float64 contíguos) por nome de COLUNAS_COTAS
+def quota_engine(tabela):
+    chaves = tabela["CNPJ"].to_numpy()
+    primeiras = np.flatnonzero(np.r_[True, chaves[1:] != chaves[:-1]]) if len(chaves) else np.array([], dtype=np.intp)
+    inicio = np.append(primeiras, len(chaves))
+    return {
+        "cnpjs": chaves[primeiras],
+        "inicio": inicio,
+        "fundo": np.repeat(np.arange(len(primeiras)), np.diff(inicio)),
+        "series": tabela["SERIE"].cat.categories,
+        "serie": tabela["SERIE"].cat.codes.to_numpy(),
+        "classe": tabela["CLASSE"].to_numpy(dtype=np.int8),
+        "valores": {nome: tabela[nome].to_numpy(dtype="float64")
+                    for colunas in COLUNAS_COTAS.values() for nome in colunas.values()},
+    }
+
+
+# Valor de mercado de cada linha (quantidade × valor da cota)
+def quota_values(motor):
+    return motor["valores"]["quantidade"] * motor["valores"]["valor_cota"]
+
+
+# Soma por fundo e classe de um array por linha (NaN conta zero): matriz fundos × CLASSES
+def class_totals(motor, valores):
+    celulas = motor["fundo"] * len(CLASSES) + motor["classe"]
+    totais = np.bincount(celulas, weights=np.nan_to_num(valores), minlength=len(motor["cnpjs"]) * len(CLASSES))
+    return totais.reshape(len(motor["cnpjs"]), len(CLASSES))
+
+
+# Estrutura de cotas de todos os fundos: valor por classe, índice de subordinação (mezanino +
+# subordinadas sobre o total, %), séries e cotistas. Índice: chave inteira do CNPJ.
+def subordination(motor):
+    por_classe = class_totals(motor, quota_values(motor))
+    total = por_classe.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        indice = np.where(total > 0, (por_classe[:, MEZANINO] + por_classe[:, SUBORDINADA]) / total * 100, np.nan)
+    estrutura = pd.DataFrame(por_classe, columns=CLASSES, index=pd.Index(motor["cnpjs"], name="CNPJ"))
+    estrutura["Subordinação (%)"] = indice
+    estrutura["Séries"] = np.diff(motor["inicio"])
+    estrutura["Cotistas"] = np.bincount(motor["fundo"], weights=np.nan_to_num(motor["valores"]["cotistas"]),
+                                        minlength=len(motor["cnpjs"]))
+    return estrutura
+
+
+# Posições das linhas (classes/séries) dos fundos pedidos, pela busca binária nos CNPJs
+def fund_rows(motor, chaves):
+    chaves = np.unique(np.asarray(chaves, dtype=np.int64))
+    fundos = np.searchsorted(motor["cnpjs"], chaves)
+    encontrados = fundos < len(motor["cnpjs"])
+    encontrados[encontrados] = motor["cnpjs"][fundos[encontrados]] == chaves[encontrados]
+    fundos = fundos[encontrados]
+    inicios, fins = motor["inicio"][fundos], motor["inicio"][fundos + 1]
+    # Concatena os intervalos [inicio, fim) de cada fundo sem laço em Python
+    tamanhos = fins - inicios
+    return np.repeat(inicios - np.cumsum(np.r_[0, tamanhos[:-1]]), tamanhos) + np.arange(tamanhos.sum())
@@ -1,39 +1,25 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-import re
 import plotly.graph_objects as go
 import numpy as np
 import os
 from PIL import Image
-from datetime import datetime, timedelta
+from datetime import datetime
+
+import aggregates
+import charts
+import queries
+import search
+import storage
+import telemetry
 
 # Configuração da página
 st.set_page_config(
     page_title="Dashboard de Fundos de Investimentos",
     layout="wide"
 )
-
-# Função para limpar e padronizar CNPJs
-def clean_cnpj(cnpj):
-    if pd.isna(cnpj):
-        return ""
-    # Remove todos os caracteres não numéricos
-    cnpj_limpo = re.sub(r'[^0-9]', '', str(cnpj))
-    # Garante que tenha 14 dígitos, preenchendo com zeros à esquerda
-    return cnpj_limpo.zfill(14)
-
-# Função para limpar e padronizar nomes
-def clean_name(name):
-    if pd.isna(name):
-        return ""
-    # Converte para maiúsculas
-    name = str(name).upper()
-    # Remove caracteres especiais e números, mantendo apenas letras e espaços
-    name = re.sub(r'[^A-ZÀ-ÿ\s]', '', name)
-    # Remove espaços extras
-    name = ' '.join(name.split())
-    return name
+telemetry.begin_run()
 
 # Função para formatar valores monetários
 def format_currency(value):
@@ -48,59 +34,145 @@ def format_large_value(value):
     else:
         return f"R$ {value:,.0f}"
 
-# Carregar os dados
-@st.cache_data
-def load_data():
-    # Caminho base para os arquivos
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    
-    registro_fundo = pd.read_csv(os.path.join(base_dir, "registro_fundo.csv"), 
-                                encoding='latin1',
-                                sep=';',  
-                                on_bad_lines='skip',
-                                low_memory=False)
-    
-    oferta_resolucao_160 = pd.read_csv(os.path.join(base_dir, "oferta_resolucao_160.csv"), 
-                                      encoding='latin1',
-                                      sep=';',
-                                      on_bad_lines='skip',
-                                      low_memory=False)
-    
-    fidc_info = pd.read_csv(os.path.join(base_dir, "inf_mensal_fidc_202502/inf_mensal_fidc_tab_II_202502.csv"),
-                           encoding='latin1',
-                           sep=';',
-                           on_bad_lines='skip',
-                           low_memory=False)
-    
-    fidc_tab_vi = pd.read_csv(os.path.join(base_dir, 'inf_mensal_fidc_202502/inf_mensal_fidc_tab_VI_202502.csv'), 
-                              sep=';', 
-                              encoding='latin1',
-                              on_bad_lines='skip',
-                              low_memory=False)
-    
-    fidc_tab_vii = pd.read_csv(os.path.join(base_dir, 'inf_mensal_fidc_202502/inf_mensal_fidc_tab_VII_202502.csv'), 
-                               sep=';', 
-                               encoding='latin1',
-                               on_bad_lines='skip',
-                               low_memory=False) 
-
-    # Padronizar os CNPJs
-    registro_fundo["CNPJ_Fundo"] = registro_fundo["CNPJ_Fundo"].astype(str).apply(clean_cnpj)
-    oferta_resolucao_160["CNPJ_Emissor"] = oferta_resolucao_160["CNPJ_Emissor"].astype(str).apply(clean_cnpj)
-    fidc_info["CNPJ_FUNDO_CLASSE"] = fidc_info["CNPJ_FUNDO_CLASSE"].astype(str).apply(clean_cnpj)
-    fidc_tab_vi["CNPJ_FUNDO_CLASSE"] = fidc_tab_vi["CNPJ_FUNDO_CLASSE"].astype(str).apply(clean_cnpj)
-    fidc_tab_vii["CNPJ_FUNDO_CLASSE"] = fidc_tab_vii["CNPJ_FUNDO_CLASSE"].astype(str).apply(clean_cnpj)
-    
-    # Limpar e padronizar nomes
-    registro_fundo["Gestor"] = registro_fundo["Gestor"].apply(clean_name)
-    registro_fundo["Administrador"] = registro_fundo["Administrador"].apply(clean_name)
-    oferta_resolucao_160["Gestor"] = oferta_resolucao_160["Gestor"].apply(clean_name)
-    oferta_resolucao_160["Nome_Lider"] = oferta_resolucao_160["Nome_Lider"].apply(clean_name)
-    oferta_resolucao_160["Nome_Emissor"] = oferta_resolucao_160["Nome_Emissor"].apply(clean_name)
-    
-    return registro_fundo, oferta_resolucao_160, fidc_info, fidc_tab_vi, fidc_tab_vii
+# Linhas por página nas listagens e fundos no gráfico comparativo: limitam o tamanho da
+# página enviada ao navegador, qualquer que seja o número de fundos da gestora
+TAMANHO_PAGINA = 100
+LIMITE_GRAFICO = charts.MAX_BARRAS
+
+# Mostra o seletor de página quando a tabela não cabe em uma página e devolve a página escolhida
+def paginate(df, chave):
+    paginas = max(1, -(-len(df) // TAMANHO_PAGINA))
+    if paginas == 1:
+        return df
+    pagina = st.number_input(f"Página (de {paginas})", min_value=1, max_value=paginas, value=1, key=chave)
+    inicio = (pagina - 1) * TAMANHO_PAGINA
+    return df.iloc[inicio:inicio + TAMANHO_PAGINA]
+
+# Envia a figura ao navegador; a serialização do Plotly é medida como uma etapa própria.
+# Figuras acima de charts.MAX_PONTOS_FIGURA são cortadas antes do envio.
+def show_chart(fig, **kwargs):
+    with telemetry.span("graficos.plotly"):
+        cortados = charts.bound_figure(fig)
+        st.plotly_chart(fig, **kwargs)
+    if cortados:
+        st.caption(f"Gráfico reduzido: {cortados} pontos não exibidos.")
+
+# Cartão com os detalhes de um fundo da tabela de resumo
+def show_fund_card(fundo):
+    st.markdown(f"### Fundo: {fundo['Fundo']}")
+    st.write(f"**No que investe:** {fundo['No que investe']}")
+    st.write(f"**Caixa disponível:** {format_large_value(fundo['Patrimônio Líquido'])}")
+    st.write(f"**Administrador:** {fundo['Administrador']}")
+    st.write(f"**Média do mercado ({fundo['No que investe']}):** {format_large_value(fundo['Média do Mercado'])}")
+
+    comparacao_df = pd.DataFrame({
+        "Categoria": ["Este Fundo", "Média do Mercado"],
+        "Patrimônio Líquido": [fundo['Patrimônio Líquido'], fundo['Média do Mercado']]
+    })
+    fig = px.bar(comparacao_df, x="Categoria", y="Patrimônio Líquido",
+                 title=f"Comparação com o Mercado - {fundo['Fundo']}")
+    fig.update_layout(
+        yaxis_title="Patrimônio Líquido",
+        yaxis_tickformat=",~s",
+        yaxis_tickprefix="R$ "
+    )
+    show_chart(fig, key="chart_detalhe_fundo")
+
+# Cartão com os detalhes de uma oferta da tabela de resumo
+def show_offer_card(oferta):
+    st.markdown(f"### Oferta: {oferta['Oferta']}")
+    st.write(f"**Emissor:** {oferta['Emissor']}")
+    st.write(f"**CNPJ do Emissor:** {oferta['CNPJ do Emissor']}")
+    st.write(f"**Tipo de Oferta:** {oferta['Tipo de Oferta']}")
+    st.write(f"**Valor Total Registrado:** {format_large_value(oferta['Valor Total Registrado'])}")
+    st.write(f"**Status:** {oferta['Status']}")
+
+# Carregar os dados (queries.py).
+# A versão dos snapshots entra na chave do cache: depois de um `python ingest.py`,
+# o próximo rerun carrega os dados novos sem reiniciar o app.
+# cache_resource entrega o mesmo objeto a todas as sessões (sem pickle/cópia por acesso) e as
+# colunas numéricas apontam direto para os snapshots mapeados em memória, cujas páginas o
+# sistema operacional compartilha entre os processos. As tabelas são somente leitura:
+# o código das abas monta DataFrames novos em vez de alterar estas.
+@telemetry.cached(st.cache_resource(max_entries=2))
+def load_data(versao):
+    return queries.load_tables()
+
+# Índice por gestora montado uma vez por versão (cache_resource não copia o resultado)
+@telemetry.cached(st.cache_resource(max_entries=1))
+def load_index(versao):
+    return queries.build_index(load_data(versao))
+
+# Estatísticas de PL do mercado por tipo de fundo: dependem só do registro de fundos.
+# Usa o resultado gravado pelo ingest quando ele corresponde ao snapshot atual.
+@telemetry.cached(st.cache_data(max_entries=2))
+def load_market_stats(versao_registro, _versao_dados):
+    return queries.market_stats(lambda: load_data(_versao_dados))
+
+# Tabela fato por CNPJ (tabelas I, II, IV, VI, VII e X_2 + registro), gravada pelo ingest
+# ou montada uma vez por versão; compartilhada entre sessões como as tabelas do load_data
+@telemetry.cached(st.cache_resource(max_entries=1))
+def load_facts(versao):
+    return queries.fact_table()
+
+# Indicadores de cada FIDC com posição e percentil contra o mercado (gravados pelo ingest)
+@telemetry.cached(st.cache_resource(max_entries=1))
+def load_rankings(versao):
+    return queries.fidc_rankings(lambda: load_facts(versao))
+
+# Motor de cotas das tabelas X (séries por fundo em arrays compactos), um por versão
+@telemetry.cached(st.cache_resource(max_entries=1))
+def load_quotas(versao):
+    return queries.quota_engine()
+
+# Emissões concedidas por semana e categoria: datas já convertidas no snapshot, agregado
+# gravado pelo ingest ou calculado uma vez por versão das ofertas
+@telemetry.cached(st.cache_data(max_entries=2))
+def load_weekly_issuance(versao_ofertas, _versao_dados):
+    return queries.weekly_issuance(lambda: load_data(_versao_dados))
+
+# Linhas da gestora em cada tabela do dashboard (gestora=None: todos os FIDCs)
+def select_gestora(gestora, versao):
+    return queries.select_gestora(load_data(versao), load_index(versao), gestora)
+
+# Resultados de cada aba memorizados por gestora e versão dos dados: só a aba aberta os
+# calcula, e voltar a uma aba já vista não refaz o trabalho.
+
+# Métricas da aba de FIDCs (metrics.METRICAS), uma passada por tabela
+@telemetry.cached(st.cache_data(max_entries=64))
+def load_fidc_metrics(gestora, versao):
+    return queries.fidc_metrics(select_gestora(gestora, versao))
+
+# Resumo dos fundos da gestora com a média do mercado do mesmo tipo
+@telemetry.cached(st.cache_data(max_entries=64))
+def load_fund_summary(gestora, versao):
+    estatisticas_mercado = load_market_stats(storage.snapshot_version("registro_fundo"), versao)
+    return queries.fund_summary(select_gestora(gestora, versao), estatisticas_mercado)
 
-registro_fundo, oferta_resolucao_160, fidc_tab_ii, fidc_tab_vi, fidc_tab_vii = load_data()
+# Resumo das ofertas da gestora
+@telemetry.cached(st.cache_data(max_entries=64))
+def load_offer_summary(gestora, versao):
+    return queries.offer_summary(select_gestora(gestora, versao))
+
+# Dados dos gráficos por FIDC, já reduzidos (charts), e a visão consolidada por fundo
+# (tabela fato, filtrada pela chave inteira do CNPJ)
+@telemetry.cached(st.cache_data(max_entries=64))
+def load_fidc_view(gestora, versao, versao_fatos):
+    return queries.fidc_view(select_gestora(gestora, versao), load_facts(versao_fatos), load_rankings(versao_fatos))
+
+# Estrutura de cotas (classes sênior, mezanino e subordinada) dos FIDCs da gestora
+@telemetry.cached(st.cache_data(max_entries=64))
+def load_quota_view(gestora, versao, versao_cotas, versao_fatos):
+    return queries.quota_view(select_gestora(gestora, versao), load_quotas(versao_cotas), load_facts(versao_fatos))
+
+# Evolução mensal (PL e inadimplência) dos FIDCs da gestora, carregando só as competências necessárias
+@telemetry.cached(st.cache_data(max_entries=64))
+def load_gestora_history(cnpjs, versao_manifesto):
+    return queries.gestora_history(cnpjs)
+
+versao_dados = queries.data_version()
+indice_gestoras = load_index(versao_dados)
+estatisticas_mercado = load_market_stats(storage.snapshot_version("registro_fundo"), versao_dados)
 
 # Adicionando o logo e o cabeçalho
 try:
@@ -135,28 +207,24 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Criar lista única de gestores (assets)
-assets_registro = set(registro_fundo["Gestor"].dropna().unique())
-assets_oferta = set(oferta_resolucao_160["Gestor"].dropna().unique())
+# Lista única de gestoras das duas fontes, já montada no índice (grafias da mesma gestora reunidas)
+assets_disponiveis = indice_gestoras["gestoras"]
 
-# Unir as duas fontes para ter todas as gestoras possíveis e remover strings vazias
-assets_disponiveis = sorted([asset for asset in assets_registro.union(assets_oferta) if asset.strip()])
-
-# Sidebar para selecionar a Asset
+# Sidebar para selecionar a Asset: a busca (sem acentos, por prefixo ou nome parecido)
+# reduz a lista do selectbox às gestoras que casam com o texto digitado
 st.sidebar.markdown("<h2 style='text-align: center; color: #2ca356;'>Selecionar Gestora</h2>", unsafe_allow_html=True)
-selected_asset = st.sidebar.selectbox("Escolha uma Gestora:", assets_disponiveis)
-
-# Filtrar dados da Asset escolhida
-fundos_asset = registro_fundo[registro_fundo["Gestor"] == selected_asset]
-ofertas_asset = oferta_resolucao_160[oferta_resolucao_160["Gestor"] == selected_asset]
-
-# Criar uma lista de CNPJs dos fundos da gestora selecionada
-cnpjs_fundos_gestora = fundos_asset["CNPJ_Fundo"].unique().tolist()
+busca_gestora = st.sidebar.text_input("Buscar gestora:", key="busca_gestora", placeholder="Parte do nome")
+opcoes_gestoras = assets_disponiveis
+if busca_gestora.strip():
+    opcoes_gestoras = search.search(indice_gestoras["busca"], busca_gestora)
+    if not opcoes_gestoras:
+        st.sidebar.info("Nenhuma gestora encontrada; mostrando todas.")
+        opcoes_gestoras = assets_disponiveis
+selected_asset = st.sidebar.selectbox("Escolha uma Gestora:", opcoes_gestoras)
 
-# Filtrar FIDCs pelos CNPJs dos fundos da gestora
-fidc_ii_gestora = fidc_tab_ii[fidc_tab_ii["CNPJ_FUNDO_CLASSE"].isin(cnpjs_fundos_gestora)]
-fidc_vi_gestora = fidc_tab_vi[fidc_tab_vi["CNPJ_FUNDO_CLASSE"].isin(cnpjs_fundos_gestora)]
-fidc_vii_gestora = fidc_tab_vii[fidc_tab_vii["CNPJ_FUNDO_CLASSE"].isin(cnpjs_fundos_gestora)]
+grafias = indice_gestoras["aliases"].get(selected_asset, [])
+if len(grafias) > 1:
+    st.sidebar.caption(f"Também registrada como: {'; '.join(grafias[1:])}")
 
 # Título personalizado com a gestora selecionada
 st.markdown(f"""
@@ -165,119 +233,143 @@ st.markdown(f"""
 </div>
 """, unsafe_allow_html=True)
 
-# Criar abas para Fundos, Ofertas, FIDCs e Emissões
-tab1, tab2, tab3, tab4 = st.tabs(["Fundos", "Ofertas", "FIDCs", "Emissões"])
+# Navegação entre Fundos, Ofertas, FIDCs e Emissões: ao contrário de st.tabs, que executa
+# e envia o conteúdo de todas as abas a cada rerun, só a visão escolhida é montada
+aba_ativa = st.radio("Visão", ["Fundos", "Ofertas", "FIDCs", "Emissões"], horizontal=True,
+                     key="aba", label_visibility="collapsed")
 
 # Aba de Fundos
-with tab1:
-    if not fundos_asset.empty:
-        # Adicionar contador para gerar chaves únicas
-        for idx, (_, fundo) in enumerate(fundos_asset.iterrows()):
-            st.markdown(f"### Fundo: {fundo['Denominacao_Social']}")
-            st.write(f"**No que investe:** {fundo['Tipo_Fundo']}")
-            st.write(f"**Caixa disponível:** {format_large_value(fundo['Patrimonio_Liquido'])}")
-            st.write(f"**Administrador:** {fundo['Administrador']}")
-
-            # Comparação com o mercado
-            tipo_fundo = fundo['Tipo_Fundo']
-            media_mercado = registro_fundo[registro_fundo['Tipo_Fundo'] == tipo_fundo]['Patrimonio_Liquido'].mean()
-            st.write(f"**Média do mercado ({tipo_fundo}):** {format_large_value(media_mercado)}")
-
-            # Gráfico de comparação
-            comparacao_df = pd.DataFrame({
-                "Categoria": ["Este Fundo", "Média do Mercado"],
-                "Patrimônio Líquido": [fundo['Patrimonio_Liquido'], media_mercado]
-            })
-            fig = px.bar(comparacao_df, x="Categoria", y="Patrimônio Líquido", 
-                        title=f"Comparação com o Mercado - {fundo['Denominacao_Social']}")
-            fig.update_layout(
-                yaxis_title="Patrimônio Líquido",
-                yaxis_tickformat=",~s",
-                yaxis_tickprefix="R$ "
-            )
-            # Usar o índice junto com o CNPJ para garantir chave única
-            st.plotly_chart(fig, key=f"chart_{idx}_{fundo['CNPJ_Fundo']}")
-            st.write("---")  # Linha divisória entre fundos
+def show_funds_tab():
+    resumo_fundos = load_fund_summary(selected_asset, versao_dados)
+    if not resumo_fundos.empty:
+        st.markdown(f"### {len(resumo_fundos)} fundos")
+        pagina_fundos = paginate(resumo_fundos, "pagina_fundos")
+        st.dataframe(
+            pagina_fundos,
+            hide_index=True,
+            use_container_width=True,
+            column_config={
+                "Patrimônio Líquido": st.column_config.NumberColumn("Patrimônio Líquido", format="R$ %.2f"),
+                "Média do Mercado": st.column_config.NumberColumn("Média do Mercado", format="R$ %.2f"),
+                "Diferença (%)": st.column_config.NumberColumn("Diferença (%)", format="%.1f%%"),
+            }
+        )
+
+        # Um único gráfico comparando os maiores fundos com a média do mercado do seu tipo
+        maiores = resumo_fundos.nlargest(LIMITE_GRAFICO, "Patrimônio Líquido")
+        fig = go.Figure([
+            go.Bar(name="Este Fundo", x=maiores["Fundo"], y=maiores["Patrimônio Líquido"]),
+            go.Bar(name="Média do Mercado", x=maiores["Fundo"], y=maiores["Média do Mercado"]),
+        ])
+        fig.update_layout(
+            title="Comparação com o Mercado",
+            barmode="group",
+            yaxis_title="Patrimônio Líquido",
+            yaxis_tickformat=",~s",
+            yaxis_tickprefix="R$ "
+        )
+        show_chart(fig, use_container_width=True, key="chart_fundos")
+        if len(resumo_fundos) > LIMITE_GRAFICO:
+            st.caption(f"Gráfico com os {LIMITE_GRAFICO} maiores fundos por Patrimônio Líquido.")
+
+        # Detalhes montados só para o fundo escolhido (da página atual)
+        fundos_pagina = {f"{f} ({c})": i for i, (f, c) in enumerate(zip(pagina_fundos["Fundo"], pagina_fundos["CNPJ"]))}
+        escolhido = st.selectbox("Ver detalhes do fundo:", ["—"] + list(fundos_pagina), key="detalhe_fundo")
+        if escolhido in fundos_pagina:
+            show_fund_card(pagina_fundos.iloc[fundos_pagina[escolhido]])
     else:
         st.write("Nenhum fundo encontrado para esta gestora.")
 
 # Aba de Ofertas
-with tab2:
-    if not ofertas_asset.empty:
-        for _, oferta in ofertas_asset.iterrows():
-            st.markdown(f"### Oferta: {oferta['Numero_Requerimento']}")
-            st.write(f"**Emissor:** {oferta['Nome_Emissor']}")
-            st.write(f"**CNPJ do Emissor:** {oferta['CNPJ_Emissor']}")
-            st.write(f"**Tipo de Oferta:** {oferta['Tipo_Oferta']}")
-            st.write(f"**Valor Total Registrado:** {format_large_value(oferta['Valor_Total_Registrado'])}")
-            st.write(f"**Status:** {oferta['Status_Requerimento']}")
-            st.write("---")  # Adiciona uma linha divisória entre as ofertas
+def show_offers_tab():
+    resumo_ofertas = load_offer_summary(selected_asset, versao_dados)
+    if not resumo_ofertas.empty:
+        st.markdown(f"### {len(resumo_ofertas)} ofertas")
+        pagina_ofertas = paginate(resumo_ofertas, "pagina_ofertas")
+        st.dataframe(
+            pagina_ofertas,
+            hide_index=True,
+            use_container_width=True,
+            column_config={
+                "Valor Total Registrado": st.column_config.NumberColumn("Valor Total Registrado", format="R$ %.2f"),
+            }
+        )
+
+        ofertas_pagina = {o: i for i, o in enumerate(pagina_ofertas["Oferta"])}
+        escolhida = st.selectbox("Ver detalhes da oferta:", ["—"] + list(ofertas_pagina), key="detalhe_oferta")
+        if escolhida in ofertas_pagina:
+            show_offer_card(pagina_ofertas.iloc[ofertas_pagina[escolhida]])
     else:
         st.write("Nenhuma oferta encontrada para esta gestora.")
 
 # Aba de FIDCs
-with tab3:
+def show_fidc_tab():
     st.header("Análise de FIDCs")
     
     # Verificar se existem FIDCs para esta gestora
-    if fidc_ii_gestora.empty and fidc_vi_gestora.empty and fidc_vii_gestora.empty:
+    selecao = select_gestora(selected_asset, versao_dados)
+    fundos_asset = selecao["fundos"]
+    if selecao["fidc_tab_ii"].empty and selecao["fidc_tab_vi"].empty and selecao["fidc_tab_vii"].empty:
         st.warning(f"Não foram encontrados FIDCs específicos para a gestora {selected_asset}. Mostrando dados gerais.")
         # Usar os dados gerais
-        fidc_ii_para_analise = fidc_tab_ii
-        fidc_vi_para_analise = fidc_tab_vi
-        fidc_vii_para_analise = fidc_tab_vii
+        gestora_analise = None
+        analise = select_gestora(None, versao_dados)
         
         titulo_graficos = f"Geral (Todos os FIDCs)"
     else:
         # Usar os dados específicos da gestora
-        fidc_ii_para_analise = fidc_ii_gestora
-        fidc_vi_para_analise = fidc_vi_gestora
-        fidc_vii_para_analise = fidc_vii_gestora
+        gestora_analise = selected_asset
+        analise = selecao
         
-        st.success(f"Mostrando {len(fidc_ii_para_analise)} FIDCs geridos por {selected_asset}")
+        st.success(f"Mostrando {len(analise['fidc_tab_ii'])} FIDCs geridos por {selected_asset}")
         titulo_graficos = selected_asset
     
+    fidc_ii_para_analise = analise["fidc_tab_ii"]
+    fidc_vi_para_analise = analise["fidc_tab_vi"]
+    fidc_vii_para_analise = analise["fidc_tab_vii"]
+    metricas_fidc = load_fidc_metrics(gestora_analise, versao_dados)
+    versao_fatos = queries.facts_version()
+    visao_fidc = load_fidc_view(gestora_analise, versao_dados, versao_fatos)
+    
     # Métricas gerais
-    col1, col2, col3 = st.columns(3)
-        
-    with col1:
-        total_com_risco = fidc_vii_para_analise['TAB_VII_A1_2_VL_DIRCRED_RISCO'].sum()
-        st.metric("Dir. Creditórios com Risco", format_large_value(total_com_risco))
-            
-    with col2:
-        total_sem_risco = fidc_vii_para_analise['TAB_VII_A2_2_VL_DIRCRED_SEM_RISCO'].sum()
-        st.metric("Dir. Creditórios sem Risco", format_large_value(total_sem_risco))
-            
-    with col3:
-        total_inadimplente = fidc_vii_para_analise['TAB_VII_A5_2_VL_DIRCRED_INAD'].sum()
-        st.metric("Valor Inadimplente", format_large_value(total_inadimplente))
+    for coluna, (nome, valor) in zip(st.columns(3), metricas_fidc["carteira"].items()):
+        with coluna:
+            st.metric(nome, format_large_value(valor))
+    
+    # PL do mercado para os tipos de fundo analisados (mesmas estatísticas da aba Fundos)
+    cnpjs_analisados = fidc_ii_para_analise['CNPJ_FUNDO_CLASSE'].unique()
+    tipos_fidc = fundos_asset.loc[fundos_asset['CNPJ_Fundo'].isin(cnpjs_analisados), 'Tipo_Fundo'].dropna().unique()
+    if len(tipos_fidc) == 0:
+        tipos_fidc = [tipo for tipo in estatisticas_mercado.index if 'FIDC' in str(tipo).upper()]
+    
+    if len(tipos_fidc) > 0:
+        st.subheader("Patrimônio Líquido do Mercado")
+        pl_mercado = estatisticas_mercado.loc[estatisticas_mercado.index.isin(tipos_fidc)]
+        st.dataframe(
+            pd.DataFrame({
+                'Tipo de Fundo': pl_mercado.index,
+                'Fundos': pl_mercado['fundos'],
+                'Média': pl_mercado['media'].map(format_large_value),
+                'Mediana': pl_mercado['mediana'].map(format_large_value),
+                'P25': pl_mercado['p25'].map(format_large_value),
+                'P75': pl_mercado['p75'].map(format_large_value),
+                'P90': pl_mercado['p90'].map(format_large_value)
+            }),
+            hide_index=True
+        )
     
     # Análise Setorial (Tabela II)
     st.subheader("Análise Setorial")
     
-    # Calcular totais por setor
-    setores = {
-        'Industrial': fidc_ii_para_analise['TAB_II_A_VL_INDUST'].sum(),
-        'Imobiliário': fidc_ii_para_analise['TAB_II_B_VL_IMOBIL'].sum(),
-        'Comercial': fidc_ii_para_analise['TAB_II_C_VL_COMERC'].sum(),
-        'Serviços': fidc_ii_para_analise['TAB_II_D_VL_SERV'].sum(),
-        'Agronegócio': fidc_ii_para_analise['TAB_II_E_VL_AGRONEG'].sum(),
-        'Financeiro': fidc_ii_para_analise['TAB_II_F_VL_FINANC'].sum(),
-        'Crédito': fidc_ii_para_analise['TAB_II_G_VL_CREDITO'].sum(),
-        'Factoring': fidc_ii_para_analise['TAB_II_H_VL_FACTOR'].sum(),
-        'Setor Público': fidc_ii_para_analise['TAB_II_I_VL_SETOR_PUBLICO'].sum(),
-        'Judicial': fidc_ii_para_analise['TAB_II_J_VL_JUDICIAL'].sum(),
-        'Marca': fidc_ii_para_analise['TAB_II_K_VL_MARCA'].sum()
-    }
-    
-    # Remover setores com valor zero
-    setores = {k: v for k, v in setores.items() if v > 0}
+    # Totais por setor, sem os setores com valor zero
+    setores = metricas_fidc["setores"]
+    setores = setores[setores > 0]
     
-    if setores:
+    if not setores.empty:
         # Criar DataFrame para o gráfico de pizza setorial
         setores_df = pd.DataFrame({
-            'Setor': list(setores.keys()),
-            'Valor': list(setores.values())
+            'Setor': setores.index,
+            'Valor': setores.to_numpy()
         })
         
         # Gráfico de pizza da distribuição setorial
@@ -288,53 +380,37 @@ with tab3:
             title=f'Distribuição da Carteira por Setor - {titulo_graficos}',
             hole=0.3
         )
-        st.plotly_chart(fig_setores)
+        show_chart(fig_setores)
     else:
         st.info("Não há dados setoriais disponíveis para esta gestora.")
     
     # Top FIDCs por valor total da carteira
     if not fidc_ii_para_analise.empty:
         st.subheader("FIDCs por Valor Total da Carteira")
-        fidc_ii_para_analise['Valor_Total_Carteira'] = fidc_ii_para_analise['TAB_II_VL_CARTEIRA']
-        fidc_ii_para_analise['Valor_Formatado'] = fidc_ii_para_analise['Valor_Total_Carteira'].apply(format_large_value)
-        carteira_df = fidc_ii_para_analise[['DENOM_SOCIAL', 'Valor_Total_Carteira']].sort_values('Valor_Total_Carteira', ascending=False)
+        carteira = visao_fidc["carteira"]
         
-        fig_carteira = px.bar(
-            carteira_df,
-            x='DENOM_SOCIAL',
-            y='Valor_Total_Carteira',
-            title=f'FIDCs por Valor Total da Carteira - {titulo_graficos}'
-        )
+        fig_carteira = charts.bar_figure(carteira, f'FIDCs por Valor Total da Carteira - {titulo_graficos}')
         fig_carteira.update_layout(
             xaxis_tickangle=-45,
             yaxis_title="Valor Total",
             yaxis_tickformat=",~s",
             yaxis_tickprefix="R$ "
         )
-        st.plotly_chart(fig_carteira)
+        show_chart(fig_carteira)
+        if carteira["agrupados"]:
+            st.caption(f"Os {carteira['agrupados']} FIDCs fora dos {LIMITE_GRAFICO - 1} maiores estão somados em \"Outros\".")
     
     # Análise do Setor Financeiro
     if not fidc_ii_para_analise.empty:
         st.subheader("Detalhamento do Setor Financeiro")
         
-        financeiro = {
-            'Crédito Pessoal': fidc_ii_para_analise['TAB_II_F1_VL_CRED_PESSOA'].sum(),
-            'Crédito Consignado': fidc_ii_para_analise['TAB_II_F2_VL_CRED_PESSOA_CONSIG'].sum(),
-            'Crédito Corporativo': fidc_ii_para_analise['TAB_II_F3_VL_CRED_CORP'].sum(),
-            'Middle Market': fidc_ii_para_analise['TAB_II_F4_VL_MIDMARKET'].sum(),
-            'Financ. Veículos': fidc_ii_para_analise['TAB_II_F5_VL_VEICULO'].sum(),
-            'Financ. Imob. Empresarial': fidc_ii_para_analise['TAB_II_F6_VL_IMOBIL_EMPRESA'].sum(),
-            'Financ. Imob. Residencial': fidc_ii_para_analise['TAB_II_F7_VL_IMOBIL_RESID'].sum(),
-            'Outros': fidc_ii_para_analise['TAB_II_F8_VL_OUTRO'].sum()
-        }
+        financeiro = metricas_fidc["financeiro"]
+        financeiro = financeiro[financeiro > 0]
         
-        # Remover categorias com valor zero
-        financeiro = {k: v for k, v in financeiro.items() if v > 0}
-        
-        if financeiro:
+        if not financeiro.empty:
             financeiro_df = pd.DataFrame({
-                'Tipo': list(financeiro.keys()),
-                'Valor': list(financeiro.values())
+                'Tipo': financeiro.index,
+                'Valor': financeiro.to_numpy()
             })
             
             fig_financeiro = px.bar(
@@ -349,7 +425,7 @@ with tab3:
                 yaxis_tickformat=",~s",
                 yaxis_tickprefix="R$ "
             )
-            st.plotly_chart(fig_financeiro)
+            show_chart(fig_financeiro)
         else:
             st.info("Não há dados do setor financeiro disponíveis para esta gestora.")
     
@@ -357,24 +433,13 @@ with tab3:
     if not fidc_vi_para_analise.empty:
         st.subheader("Análise de Prazos e Vencimentos")
         
-        prazos = {
-            '30 dias': fidc_vi_para_analise['TAB_VI_A1_VL_PRAZO_VENC_30'].sum(),
-            '60 dias': fidc_vi_para_analise['TAB_VI_A2_VL_PRAZO_VENC_60'].sum(),
-            '90 dias': fidc_vi_para_analise['TAB_VI_A3_VL_PRAZO_VENC_90'].sum(),
-            '180 dias': fidc_vi_para_analise['TAB_VI_A6_VL_PRAZO_VENC_180'].sum(),
-            '360 dias': fidc_vi_para_analise['TAB_VI_A7_VL_PRAZO_VENC_360'].sum(),
-            'Acima de 360 dias': fidc_vi_para_analise['TAB_VI_A8_VL_PRAZO_VENC_720'].sum() + 
-                                fidc_vi_para_analise['TAB_VI_A9_VL_PRAZO_VENC_1080'].sum() + 
-                                fidc_vi_para_analise['TAB_VI_A10_VL_PRAZO_VENC_MAIOR_1080'].sum()
-        }
-        
-        # Remover prazos com valor zero
-        prazos = {k: v for k, v in prazos.items() if v > 0}
+        prazos = metricas_fidc["prazos"]
+        prazos = prazos[prazos > 0]
         
-        if prazos:
+        if not prazos.empty:
             prazos_df = pd.DataFrame({
-                'Prazo': list(prazos.keys()),
-                'Valor': list(prazos.values())
+                'Prazo': prazos.index,
+                'Valor': prazos.to_numpy()
             })
             
             fig_prazos = px.bar(
@@ -388,7 +453,7 @@ with tab3:
                 yaxis_tickformat=",~s",
                 yaxis_tickprefix="R$ "
             )
-            st.plotly_chart(fig_prazos)
+            show_chart(fig_prazos)
         else:
             st.info("Não há dados de prazos disponíveis para esta gestora.")
     
@@ -396,130 +461,190 @@ with tab3:
     if not fidc_vii_para_analise.empty:
         st.subheader("Análise de Inadimplência")
         
-        fidc_vii_para_analise['Valor_Total'] = fidc_vii_para_analise['TAB_VII_A1_2_VL_DIRCRED_RISCO'] + fidc_vii_para_analise['TAB_VII_A2_2_VL_DIRCRED_SEM_RISCO']
-        fidc_vii_para_analise['Taxa_Inadimplencia'] = (fidc_vii_para_analise['TAB_VII_A5_2_VL_DIRCRED_INAD'] / fidc_vii_para_analise['Valor_Total'] * 100).fillna(0)
-        inadimplencia_df = fidc_vii_para_analise[['DENOM_SOCIAL', 'Taxa_Inadimplencia']].sort_values('Taxa_Inadimplencia', ascending=False)
+        inadimplencia = visao_fidc["inadimplencia"]
+        
+        if len(inadimplencia["x"]) > 0:
+            if inadimplencia["tipo"] == "barras":
+                fig_inadimplencia = charts.bar_figure(inadimplencia, f'Taxa de Inadimplência (%) por FIDC - {titulo_graficos}')
+                fig_inadimplencia.update_layout(xaxis_tickangle=-45, yaxis_title="Taxa de Inadimplência (%)")
+            else:
+                # FIDCs demais para uma barra por fundo: quantidade de FIDCs em cada faixa de taxa
+                fig_inadimplencia = charts.bar_figure(inadimplencia, f'FIDCs por Taxa de Inadimplência - {titulo_graficos}')
+                fig_inadimplencia.update_layout(xaxis_title="Taxa de Inadimplência", yaxis_title="Quantidade de FIDCs")
+            show_chart(fig_inadimplencia)
+        else:
+            st.info("Não há dados de inadimplência disponíveis para esta gestora.")
+    
+    # Visão cruzada por fundo a partir da tabela fato
+    visao_fundos = visao_fidc["fundos"]
+    if not visao_fundos.empty:
+        st.subheader("Visão Consolidada por Fundo")
+        st.dataframe(
+            paginate(visao_fundos, "pagina_visao_fundos"),
+            hide_index=True,
+            use_container_width=True,
+            column_config={
+                'Patrimônio Líquido': st.column_config.NumberColumn('Patrimônio Líquido', format="R$ %.2f"),
+                'Carteira': st.column_config.NumberColumn('Carteira', format="R$ %.2f"),
+                'Inadimplência (%)': st.column_config.NumberColumn('Inadimplência (%)', format="%.2f%%"),
+                'Com Risco (%)': st.column_config.NumberColumn('Com Risco (%)', format="%.1f%%"),
+                'Vencimento até 90 dias (%)': st.column_config.NumberColumn('Vencimento até 90 dias (%)', format="%.1f%%"),
+                'Prazo Médio (dias)': st.column_config.NumberColumn('Prazo Médio (dias)', format="%.0f"),
+                # Percentil no mercado: % dos FIDCs da competência com valor menor ou igual
+                'Percentil PL': st.column_config.ProgressColumn('Percentil PL', format="%.0f", min_value=0, max_value=100),
+                'Percentil Inadimplência': st.column_config.ProgressColumn(
+                    'Percentil Inadimplência', format="%.0f", min_value=0, max_value=100),
+            }
+        )
+    
+    # Classes de cota dos FIDCs (tabelas X_1, X_2, X_3 e X_6)
+    estrutura_cotas = load_quota_view(gestora_analise, versao_dados, queries.quotas_version(), versao_fatos)
+    if not estrutura_cotas["fundos"].empty:
+        st.subheader("Estrutura de Cotas")
+        classes = estrutura_cotas["classes"][estrutura_cotas["classes"] != 0]
+        fig_cotas = charts.bar_figure({"x": classes.index.to_numpy(), "y": classes.to_numpy()},
+                                      f'Valor das Cotas por Classe - {titulo_graficos}')
+        fig_cotas.update_layout(yaxis_title="Valor das Cotas", yaxis_tickformat=",~s", yaxis_tickprefix="R$ ")
+        show_chart(fig_cotas)
+        st.dataframe(
+            paginate(estrutura_cotas["fundos"], "pagina_cotas"),
+            hide_index=True,
+            use_container_width=True,
+            column_config={
+                'Sênior': st.column_config.NumberColumn('Sênior', format="R$ %.2f"),
+                'Mezanino': st.column_config.NumberColumn('Mezanino', format="R$ %.2f"),
+                'Subordinada': st.column_config.NumberColumn('Subordinada', format="R$ %.2f"),
+                'Subordinação (%)': st.column_config.NumberColumn('Subordinação (%)', format="%.1f%%"),
+                'Cotistas': st.column_config.NumberColumn('Cotistas', format="%d"),
+            }
+        )
+
+    # Evolução histórica dos FIDCs da gestora
+    if not selecao["fidc_tab_ii"].empty:
+        st.subheader("Evolução Histórica")
+        evolucao = load_gestora_history(tuple(selecao["fidc_tab_ii"]['CNPJ_FUNDO_CLASSE'].unique()),
+                                        storage.manifest_version())
         
-        if not inadimplencia_df.empty:
-            fig_inadimplencia = px.bar(
-                inadimplencia_df,
-                x='DENOM_SOCIAL',
+        if len(evolucao) > 1:
+            fig_evolucao_pl = px.line(
+                evolucao,
+                x='Competencia',
+                y='PL',
+                markers=True,
+                title=f'Patrimônio Líquido dos FIDCs por Competência - {titulo_graficos}'
+            )
+            fig_evolucao_pl.update_layout(
+                xaxis_title="Competência",
+                yaxis_title="Patrimônio Líquido",
+                yaxis_tickformat=",~s",
+                yaxis_tickprefix="R$ "
+            )
+            show_chart(fig_evolucao_pl)
+            
+            fig_evolucao_inad = px.line(
+                evolucao,
+                x='Competencia',
                 y='Taxa_Inadimplencia',
-                title=f'Taxa de Inadimplência (%) por FIDC - {titulo_graficos}'
+                markers=True,
+                title=f'Taxa de Inadimplência (%) por Competência - {titulo_graficos}'
             )
-            fig_inadimplencia.update_layout(
-                xaxis_tickangle=-45,
+            fig_evolucao_inad.update_layout(
+                xaxis_title="Competência",
                 yaxis_title="Taxa de Inadimplência (%)"
             )
-            st.plotly_chart(fig_inadimplencia)
+            show_chart(fig_evolucao_inad)
         else:
-            st.info("Não há dados de inadimplência disponíveis para esta gestora.")
+            st.info("O histórico aparece quando houver mais de uma competência do informe mensal disponível.")
 
 # Aba de Emissões
-with tab4:
-    st.markdown(f"**Período de análise:** 24/03/2025 - 28/03/2025")
-    st.markdown("A variação é em relação ao volume da semana anterior.")
-    
-    # Filtrar apenas registros concedidos
-    df_emissoes = oferta_resolucao_160[
-        oferta_resolucao_160['Status_Requerimento'] == 'Registro Concedido'
-    ].copy()
-    
-    # Converter data para datetime com tratamento de diferentes formatos
-    def convert_date(date_str):
-        try:
-            # Tenta primeiro o formato ISO
-            return pd.to_datetime(date_str)
-        except:
-            try:
-                # Tenta o formato dd/mm/yyyy
-                return pd.to_datetime(date_str, format='%d/%m/%Y')
-            except:
-                # Retorna NaT (Not a Time) se nenhum formato funcionar
-                return pd.NaT
-
-    df_emissoes['Data_Registro'] = df_emissoes['Data_Registro'].apply(convert_date)
-    
-    # Definir datas fixas para a semana desejada
-    ultima_sexta = pd.to_datetime('2025-03-28')  # Sexta-feira
-    ultima_segunda = pd.to_datetime('2025-03-24')  # Segunda-feira
-    
-    sexta_anterior = ultima_sexta - timedelta(days=7)  # Sexta-feira anterior
-    segunda_anterior = ultima_segunda - timedelta(days=7)  # Segunda-feira anterior
-    
-    # Filtrar emissões por período
-    emissoes_atuais = df_emissoes[
-        (df_emissoes['Data_Registro'] >= ultima_segunda) & 
-        (df_emissoes['Data_Registro'] <= ultima_sexta)
-    ]
-    
-    emissoes_anteriores = df_emissoes[
-        (df_emissoes['Data_Registro'] >= segunda_anterior) & 
-        (df_emissoes['Data_Registro'] <= sexta_anterior)
-    ]
-    
-    # Calcular métricas
-    metricas_atuais = emissoes_atuais.groupby('Valor_Mobiliario').agg({
-        'Valor_Mobiliario': 'count',
-        'Valor_Total_Registrado': 'sum'
-    }).rename(columns={'Valor_Mobiliario': 'Emissões'})
-    
-    # Calcular métricas anteriores
-    metricas_anteriores = emissoes_anteriores.groupby('Valor_Mobiliario')['Valor_Total_Registrado'].sum()
-    
-    # Calcular variação
-    metricas_atuais['Variação'] = metricas_atuais.apply(
-        lambda row: ((row['Valor_Total_Registrado'] / metricas_anteriores.get(row.name, row['Valor_Total_Registrado'])) - 1) * 100 
-        if row.name in metricas_anteriores.index else float('nan'),
-        axis=1
-    )
-    
-    # Formatar valores
-    metricas_atuais['Volume'] = metricas_atuais['Valor_Total_Registrado'].apply(
-        lambda x: f"R$ {x/1e9:.2f}bi" if x >= 1e9 else f"R$ {x/1e6:.0f}mi"
-    )
-    
-    metricas_atuais['Variação'] = metricas_atuais['Variação'].apply(
-        lambda x: f"{x:.1f}%" if pd.notnull(x) else "N/A"
-    )
-    
-    # Criar tabela final
-    tabela_final = pd.DataFrame({
-        'Categoria': metricas_atuais.index,
-        'Emissões': metricas_atuais['Emissões'],
-        'Volume': metricas_atuais['Volume'],
-        'Variação': metricas_atuais['Variação']
-    })
-    
-    # Ordenar por número de emissões
-    tabela_final = tabela_final.sort_values('Emissões', ascending=False)
-    
-    # Exibir tabela
-    st.dataframe(
-        tabela_final,
-        hide_index=True,
-        column_config={
-            "Categoria": st.column_config.TextColumn(
-                "Categoria",
-                width="medium"
-            ),
-            "Emissões": st.column_config.NumberColumn(
-                "Emissões",
-                format="%d"
-            ),
-            "Volume": st.column_config.TextColumn(
-                "Volume",
-                width="small"
-            ),
-            "Variação": st.column_config.TextColumn(
-                "Variação",
-                width="small"
-            )
-        }
-    )
+def show_issuance_tab():
+    emissoes_semanais = load_weekly_issuance(storage.snapshot_version("oferta_resolucao_160"), versao_dados)
+    semanas = aggregates.issuance_weeks(emissoes_semanais)
+
+    if not semanas:
+        st.info("Nenhuma emissão concedida com data de registro válida.")
+    else:
+        # Semana de análise (segunda a sexta); a mais recente por padrão
+        periodos = {f"{s:%d/%m/%Y} - {s + pd.Timedelta(days=4):%d/%m/%Y}": s for s in semanas}
+        semana = periodos[st.selectbox("Período de análise:", list(periodos))]
+        st.markdown("A variação é em relação ao volume da semana anterior.")
+
+        metricas_atuais = aggregates.week_over_week(emissoes_semanais, semana)
+
+        # Formatar valores
+        volume = metricas_atuais['Volume'].to_numpy()
+        volume_formatado = np.where(
+            volume >= 1e9,
+            np.char.mod("R$ %.2fbi", volume / 1e9),
+            np.char.mod("R$ %.0fmi", volume / 1e6),
+        )
+        variacao = metricas_atuais['Variacao'].to_numpy()
+        variacao_formatada = np.where(np.isnan(variacao), "N/A", np.char.mod("%.1f%%", variacao))
+
+        # Criar tabela final (já ordenada por número de emissões)
+        tabela_final = pd.DataFrame({
+            'Categoria': metricas_atuais.index.astype(str),
+            'Emissões': metricas_atuais['Emissoes'].to_numpy(),
+            'Volume': volume_formatado,
+            'Variação': variacao_formatada
+        })
+
+        # Exibir tabela
+        st.dataframe(
+            tabela_final,
+            hide_index=True,
+            column_config={
+                "Categoria": st.column_config.TextColumn(
+                    "Categoria",
+                    width="medium"
+                ),
+                "Emissões": st.column_config.NumberColumn(
+                    "Emissões",
+                    format="%d"
+                ),
+                "Volume": st.column_config.TextColumn(
+                    "Volume",
+                    width="small"
+                ),
+                "Variação": st.column_config.TextColumn(
+                    "Variação",
+                    width="small"
+                )
+            }
+        )
+
+# Só a visão escolhida executa
+ABAS = {
+    "Fundos": ("aba.fundos", show_funds_tab),
+    "Ofertas": ("aba.ofertas", show_offers_tab),
+    "FIDCs": ("aba.fidcs", show_fidc_tab),
+    "Emissões": ("aba.emissoes", show_issuance_tab),
+}
+etapa_aba, mostrar_aba = ABAS[aba_ativa]
+with telemetry.span(etapa_aba):
+    mostrar_aba()
 
 st.sidebar.info("Este é um dashboard interativo para análise de fundos, ofertas e FIDCs por gestora.")
 
+# Painel de diagnóstico, escondido: só com a telemetria ligada e ?diagnostico=1 na URL
+if telemetry.ATIVO and st.query_params.get("diagnostico") == "1":
+    etapas, caches = telemetry.current_run()
+    with st.sidebar.expander("Diagnóstico", expanded=True):
+        st.dataframe(
+            pd.DataFrame({"Etapa": list(etapas), "ms": [segundos * 1000 for segundos in etapas.values()]}),
+            hide_index=True,
+            column_config={"ms": st.column_config.NumberColumn("ms", format="%.1f")}
+        )
+        st.dataframe(
+            pd.DataFrame({
+                "Cache": list(caches),
+                "Chamadas": [chamadas for chamadas, _ in caches.values()],
+                "Falhas": [falhas for _, falhas in caches.values()],
+            }),
+            hide_index=True
+        )
+        st.code(telemetry.prometheus_text(), language="text")
+
 # Adicionar rodapé
 st.markdown("---")
 footer_col1, footer_col2, footer_col3 = st.columns([1, 2, 1])
@@ -530,3 +655,5 @@ with footer_col2:
 with footer_col3:
     from datetime import datetime
     st.markdown(f"<p style='text-align: right; color: gray;'>Atualizado em: {datetime.now().strftime('%d/%m/%Y')}</p>", unsafe_allow_html=True)
+
+telemetry.end_run()
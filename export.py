@@ -0,0 +1,372 @@
+# Exportação estática das páginas das gestoras, para servir direto do disco sem o Streamlit:
+# um HTML com os gráficos e tabelas das abas Fundos, Ofertas e FIDCs e um JSON com os dados
+# (os mesmos itens do api.py) por gestora, mais um índice e a página de emissões do mercado.
+# As partes comuns (dados carregados, plotly.js, modelo de página e de gráfico, emissões) são
+# montadas uma vez; as gestoras são divididas entre processos, cada um com os snapshots
+# mapeados em memória.
+# Uso: python export.py [--destino exportacao] [--processos N] [--gestoras "A" "B" ...]
+import argparse
+import html
+import json
+import multiprocessing
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.offline
+
+import api
+import charts
+import cotas
+from normalize import fold_name
+
+# Processos que montam as páginas; EXPORT_PROCESSOS sobrepõe o padrão (todos os núcleos)
+PROCESSOS = int(os.environ.get("EXPORT_PROCESSOS", os.cpu_count() or 1))
+
+# Linhas das tabelas no HTML (o JSON leva todas)
+LINHAS_TABELA = 100
+
+# Descrição da exportação gravada na pasta: se tem todas as gestoras ou só as de --gestoras
+ARQUIVO_EXPORTACAO = "exportacao.json"
+
+# Modelo de gráfico enxuto e comum a todas as figuras: o modelo padrão do Plotly seria
+# copiado inteiro para dentro de cada gráfico de cada página
+MODELO_GRAFICO = go.layout.Template(layout={
+    "font": {"family": "Arial, sans-serif", "size": 12},
+    "colorway": ["#1f6f43", "#4a9b6e", "#8cc5a2", "#d9a441", "#b5523b", "#5b6c8f"],
+    "plot_bgcolor": "white",
+    "yaxis": {"gridcolor": "#e5e5e5", "tickformat": ",~s"},
+    "margin": {"t": 50, "b": 40, "l": 60, "r": 20},
+})
+
+PAGINA = """<!DOCTYPE html>
+<html lang="pt-BR">
+<head>
+<meta charset="utf-8">
+<title>{titulo}</title>
+<script src="{raiz}plotly.min.js"></script>
+<style>
+body {{ font-family: Arial, sans-serif; margin: 2em auto; max-width: 1200px; color: #222; }}
+table {{ border-collapse: collapse; font-size: 13px; margin-bottom: 1em; }}
+th, td {{ border-bottom: 1px solid #ddd; padding: 4px 8px; text-align: left; }}
+td.num {{ text-align: right; }}
+nav a {{ margin-right: 1em; }}
+</style>
+</head>
+<body>
+<nav><a href="{raiz}index.html">Gestoras</a><a href="{raiz}emissoes.html">Emissões</a></nav>
+<h1>{titulo}</h1>
+{conteudo}
+<p><small>Dados da CVM; gerado em {gerado}.</small></p>
+</body>
+</html>
+"""
+
+
+# Nome de arquivo da gestora: minúsculas sem acentos, palavras separadas por hífen
+def gestora_slug(gestora):
+    return "-".join(fold_name(gestora).lower().split()) or "gestora"
+
+
+def _page(titulo, conteudo, raiz=""):
+    return PAGINA.format(titulo=html.escape(titulo), conteudo="\n".join(conteudo), raiz=raiz,
+                         gerado=time.strftime("%d/%m/%Y %H:%M"))
+
+
+def _figure(dados, titulo):
+    fig = charts.bar_figure(dados, titulo)
+    fig.update_layout(template=MODELO_GRAFICO)
+    charts.bound_figure(fig)
+    return fig.to_html(full_html=False, include_plotlyjs=False)
+
+
+# Gráfico de barras de um dict rótulo -> valor, sem os zeros
+def _series_figure(valores, titulo):
+    valores = {rotulo: valor for rotulo, valor in valores.items() if valor}
+    if not valores:
+        return ""
+    return _figure({"x": list(valores), "y": list(valores.values())}, titulo)
+
+
+def _format_cell(valor):
+    if valor is None:
+        return '<td class="num">-</td>'
+    if isinstance(valor, float):
+        return f'<td class="num">{valor:,.2f}</td>'
+    return f"<td>{html.escape(str(valor))}</td>"
+
+
+# Tabela HTML das primeiras LINHAS_TABELA linhas de registros do JSON
+def _table(registros, colunas):
+    if not registros:
+        return ""
+    cabecalho = "".join(f"<th>{html.escape(coluna)}</th>" for coluna in colunas)
+    linhas = "".join(
+        "<tr>" + "".join(_format_cell(registro.get(coluna)) for coluna in colunas) + "</tr>"
+        for registro in registros[:LINHAS_TABELA]
+    )
+    restantes = len(registros) - LINHAS_TABELA
+    nota = f"<p><small>Mais {restantes} linhas no arquivo JSON.</small></p>" if restantes > 0 else ""
+    return f"<table><tr>{cabecalho}</tr>{linhas}</table>{nota}"
+
+
+def _column(registros, coluna):
+    return np.array([np.nan if registro[coluna] is None else registro[coluna] for registro in registros],
+                    dtype="float64")
+
+
+# Seções da página a partir do resultado do api.build_gestora_items
+def gestora_sections(dados, slug):
+    conteudo = [f'<p><a href="{slug}.json">Dados em JSON</a> · grafias: '
+                f'{html.escape(", ".join(dados["grafias"]))}</p>']
+
+    fundos = dados["fundos"]
+    conteudo.append(f"<h2>Fundos ({len(fundos)})</h2>")
+    if fundos:
+        conteudo.append(_figure(charts.top_n([fundo["Fundo"] for fundo in fundos], _column(fundos, "Patrimônio Líquido")),
+                                "Patrimônio Líquido por Fundo"))
+        conteudo.append(_table(fundos, ["Fundo", "No que investe", "Administrador", "Patrimônio Líquido",
+                                        "Média do Mercado", "Diferença (%)"]))
+
+    ofertas = dados["ofertas"]
+    conteudo.append(f"<h2>Ofertas ({len(ofertas)})</h2>")
+    conteudo.append(_table(ofertas, ["Oferta", "Emissor", "Tipo de Oferta", "Valor Total Registrado", "Status"]))
+
+    conteudo.append(f"<h2>FIDCs ({dados['fidcs']})</h2>")
+    if dados["fidcs"]:
+        # O valor inadimplente é parte dos direitos creditórios com e sem risco: fica fora das
+        # barras da composição, que somam a carteira, e aparece à parte
+        carteira = dict(dados["carteira"])
+        inadimplente = carteira.pop("Valor Inadimplente", None)
+        conteudo.append(_series_figure(carteira, "Composição da Carteira"))
+        if inadimplente:
+            conteudo.append(f"<p>Valor inadimplente (incluído na carteira acima): {inadimplente:,.2f}</p>")
+        conteudo.append(_series_figure(dados["setores"], "Distribuição Setorial"))
+        conteudo.append(_series_figure(dados["prazos"], "Prazos de Vencimento"))
+        consolidado = dados["consolidado"]
+        conteudo.append(_figure(charts.top_n([fidc["Fundo"] for fidc in consolidado], _column(consolidado, "Carteira")),
+                                "FIDCs por Valor Total da Carteira"))
+        inadimplencia = dados["inadimplencia"]
+        conteudo.append(_figure(charts.bars_or_histogram([fidc["Fundo"] for fidc in inadimplencia],
+                                                         _column(inadimplencia, "Inadimplência (%)"),
+                                                         charts.FAIXAS_INADIMPLENCIA, sufixo="%"),
+                                "Taxa de Inadimplência (%) por FIDC"))
+        conteudo.append(_series_figure(dados["cotas"]["classes"], "Valor das Cotas por Classe"))
+        conteudo.append(_table(consolidado, ["Fundo", "Patrimônio Líquido", "Carteira", "Inadimplência (%)",
+                                             "Prazo Médio (dias)", "Percentil PL", "Percentil Inadimplência"]))
+        conteudo.append(_table(dados["cotas"]["fundos"], ["Fundo"] + cotas.CLASSES[:-1] + ["Subordinação (%)"]))
+    return conteudo
+
+
+# Executado em cada processo do pool: carrega os dados uma vez (snapshots mapeados em memória)
+def _init_worker():
+    api.warm()
+
+
+# Grava <slug>.html e <slug>.json da gestora; devolve (gestora, segundos, bytes gravados)
+def export_gestora(gestora, slug, pasta):
+    inicio = time.perf_counter()
+    dados = api.build_gestora_items(api.warm(), gestora)
+    caminho_json = os.path.join(pasta, f"{slug}.json")
+    with open(caminho_json, "w", encoding="utf-8") as f:
+        json.dump(dados, f, ensure_ascii=False, separators=(",", ":"))
+    caminho_html = os.path.join(pasta, f"{slug}.html")
+    with open(caminho_html, "w", encoding="utf-8") as f:
+        f.write(_page(gestora, gestora_sections(dados, slug), raiz="../"))
+    tamanho = os.path.getsize(caminho_json) + os.path.getsize(caminho_html)
+    return gestora, time.perf_counter() - inicio, tamanho
+
+
+def _export_task(tarefa):
+    return export_gestora(*tarefa)
+
+
+# Página de emissões (igual para todas as gestoras): volume por semana e a semana mais recente
+def issuance_page():
+    semanal = api.warm()["semanal"]
+    conteudo = []
+    if len(semanal):
+        volume = semanal.groupby("Semana")["Volume"].sum()
+        conteudo.append(_figure({"x": volume.index.strftime("%d/%m/%Y").to_numpy(), "y": volume.to_numpy()},
+                                "Volume Emitido por Semana"))
+        ultima = api.query_issuance(volume.index.max())
+        conteudo.append(f"<h2>Semana de {pd.Timestamp(ultima['semana']):%d/%m/%Y}</h2>")
+        conteudo.append(_table(ultima["categorias"], ["Valor_Mobiliario", "Emissoes", "Volume", "Variacao"]))
+    return _page("Emissões Concedidas", conteudo)
+
+
+def index_page(exportadas, slugs):
+    estado = api.warm()
+    linhas = [
+        f'<tr><td><a href="gestoras/{slugs[gestora]}.html">{html.escape(gestora)}</a></td>'
+        f'<td class="num">{len(estado["indice"]["fundos"].get(gestora, ()))}</td>'
+        f'<td class="num">{len(estado["indice"]["ofertas"].get(gestora, ()))}</td></tr>'
+        for gestora in exportadas
+    ]
+    return _page("Gestoras", ["<table><tr><th>Gestora</th><th>Fundos</th><th>Ofertas</th></tr>"
+                              + "".join(linhas) + "</table>"])
+
+
+# Nome de arquivo único por gestora (grafias diferentes podem dar o mesmo slug)
+def assign_slugs(gestoras):
+    slugs, usados = {}, set()
+    for gestora in gestoras:
+        slug = base = gestora_slug(gestora)
+        numero = 1
+        while slug in usados:
+            numero += 1
+            slug = f"{base}-{numero}"
+        usados.add(slug)
+        slugs[gestora] = slug
+    return slugs
+
+
+# O destino só é substituído se ainda não existir, estiver vazio ou for uma exportação anterior.
+# Uma exportação parcial (só algumas gestoras) nunca substitui uma completa; exportações sem
+# ARQUIVO_EXPORTACAO (anteriores a ele) contam como completas
+def _check_destination(destino, completa):
+    if not os.path.exists(destino):
+        return
+    if not os.path.isdir(destino):
+        raise ValueError(f"{destino} existe e não é uma pasta")
+    conteudo = set(os.listdir(destino))
+    if not conteudo:
+        return
+    if not {"index.html", "gestoras"} <= conteudo:
+        raise ValueError(f"{destino} não está vazia e não parece uma exportação; escolha outro --destino")
+    if completa:
+        return
+    try:
+        with open(os.path.join(destino, ARQUIVO_EXPORTACAO), encoding="utf-8") as f:
+            anterior_completa = json.load(f).get("completa", True)
+    except (OSError, ValueError):
+        anterior_completa = True
+    if anterior_completa:
+        raise ValueError(f"{destino} tem a exportação de todas as gestoras; use outro --destino para exportar "
+                         "só algumas")
+
+
+# Troca a exportação anterior pela nova pasta completa: páginas de gestoras que saíram da
+# exportação não ficam para trás, e quem serve a pasta nunca vê uma exportação pela metade
+def _swap_into(nova, destino):
+    antiga = f"{destino}.antiga-{os.getpid()}"
+    if not os.path.exists(destino):
+        os.rename(nova, destino)
+        return
+    os.rename(destino, antiga)
+    try:
+        os.rename(nova, destino)
+    except OSError:
+        os.rename(antiga, destino)
+        raise
+    shutil.rmtree(antiga, ignore_errors=True)
+
+
+# Exporta as gestoras (todas por padrão) para `destino`, que é substituída por inteiro;
+# devolve o relatório de vazão
+def export(destino, gestoras=None, processos=1):
+    if gestoras is not None and not gestoras:
+        raise ValueError("Nenhuma gestora a exportar")
+    destino = os.path.normpath(destino)
+    _check_destination(destino, completa=gestoras is None)
+    # Tudo é gravado numa pasta ao lado do destino (mesmo disco, então a troca é um rename)
+    nova = f"{destino}.nova-{os.getpid()}"
+    shutil.rmtree(nova, ignore_errors=True)
+    try:
+        relatorio = _export_into(nova, gestoras, processos)
+        _swap_into(nova, destino)
+    except BaseException:
+        shutil.rmtree(nova, ignore_errors=True)
+        raise
+    return relatorio
+
+
+def _export_into(destino, gestoras, processos):
+    inicio = time.perf_counter()
+    estado = api.warm()
+    completa = gestoras is None
+    if completa:
+        gestoras = estado["indice"]["gestoras"]
+    slugs = assign_slugs(gestoras)
+    pasta = os.path.join(destino, "gestoras")
+    os.makedirs(pasta)
+
+    # Partes comuns, uma vez só
+    with open(os.path.join(destino, "plotly.min.js"), "w", encoding="utf-8") as f:
+        f.write(plotly.offline.get_plotlyjs())
+    with open(os.path.join(destino, "emissoes.html"), "w", encoding="utf-8") as f:
+        f.write(issuance_page())
+    preparo = time.perf_counter() - inicio
+
+    # Gestoras com mais fundos primeiro, para que nenhum processo fique com a maior no fim da fila
+    tarefas = sorted(((gestora, slugs[gestora], pasta) for gestora in gestoras),
+                     key=lambda tarefa: -len(estado["indice"]["fundos"].get(tarefa[0], ())))
+    inicio_paginas = time.perf_counter()
+    if processos <= 1 or len(tarefas) <= 1:
+        resultados = [export_gestora(*tarefa) for tarefa in tarefas]
+    else:
+        contexto = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(processos, len(tarefas)), mp_context=contexto,
+                                 initializer=_init_worker) as pool:
+            resultados = list(pool.map(_export_task, tarefas, chunksize=max(1, len(tarefas) // (processos * 8))))
+    paginas = time.perf_counter() - inicio_paginas
+
+    exportadas = sorted(gestora for gestora, _, _ in resultados)
+    with open(os.path.join(destino, "index.html"), "w", encoding="utf-8") as f:
+        f.write(index_page(exportadas, slugs))
+    with open(os.path.join(destino, ARQUIVO_EXPORTACAO), "w", encoding="utf-8") as f:
+        json.dump({"completa": completa, "gestoras": len(exportadas)}, f)
+
+    tempos = np.array([segundos for _, segundos, _ in resultados])
+    return {
+        "gestoras": len(resultados),
+        "processos": processos,
+        "preparo": preparo,
+        "paginas": paginas,
+        "total": time.perf_counter() - inicio,
+        "gestoras_por_segundo": len(resultados) / paginas if paginas else float("inf"),
+        "mediana_ms": float(np.median(tempos) * 1000) if len(tempos) else 0.0,
+        "maior_ms": float(tempos.max() * 1000) if len(tempos) else 0.0,
+        "megabytes": sum(tamanho for _, _, tamanho in resultados) / 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta as páginas das gestoras em HTML/JSON estático")
+    parser.add_argument("--destino", default="exportacao")
+    parser.add_argument("--processos", type=int, default=PROCESSOS,
+                        help=f"Processos que montam as páginas (padrão: {PROCESSOS}; 1 = sem paralelismo)")
+    parser.add_argument("--gestoras", nargs="+", help="Gestoras a exportar (qualquer grafia). Padrão: todas")
+    args = parser.parse_args()
+
+    gestoras = None
+    if args.gestoras:
+        estado = api.warm()
+        gestoras = []
+        for nome in args.gestoras:
+            gestora = api.resolve_gestora(estado, nome)
+            if gestora is None:
+                print(f"Gestora não encontrada: {nome}")
+            elif gestora not in gestoras:
+                gestoras.append(gestora)
+        if not gestoras:
+            parser.error("Nenhuma das gestoras de --gestoras foi encontrada")
+
+    try:
+        relatorio = export(args.destino, gestoras, args.processos)
+    except ValueError as erro:
+        parser.error(str(erro))
+    print(f"Gestoras exportadas: {relatorio['gestoras']} em {args.destino}/ ({relatorio['megabytes']:.1f} MB)")
+    print(f"Preparo (dados, plotly.js, emissões): {relatorio['preparo']:.2f}s")
+    print(f"Páginas: {relatorio['paginas']:.2f}s com {relatorio['processos']} processo(s) — "
+          f"{relatorio['gestoras_por_segundo']:.1f} gestoras/s "
+          f"(mediana {relatorio['mediana_ms']:.0f} ms, maior {relatorio['maior_ms']:.0f} ms por gestora)")
+    print(f"Tempo total: {relatorio['total']:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
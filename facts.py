@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+
+import storage
+from normalize import cnpj_keys
+
+# Colunas lidas de cada tabela do informe mensal para a tabela fato por CNPJ
+# (as de X_2, uma linha por classe/série, são resumidas por fundo)
+COLUNAS_FATOS = {
+    "I": ["TAB_I_VL_ATIVO", "TAB_I1_VL_DISP", "TAB_I2_VL_CARTEIRA", "TAB_I2A_VL_DIRCRED_RISCO"],
+    "II": ["TAB_II_VL_CARTEIRA", "TAB_II_A_VL_INDUST", "TAB_II_B_VL_IMOBIL", "TAB_II_C_VL_COMERC",
+           "TAB_II_D_VL_SERV", "TAB_II_E_VL_AGRONEG", "TAB_II_F_VL_FINANC", "TAB_II_G_VL_CREDITO",
+           "TAB_II_H_VL_FACTOR", "TAB_II_I_VL_SETOR_PUBLICO", "TAB_II_J_VL_JUDICIAL", "TAB_II_K_VL_MARCA"],
+    "IV": ["DENOM_SOCIAL", "TAB_IV_A_VL_PL", "TAB_IV_B_VL_PL_MEDIO"],
+    "VI": ["TAB_VI_A1_VL_PRAZO_VENC_30", "TAB_VI_A2_VL_PRAZO_VENC_60", "TAB_VI_A3_VL_PRAZO_VENC_90",
+           "TAB_VI_A6_VL_PRAZO_VENC_180", "TAB_VI_A7_VL_PRAZO_VENC_360", "TAB_VI_A8_VL_PRAZO_VENC_720",
+           "TAB_VI_A9_VL_PRAZO_VENC_1080", "TAB_VI_A10_VL_PRAZO_VENC_MAIOR_1080"],
+    "VII": ["TAB_VII_A1_2_VL_DIRCRED_RISCO", "TAB_VII_A2_2_VL_DIRCRED_SEM_RISCO", "TAB_VII_A5_2_VL_DIRCRED_INAD"],
+    "X_2": ["TAB_X_CLASSE_SERIE", "TAB_X_QT_COTA", "TAB_X_VL_COTA"],
+}
+
+# Atributos do registro de fundos
+COLUNAS_REGISTRO = ["CNPJ_Fundo", "Gestor", "Administrador", "Tipo_Fundo"]
+
+
+# Tabela de uma linha por fundo indexada pela chave inteira. Linhas repetidas do mesmo
+# CNPJ (reenvios) ficam só com a primeira, como no registro.
+def _by_key(df, coluna_cnpj, colunas):
+    chaves = cnpj_keys(df[coluna_cnpj])
+    por_chave = pd.DataFrame({coluna: df[coluna].array for coluna in colunas},
+                             index=pd.Index(chaves, name="CNPJ"))
+    return por_chave[~por_chave.index.duplicated()]
+
+
+# X_2 tem uma linha por classe/série: resume em quantidade de séries e valor total das cotas
+def _quota_totals(x_2):
+    valor = x_2["TAB_X_QT_COTA"].to_numpy(dtype="float64") * x_2["TAB_X_VL_COTA"].to_numpy(dtype="float64")
+    series = pd.DataFrame({"X_2_SERIES": 1, "X_2_VL_COTAS": valor},
+                          index=pd.Index(cnpj_keys(x_2["CNPJ_FUNDO_CLASSE"]), name="CNPJ"))
+    totais = series.groupby(level="CNPJ").sum()
+    totais["X_2_SERIES"] = totais["X_2_SERIES"].astype("Int32")
+    return totais
+
+
+# Monta a tabela fato: uma linha por CNPJ presente em qualquer tabela do informe,
+# com as colunas de COLUNAS_FATOS e os atributos do registro. Índice "CNPJ" (int64) ordenado.
+def build_fact_table(registro_fundo, tabelas):
+    partes = [
+        _by_key(df, "CNPJ_FUNDO_CLASSE", COLUNAS_FATOS[tabela])
+        for tabela, df in tabelas.items() if tabela != "X_2"
+    ]
+    if "X_2" in tabelas:
+        partes.append(_quota_totals(tabelas["X_2"]))
+    fatos = pd.concat(partes, axis=1, join="outer").sort_index()
+    fatos = fatos[fatos.index != 0]
+
+    registro = _by_key(registro_fundo, "CNPJ_Fundo", COLUNAS_REGISTRO[1:])
+    return registro.reindex(fatos.index).join(fatos)
+
+
+# Linhas da tabela fato para uma lista de chaves, por busca binária no índice ordenado
+def fact_rows(fatos, chaves):
+    indice = fatos.index.to_numpy()
+    chaves = np.unique(np.asarray(chaves, dtype=np.int64))
+    posicoes = np.searchsorted(indice, chaves)
+    encontrados = posicoes < len(indice)
+    encontrados[encontrados] = indice[posicoes[encontrados]] == chaves[encontrados]
+    return fatos.take(posicoes[encontrados])
+
+
+# Snapshots de que a tabela fato de uma competência (padrão: a mais recente) depende
+def fact_sources(competencia=None):
+    competencia = competencia or storage.current_month()
+    return ["registro_fundo"] + [storage.fidc_table_name(tabela, competencia) for tabela in COLUNAS_FATOS]
+
+
+# Lê dos snapshots só as colunas usadas e monta a tabela fato da competência
+def load_fact_table(competencia=None):
+    competencia = competencia or storage.current_month()
+    registro_fundo = storage.load_table("registro_fundo", COLUNAS_REGISTRO)
+    tabelas = {
+        tabela: storage.load_table(storage.fidc_table_name(tabela, competencia), ["CNPJ_FUNDO_CLASSE"] + colunas)
+        for tabela, colunas in COLUNAS_FATOS.items()
+    }
+    return build_fact_table(registro_fundo, tabelas)
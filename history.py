@@ -0,0 +1,124 @@
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+import schemas
+import storage
+
+# Orçamento de memória (MB) para as competências mantidas em cache
+MEMORY_BUDGET_MB = int(os.environ.get("FIDC_HISTORY_BUDGET_MB", "256"))
+
+# Cache LRU: (competência, tabela, colunas, versão do snapshot) -> DataFrame; guarda também o tamanho em bytes
+_cache = OrderedDict()
+_tamanhos = {}
+_lock = threading.Lock()
+
+# Colunas lidas por cada consulta de série histórica
+COLUNAS_PL = schemas.VISOES["historico"]["IV"]
+COLUNAS_INADIMPLENCIA = schemas.VISOES["historico"]["VII"]
+COLUNAS_COTAS = schemas.VISOES["historico"]["X_2"]
+
+
+def set_memory_budget(megabytes):
+    global MEMORY_BUDGET_MB
+    with _lock:
+        MEMORY_BUDGET_MB = megabytes
+        _evict()
+
+
+def clear_cache():
+    with _lock:
+        _cache.clear()
+        _tamanhos.clear()
+
+
+# Descarta as entradas menos usadas até caber no orçamento (mantém ao menos a mais recente)
+def _evict():
+    limite = MEMORY_BUDGET_MB * 1024 * 1024
+    while len(_cache) > 1 and sum(_tamanhos.values()) > limite:
+        chave, _ = _cache.popitem(last=False)
+        del _tamanhos[chave]
+
+
+# Carrega uma tabela de uma competência só quando uma consulta precisa dela
+def load_month(competencia, tabela, columns):
+    nome = storage.fidc_table_name(tabela, competencia)
+    # A versão na chave faz um snapshot reprocessado pelo ingest substituir o antigo
+    chave = (competencia, tabela, tuple(columns), storage.snapshot_version(nome))
+    with _lock:
+        if chave in _cache:
+            _cache.move_to_end(chave)
+            return _cache[chave]
+
+    df = storage.load_table(nome, list(columns))
+    # Versão lida de novo: a carga pode ter gravado (ou regravado) o snapshot
+    chave = chave[:3] + (storage.snapshot_version(nome),)
+
+    with _lock:
+        # Versões anteriores da mesma tabela não serão mais pedidas: saem do orçamento
+        for antiga in [antiga for antiga in _cache if antiga[:3] == chave[:3] and antiga != chave]:
+            del _cache[antiga]
+            del _tamanhos[antiga]
+        _cache[chave] = df
+        _tamanhos[chave] = int(df.memory_usage(deep=True).sum())
+        _evict()
+    return df
+
+
+def months(inicio=None, fim=None):
+    competencias = storage.available_months()
+    if inicio is not None:
+        competencias = [c for c in competencias if c >= inicio]
+    if fim is not None:
+        competencias = [c for c in competencias if c <= fim]
+    return competencias
+
+
+# Linhas dos CNPJs em cada competência, com a data de competência como coluna
+def _rows_by_month(tabela, colunas, cnpjs, competencias):
+    cnpjs = list(cnpjs)
+    partes = []
+    for competencia in competencias:
+        try:
+            df = load_month(competencia, tabela, colunas)
+        except (OSError, KeyError, ValueError):
+            # Competência sem essa tabela (ou com layout antigo): fica fora da série
+            continue
+        linhas = df[df["CNPJ_FUNDO_CLASSE"].isin(cnpjs)].copy()
+        linhas.insert(0, "Competencia", pd.to_datetime(competencia, format="%Y%m"))
+        partes.append(linhas)
+
+    if not partes:
+        return pd.DataFrame(columns=["Competencia"] + list(colunas))
+    return pd.concat(partes, ignore_index=True)
+
+
+# Série de Patrimônio Líquido (tabela IV) por CNPJ e competência
+def pl_series(cnpjs, inicio=None, fim=None):
+    linhas = _rows_by_month("IV", COLUNAS_PL, cnpjs, months(inicio, fim))
+    return linhas.rename(columns={"TAB_IV_A_VL_PL": "PL"})
+
+
+# Série de inadimplência (tabela VII): valor inadimplente e taxa sobre a carteira
+def delinquency_series(cnpjs, inicio=None, fim=None):
+    linhas = _rows_by_month("VII", COLUNAS_INADIMPLENCIA, cnpjs, months(inicio, fim))
+    total = linhas["TAB_VII_A1_2_VL_DIRCRED_RISCO"] + linhas["TAB_VII_A2_2_VL_DIRCRED_SEM_RISCO"]
+    return pd.DataFrame({
+        "Competencia": linhas["Competencia"],
+        "CNPJ_FUNDO_CLASSE": linhas["CNPJ_FUNDO_CLASSE"],
+        "Valor_Total": total,
+        "Valor_Inadimplente": linhas["TAB_VII_A5_2_VL_DIRCRED_INAD"],
+        "Taxa_Inadimplencia": (linhas["TAB_VII_A5_2_VL_DIRCRED_INAD"] / total * 100).fillna(0),
+    })
+
+
+# Série de quantidade e valor de cota por classe/série (tabela X_2)
+def quota_series(cnpjs, inicio=None, fim=None):
+    linhas = _rows_by_month("X_2", COLUNAS_COTAS, cnpjs, months(inicio, fim))
+    return linhas.rename(columns={
+        "TAB_X_CLASSE_SERIE": "Classe_Serie",
+        "TAB_X_QT_COTA": "Quantidade_Cotas",
+        "TAB_X_VL_COTA": "Valor_Cota",
+    })
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+
+import search
+
+# Posições vazias para gestoras/CNPJs sem linhas na tabela
+VAZIO = np.array([], dtype=np.intp)
+
+
+# Junta as posições das grafias de cada gestora canônica, na ordem original da tabela
+def _merge_aliases(posicoes, aliases):
+    juntas = {}
+    for canonica, grafias in aliases.items():
+        partes = [posicoes[grafia] for grafia in grafias if grafia in posicoes]
+        if partes:
+            juntas[canonica] = partes[0] if len(partes) == 1 else np.sort(np.concatenate(partes))
+    return juntas
+
+
+# Monta, uma única vez por snapshot, os mapas usados na seleção da gestora. Grafias da mesma
+# gestora (search.alias_groups) são reunidas sob o nome canônico:
+#   fundos/ofertas: gestora -> posições das linhas no registro e nas ofertas
+#   cnpjs: gestora -> CNPJs dos fundos que ela gere
+#   fidc: tabela -> CNPJ -> posições das linhas naquela tabela
+#   aliases: gestora -> grafias encontradas nos cadastros; busca: índice de search.search
+def build_gestora_index(registro_fundo, oferta_resolucao_160, tabelas_fidc):
+    fundos = registro_fundo.groupby("Gestor", observed=True, sort=False).indices
+    ofertas = oferta_resolucao_160.groupby("Gestor", observed=True, sort=False).indices
+
+    contagens = {gestora: 0 for gestora in set(fundos) | set(ofertas)}
+    for posicoes in (fundos, ofertas):
+        for gestora, linhas in posicoes.items():
+            contagens[gestora] += len(linhas)
+    aliases = search.alias_groups(contagens)
+    fundos = _merge_aliases(fundos, aliases)
+    ofertas = _merge_aliases(ofertas, aliases)
+
+    cnpjs_registro = registro_fundo["CNPJ_Fundo"].to_numpy()
+    cnpjs = {gestora: pd.unique(cnpjs_registro[posicoes]) for gestora, posicoes in fundos.items()}
+
+    fidc = {
+        nome: df.groupby("CNPJ_FUNDO_CLASSE", sort=False).indices
+        for nome, df in tabelas_fidc.items()
+    }
+
+    # Lista do selectbox: gestoras canônicas das duas fontes, sem nomes vazios
+    gestoras = sorted(aliases)
+
+    return {
+        "gestoras": gestoras,
+        "fundos": fundos,
+        "ofertas": ofertas,
+        "cnpjs": cnpjs,
+        "fidc": fidc,
+        "aliases": aliases,
+        "busca": search.build_search_index(aliases, contagens),
+    }
+
+
+def fund_positions(indice, gestora):
+    return indice["fundos"].get(gestora, VAZIO)
+
+
+def offer_positions(indice, gestora):
+    return indice["ofertas"].get(gestora, VAZIO)
+
+
+def gestora_cnpjs(indice, gestora):
+    return indice["cnpjs"].get(gestora, VAZIO)
+
+
+# Posições (na ordem original da tabela) das linhas de uma tabela FIDC para os CNPJs
+def fidc_positions(indice, nome_tabela, cnpjs):
+    por_cnpj = indice["fidc"][nome_tabela]
+    partes = [por_cnpj[cnpj] for cnpj in cnpjs if cnpj in por_cnpj]
+    if not partes:
+        return VAZIO
+    return np.sort(np.concatenate(partes))
@@ -0,0 +1,143 @@
+# Ingestão incremental dos arquivos da CVM para os snapshots do dashboard.
+# Uso: python ingest.py [--competencia 202503 ...] [--forcar] [--processos N]
+import argparse
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import aggregates
+import cotas
+import facts
+import queries
+import rankings
+import storage
+
+
+def _market_pl_stats():
+    registro_fundo = storage.load_table("registro_fundo", ["Tipo_Fundo", "Patrimonio_Liquido"])
+    return aggregates.market_pl_stats(registro_fundo)
+
+
+def _weekly_issuance():
+    ofertas = storage.load_table("oferta_resolucao_160", ["Status_Requerimento", "Data_Registro",
+                                                          "Valor_Mobiliario", "Valor_Total_Registrado"])
+    return aggregates.weekly_issuance(ofertas)
+
+
+# Resultados derivados gravados pelo ingest: fontes de que dependem e como calcular.
+# Os do informe mensal são da competência mais recente (a que o dashboard mostra); sem
+# nenhuma competência em disco, só os dos registros
+def derived_tables(competencia):
+    derivados = {
+        "derivado_pl_mercado": (["registro_fundo"], _market_pl_stats),
+        "derivado_emissoes_semanais": (["oferta_resolucao_160"], _weekly_issuance),
+    }
+    if competencia is None:
+        return derivados
+    fontes_fatos = facts.fact_sources(competencia)
+    derivados.update({
+        "derivado_fatos_fidc": (fontes_fatos, lambda: facts.load_fact_table(competencia)),
+        # Depois da tabela fato: os rankings partem dela
+        "derivado_rankings_fidc": (fontes_fatos,
+                                   lambda: rankings.build_rankings(queries.fact_table(competencia))),
+        "derivado_cotas_fidc": (cotas.quota_sources(competencia), lambda: cotas.load_quota_table(competencia)),
+    })
+    return derivados
+
+# Processos que leem e limpam os CSVs em paralelo; INGEST_PROCESSOS sobrepõe o padrão (todos os núcleos)
+PROCESSOS = int(os.environ.get("INGEST_PROCESSOS", os.cpu_count() or 1))
+
+
+# Lista os snapshots a manter: registros e todas as tabelas de todas as competências em disco
+def discover_sources(competencias=None):
+    nomes = [nome for nome, fonte in storage.FONTES.items()
+             if os.path.exists(os.path.join(storage.BASE_DIR, fonte["arquivo"]))]
+
+    for pasta in sorted(os.listdir(storage.BASE_DIR)):
+        encontrado = storage.PADRAO_PASTA_FIDC.match(pasta)
+        if not encontrado or not os.path.isdir(os.path.join(storage.BASE_DIR, pasta)):
+            continue
+        competencia = encontrado.group(1)
+        if competencias and competencia not in competencias:
+            continue
+        padrao_arquivo = re.compile(rf"^inf_mensal_fidc_tab_(.+)_{competencia}\.csv$")
+        for arquivo in sorted(os.listdir(os.path.join(storage.BASE_DIR, pasta))):
+            encontrado = padrao_arquivo.match(arquivo)
+            if encontrado:
+                nomes.append(storage.fidc_table_name(encontrado.group(1), competencia))
+    return nomes
+
+
+def _source_size(nome):
+    return os.path.getsize(os.path.join(storage.BASE_DIR, storage.source(nome)["arquivo"]))
+
+
+# Executado nos processos do pool: grava o arquivo do snapshot e devolve só a entrada do
+# manifesto (o DataFrame não volta ao processo principal)
+def _write_snapshot(nome):
+    return storage.write_snapshot(nome)
+
+
+# Gera snapshots só para arquivos novos ou alterados (tamanho/data e, se preciso, hash).
+# Com mais de um processo, os arquivos são lidos e limpos em paralelo pelos mesmos loaders do
+# storage; o manifesto é gravado uma vez pelo processo principal, então o resultado é o mesmo
+# com qualquer número de processos.
+def ingest(nomes, forcar=False, processos=1):
+    processados = [nome for nome in nomes if forcar or not storage.snapshot_is_fresh(nome)]
+    if processos <= 1 or len(processados) <= 1:
+        for nome in processados:
+            storage.build_snapshot(nome)
+        return processados
+
+    # Maiores arquivos primeiro, para que nenhum processo fique com o maior no fim da fila
+    ordem = sorted(processados, key=_source_size, reverse=True)
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=min(processos, len(ordem)), mp_context=contexto) as pool:
+        entradas = dict(zip(ordem, pool.map(_write_snapshot, ordem)))
+
+    storage.update_manifest_entries({nome: entradas[nome] for nome in processados if entradas[nome] is not None})
+    return processados
+
+
+# Recalcula os derivados cujas fontes mudaram (ou que ainda não existem)
+def refresh_derived():
+    competencias = storage.available_months()
+    atualizados = []
+    for nome, (dependencias, calcular) in derived_tables(competencias[-1] if competencias else None).items():
+        if None in storage.data_version(dependencias):
+            # Fonte ainda sem snapshot (arquivo ausente): nada a derivar
+            continue
+        if storage.load_derived(nome, dependencias) is not None:
+            continue
+        storage.save_derived(nome, calcular(), dependencias)
+        atualizados.append(nome)
+    return atualizados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Atualiza os snapshots a partir dos CSVs da CVM")
+    parser.add_argument("--competencia", action="append",
+                        help="Competência (YYYYMM) a processar; pode repetir. Padrão: todas")
+    parser.add_argument("--forcar", action="store_true",
+                        help="Reprocessa os arquivos mesmo sem mudança")
+    parser.add_argument("--processos", type=int, default=PROCESSOS,
+                        help=f"Processos para ler os CSVs em paralelo (padrão: {PROCESSOS}; 1 = sem paralelismo)")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    nomes = discover_sources(args.competencia)
+    processados = ingest(nomes, args.forcar, args.processos)
+    derivados = refresh_derived()
+
+    print(f"Arquivos verificados: {len(nomes)}")
+    print(f"Processados: {len(processados)}")
+    for nome in processados:
+        print(f"  - {nome}")
+    print(f"Derivados atualizados: {', '.join(derivados) or 'nenhum'}")
+    print(f"Tempo: {time.perf_counter() - inicio:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import pandas as pd
+
+# Métricas da aba de FIDCs por grupo: tabela do informe mensal, redutor (método do
+# DataFrame aplicado às colunas) e, para cada métrica, as colunas que ela soma.
+# Todas as colunas de uma mesma tabela e redutor são reduzidas em uma única passada,
+# então novos detalhamentos (tabelas III, V, IX...) não custam leituras extras.
+METRICAS = {
+    "carteira": {
+        "tabela": "VII",
+        "redutor": "sum",
+        "itens": {
+            "Dir. Creditórios com Risco": ["TAB_VII_A1_2_VL_DIRCRED_RISCO"],
+            "Dir. Creditórios sem Risco": ["TAB_VII_A2_2_VL_DIRCRED_SEM_RISCO"],
+            "Valor Inadimplente": ["TAB_VII_A5_2_VL_DIRCRED_INAD"],
+        },
+    },
+    "setores": {
+        "tabela": "II",
+        "redutor": "sum",
+        "itens": {
+            "Industrial": ["TAB_II_A_VL_INDUST"],
+            "Imobiliário": ["TAB_II_B_VL_IMOBIL"],
+            "Comercial": ["TAB_II_C_VL_COMERC"],
+            "Serviços": ["TAB_II_D_VL_SERV"],
+            "Agronegócio": ["TAB_II_E_VL_AGRONEG"],
+            "Financeiro": ["TAB_II_F_VL_FINANC"],
+            "Crédito": ["TAB_II_G_VL_CREDITO"],
+            "Factoring": ["TAB_II_H_VL_FACTOR"],
+            "Setor Público": ["TAB_II_I_VL_SETOR_PUBLICO"],
+            "Judicial": ["TAB_II_J_VL_JUDICIAL"],
+            "Marca": ["TAB_II_K_VL_MARCA"],
+        },
+    },
+    "financeiro": {
+        "tabela": "II",
+        "redutor": "sum",
+        "itens": {
+            "Crédito Pessoal": ["TAB_II_F1_VL_CRED_PESSOA"],
+            "Crédito Consignado": ["TAB_II_F2_VL_CRED_PESSOA_CONSIG"],
+            "Crédito Corporativo": ["TAB_II_F3_VL_CRED_CORP"],
+            "Middle Market": ["TAB_II_F4_VL_MIDMARKET"],
+            "Financ. Veículos": ["TAB_II_F5_VL_VEICULO"],
+            "Financ. Imob. Empresarial": ["TAB_II_F6_VL_IMOBIL_EMPRESA"],
+            "Financ. Imob. Residencial": ["TAB_II_F7_VL_IMOBIL_RESID"],
+            "Outros": ["TAB_II_F8_VL_OUTRO"],
+        },
+    },
+    "prazos": {
+        "tabela": "VI",
+        "redutor": "sum",
+        "itens": {
+            "30 dias": ["TAB_VI_A1_VL_PRAZO_VENC_30"],
+            "60 dias": ["TAB_VI_A2_VL_PRAZO_VENC_60"],
+            "90 dias": ["TAB_VI_A3_VL_PRAZO_VENC_90"],
+            "180 dias": ["TAB_VI_A6_VL_PRAZO_VENC_180"],
+            "360 dias": ["TAB_VI_A7_VL_PRAZO_VENC_360"],
+            "Acima de 360 dias": ["TAB_VI_A8_VL_PRAZO_VENC_720", "TAB_VI_A9_VL_PRAZO_VENC_1080",
+                                  "TAB_VI_A10_VL_PRAZO_VENC_MAIOR_1080"],
+        },
+    },
+}
+
+
+# Colunas que os grupos de METRICAS leem de cada (tabela, redutor), sem repetição
+def _columns_by_pass(grupos):
+    passadas = {}
+    for grupo in grupos:
+        spec = METRICAS[grupo]
+        colunas = passadas.setdefault((spec["tabela"], spec["redutor"]), [])
+        for lista in spec["itens"].values():
+            colunas.extend(c for c in lista if c not in colunas)
+    return passadas
+
+
+# Calcula os grupos pedidos (todos por padrão) a partir das tabelas {"II": df, ...}.
+# Resultado: grupo -> Series com uma linha por métrica, na ordem do spec.
+def evaluate(tabelas, grupos=None):
+    grupos = list(METRICAS) if grupos is None else grupos
+
+    totais = {}
+    for (tabela, redutor), colunas in _columns_by_pass(grupos).items():
+        totais[(tabela, redutor)] = getattr(tabelas[tabela][colunas], redutor)()
+
+    resultado = {}
+    for grupo in grupos:
+        spec = METRICAS[grupo]
+        total = totais[(spec["tabela"], spec["redutor"])]
+        resultado[grupo] = pd.Series(
+            {nome: total[colunas].sum() for nome, colunas in spec["itens"].items()},
+            dtype="float64",
+        )
+    return resultado
@@ -0,0 +1,102 @@
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+
+# Função para limpar e padronizar CNPJs
+def clean_cnpj(cnpj):
+    if pd.isna(cnpj):
+        return ""
+    # Remove todos os caracteres não numéricos
+    cnpj_limpo = re.sub(r'[^0-9]', '', str(cnpj))
+    # Garante que tenha 14 dígitos, preenchendo com zeros à esquerda
+    return cnpj_limpo.zfill(14)
+
+# Função para limpar e padronizar nomes
+def clean_name(name):
+    if pd.isna(name):
+        return ""
+    # Converte para maiúsculas
+    name = str(name).upper()
+    # Remove caracteres especiais e números, mantendo apenas letras e espaços
+    name = re.sub(r'[^A-ZÀ-ÿ\s]', '', name)
+    # Remove espaços extras
+    name = ' '.join(name.split())
+    return name
+
+
+# Nome para busca e comparação: maiúsculas sem acentos, só letras, dígitos e espaços simples.
+# Ao contrário de clean_name, "GESTÃO" e "GESTAO" ficam iguais.
+def fold_name(name):
+    if pd.isna(name):
+        return ""
+    decomposto = unicodedata.normalize('NFKD', str(name).upper())
+    sem_acentos = ''.join(c for c in decomposto if not unicodedata.combining(c))
+    return ' '.join(re.sub(r'[^A-Z0-9]', ' ', sem_acentos).split())
+
+
+# Aplica a limpeza apenas nos valores únicos e espalha o resultado pelos códigos.
+# Nulos recebem "" (mesmo resultado de clean_cnpj/clean_name para valores ausentes).
+def _clean_unique(serie, limpar_unicos, categorical=False):
+    codigos, unicos = pd.factorize(serie)
+    limpos = limpar_unicos(pd.Series(unicos, dtype=object).astype(str))
+    # O último elemento atende o código -1 (valores nulos)
+    valores = np.append(limpos.to_numpy(dtype=object), "")
+
+    if not categorical:
+        return pd.Series(valores[codigos], index=serie.index, dtype=object, name=serie.name)
+
+    # Nomes diferentes podem virar o mesmo texto limpo: refatora para categorias únicas
+    codigos_limpos, categorias = pd.factorize(valores)
+    categorico = pd.Categorical.from_codes(codigos_limpos[codigos], categories=categorias)
+    return pd.Series(categorico, index=serie.index, name=serie.name)
+
+
+# Extrai os dígitos de cada texto e alinha à direita em 14 posições, em NumPy.
+# Textos com mais de 14 dígitos (fora do padrão) caem na versão com .str.
+def _cnpj_digits(unicos):
+    textos = unicos.to_numpy(dtype=str)
+    if textos.size == 0:
+        return unicos
+    largura = max(textos.dtype.itemsize // 4, 14)
+    textos = textos.astype(f'<U{largura}')
+
+    # Cada caractere vira um code point; invertido para alinhar os dígitos pela direita
+    codigos = textos.view(np.uint32).reshape(len(textos), largura)[:, ::-1]
+    eh_digito = (codigos >= ord('0')) & (codigos <= ord('9'))
+    qtd_digitos = eh_digito.sum(axis=1)
+
+    # Ordenação estável leva os dígitos para o começo preservando a ordem
+    ordem = np.argsort(~eh_digito, axis=1, kind='stable')
+    digitos = np.take_along_axis(codigos, ordem, axis=1)[:, :14]
+    digitos[np.arange(14) >= qtd_digitos[:, None]] = ord('0')
+    limpos = pd.Series(np.ascontiguousarray(digitos[:, ::-1]).view('<U14').ravel(),
+                       index=unicos.index, dtype=object)
+
+    longos = qtd_digitos > 14
+    if longos.any():
+        limpos[longos] = unicos[longos].str.replace(r'[^0-9]', '', regex=True)
+    return limpos
+
+
+# Versão vetorizada de clean_cnpj para uma coluna inteira
+def normalize_cnpjs(serie, categorical=False):
+    return _clean_unique(serie, _cnpj_digits, categorical)
+
+
+# Versão vetorizada de clean_name para uma coluna inteira
+def normalize_names(serie, categorical=False):
+    def limpar(unicos):
+        limpos = unicos.str.upper().str.replace(r'[^A-ZÀ-ÿ\s]', '', regex=True)
+        return limpos.str.split().str.join(' ')
+    return _clean_unique(serie, limpar, categorical)
+
+
+# Chave inteira (int64) de CNPJs já normalizados; vazios e inválidos viram 0
+def cnpj_keys(serie):
+    codigos, unicos = pd.factorize(serie)
+    chaves = pd.to_numeric(pd.Series(unicos, dtype=object), errors='coerce').fillna(0).astype(np.int64)
+    # O último elemento atende o código -1 (valores nulos)
+    return np.append(chaves.to_numpy(), 0)[codigos]
@@ -0,0 +1,231 @@
+import numpy as np
+import pandas as pd
+
+import aggregates
+import charts
+import cotas
+import facts
+import history
+import indexes
+import metrics
+import rankings
+import schemas
+import storage
+import telemetry
+from normalize import cnpj_keys
+
+# Carga e agregação dos dados do dashboard sem Streamlit: o dash2 envolve estas funções nos
+# caches do Streamlit e o api.py nos caches do próprio processo. Nada aqui altera as tabelas
+# carregadas; cada consulta monta DataFrames novos.
+
+TABELAS_FIDC = ["fidc_tab_ii", "fidc_tab_vi", "fidc_tab_vii"]
+
+
+# Snapshot usado para cada tabela do dashboard; as do informe são da competência mais recente
+def dashboard_tables(competencia=None):
+    competencia = competencia or storage.current_month()
+    return {
+        "registro_fundo": "registro_fundo",
+        "oferta_resolucao_160": "oferta_resolucao_160",
+        "fidc_tab_ii": storage.fidc_table_name("II", competencia),
+        "fidc_tab_vi": storage.fidc_table_name("VI", competencia),
+        "fidc_tab_vii": storage.fidc_table_name("VII", competencia),
+    }
+
+
+# Versão conjunta das tabelas do dashboard (chave dos caches): a competência e as fontes.
+# Um mês novo no ingest muda a versão mesmo antes de os snapshots dele existirem
+def data_version():
+    competencia = storage.current_month()
+    return (competencia,) + storage.data_version(dashboard_tables(competencia).values())
+
+
+# Tabelas do dashboard pelo nome de dashboard_tables, só com as colunas da visão "dashboard".
+# Os snapshots colunares já vêm limpos; o CSV só é lido se o snapshot faltar ou estiver velho
+def load_tables():
+    tabelas = {}
+    for nome, snapshot in dashboard_tables().items():
+        with telemetry.span(f"load_data.{nome}"):
+            tabelas[nome] = storage.load_table(snapshot, schemas.VISOES["dashboard"][storage.source(snapshot)["tabela"]])
+    return tabelas
+
+
+def build_index(tabelas):
+    with telemetry.span("indice_gestoras"):
+        return indexes.build_gestora_index(tabelas["registro_fundo"], tabelas["oferta_resolucao_160"],
+                                           {nome: tabelas[nome] for nome in TABELAS_FIDC})
+
+
+# Estatísticas de PL do mercado por tipo de fundo; usa o resultado gravado pelo ingest quando
+# ele corresponde ao snapshot atual. `carregar_tabelas` só é chamada se for preciso calcular.
+def market_stats(carregar_tabelas):
+    estatisticas = storage.load_derived("derivado_pl_mercado", ["registro_fundo"])
+    if estatisticas is None:
+        estatisticas = aggregates.market_pl_stats(carregar_tabelas()["registro_fundo"])
+    return estatisticas
+
+
+# Emissões concedidas por semana e categoria, como em market_stats
+def weekly_issuance(carregar_tabelas):
+    semanal = storage.load_derived("derivado_emissoes_semanais", ["oferta_resolucao_160"])
+    if semanal is None:
+        semanal = aggregates.weekly_issuance(carregar_tabelas()["oferta_resolucao_160"])
+    return semanal
+
+
+# Tabela fato por CNPJ (tabelas I, II, IV, VI, VII e X_2 + registro), gravada pelo ingest ou montada
+def fact_table(competencia=None):
+    competencia = competencia or storage.current_month()
+    fatos = storage.load_derived("derivado_fatos_fidc", facts.fact_sources(competencia))
+    if fatos is None:
+        fatos = facts.load_fact_table(competencia)
+    return fatos
+
+
+# Indicadores, posições e percentis de cada FIDC contra o mercado (rankings.py), gravados pelo
+# ingest ou montados a partir da tabela fato; `carregar_fatos` só é chamada se for preciso
+def fidc_rankings(carregar_fatos):
+    tabela = storage.load_derived("derivado_rankings_fidc", facts.fact_sources())
+    if tabela is None:
+        tabela = rankings.build_rankings(carregar_fatos())
+    return tabela
+
+
+def facts_version():
+    competencia = storage.current_month()
+    return (competencia,) + storage.data_version(facts.fact_sources(competencia))
+
+
+# Motor de cotas (cotas.py) sobre a tabela compacta gravada pelo ingest ou montada das tabelas
+# X_1, X_2, X_3 e X_6, com a estrutura de cotas de todos os fundos já calculada
+def quota_engine():
+    tabela = storage.load_derived("derivado_cotas_fidc", cotas.quota_sources())
+    if tabela is None:
+        tabela = cotas.load_quota_table()
+    motor = cotas.quota_engine(tabela)
+    motor["estrutura"] = cotas.subordination(motor)
+    return motor
+
+
+def quotas_version():
+    competencia = storage.current_month()
+    return (competencia,) + storage.data_version(cotas.quota_sources(competencia))
+
+
+# Linhas da gestora em cada tabela do dashboard pelas posições do índice.
+# Com gestora=None as tabelas do informe vêm inteiras (visão geral de todos os FIDCs).
+def select_gestora(tabelas, indice, gestora):
+    tabelas_fidc = {nome: tabelas[nome] for nome in TABELAS_FIDC}
+    if gestora is None:
+        return dict(tabelas_fidc, fundos=tabelas["registro_fundo"].iloc[:0],
+                    ofertas=tabelas["oferta_resolucao_160"].iloc[:0], cnpjs=None)
+
+    cnpjs = indexes.gestora_cnpjs(indice, gestora)
+    selecao = {nome: df.take(indexes.fidc_positions(indice, nome, cnpjs)) for nome, df in tabelas_fidc.items()}
+    selecao["fundos"] = tabelas["registro_fundo"].take(indexes.fund_positions(indice, gestora))
+    selecao["ofertas"] = tabelas["oferta_resolucao_160"].take(indexes.offer_positions(indice, gestora))
+    selecao["cnpjs"] = cnpjs
+    return selecao
+
+
+# Métricas da aba de FIDCs (metrics.METRICAS), uma passada por tabela
+def fidc_metrics(selecao, grupos=None):
+    return metrics.evaluate({
+        "II": selecao["fidc_tab_ii"], "VI": selecao["fidc_tab_vi"], "VII": selecao["fidc_tab_vii"],
+    }, grupos)
+
+
+# Resumo dos fundos da gestora com a média do mercado do mesmo tipo
+def fund_summary(selecao, estatisticas_mercado):
+    fundos_asset = selecao["fundos"]
+    media_mercado = estatisticas_mercado["media"].reindex(fundos_asset["Tipo_Fundo"].astype(object)).to_numpy()
+    resumo_fundos = pd.DataFrame({
+        "Fundo": fundos_asset["Denominacao_Social"].to_numpy(),
+        "CNPJ": fundos_asset["CNPJ_Fundo"].to_numpy(),
+        "No que investe": fundos_asset["Tipo_Fundo"].astype(str).to_numpy(),
+        "Administrador": fundos_asset["Administrador"].astype(str).to_numpy(),
+        "Patrimônio Líquido": fundos_asset["Patrimonio_Liquido"].to_numpy(),
+        "Média do Mercado": media_mercado,
+    })
+    resumo_fundos["Diferença (%)"] = (resumo_fundos["Patrimônio Líquido"] / resumo_fundos["Média do Mercado"] - 1) * 100
+    return resumo_fundos
+
+
+# Resumo das ofertas da gestora
+def offer_summary(selecao):
+    ofertas_asset = selecao["ofertas"]
+    return pd.DataFrame({
+        "Oferta": ofertas_asset["Numero_Requerimento"].astype(str).to_numpy(),
+        "Emissor": ofertas_asset["Nome_Emissor"].to_numpy(),
+        "CNPJ do Emissor": ofertas_asset["CNPJ_Emissor"].to_numpy(),
+        "Tipo de Oferta": ofertas_asset["Tipo_Oferta"].astype(str).to_numpy(),
+        "Valor Total Registrado": ofertas_asset["Valor_Total_Registrado"].to_numpy(),
+        "Status": ofertas_asset["Status_Requerimento"].astype(str).to_numpy(),
+    })
+
+
+# Taxa de inadimplência (%) de cada FIDC da seleção, sem limite de itens
+def delinquency_by_fidc(selecao):
+    fidc_vii = selecao["fidc_tab_vii"]
+    valor_total = fidc_vii['TAB_VII_A1_2_VL_DIRCRED_RISCO'] + fidc_vii['TAB_VII_A2_2_VL_DIRCRED_SEM_RISCO']
+    return pd.DataFrame({
+        "Fundo": fidc_vii['DENOM_SOCIAL'].to_numpy(),
+        "CNPJ": fidc_vii['CNPJ_FUNDO_CLASSE'].to_numpy(),
+        "Inadimplência (%)": (fidc_vii['TAB_VII_A5_2_VL_DIRCRED_INAD'] / valor_total * 100).fillna(0).to_numpy(),
+    })
+
+
+# Visão consolidada por fundo a partir da tabela fato (filtrada pela chave inteira do CNPJ),
+# com o percentil de cada fundo no mercado já calculado em rankings
+def fund_view(selecao, fatos_fidc, tabela_rankings):
+    fatos_analise = fatos_fidc if selecao["cnpjs"] is None else facts.fact_rows(fatos_fidc, cnpj_keys(selecao["cnpjs"]))
+    indicadores = tabela_rankings.reindex(fatos_analise.index)
+    total_vi = fatos_analise[facts.COLUNAS_FATOS["VI"]].sum(axis=1)
+    curto_prazo = fatos_analise[facts.COLUNAS_FATOS["VI"][:3]].sum(axis=1)
+    return pd.DataFrame({
+        'Fundo': fatos_analise['DENOM_SOCIAL'].astype(str),
+        'Patrimônio Líquido': fatos_analise['TAB_IV_A_VL_PL'],
+        'Carteira': fatos_analise['TAB_II_VL_CARTEIRA'],
+        'Inadimplência (%)': indicadores['inadimplencia'],
+        'Com Risco (%)': indicadores['risco'],
+        'Vencimento até 90 dias (%)': curto_prazo / total_vi * 100,
+        'Prazo Médio (dias)': indicadores['prazo_medio'],
+        'Percentil PL': indicadores['pl_percentil'],
+        'Percentil Inadimplência': indicadores['inadimplencia_percentil'],
+        'Séries de Cotas': fatos_analise['X_2_SERIES'],
+    }).sort_values('Patrimônio Líquido', ascending=False)
+
+
+# Dados dos gráficos por FIDC, já reduzidos (charts), e a visão consolidada por fundo
+def fidc_view(selecao, fatos_fidc, tabela_rankings):
+    fidc_ii = selecao["fidc_tab_ii"]
+    # Maiores carteiras + "Outros"; a inadimplência vira distribuição em faixas quando há
+    # FIDCs demais para uma barra por fundo (ex.: a visão geral, com todos os FIDCs)
+    carteira = charts.top_n(fidc_ii['DENOM_SOCIAL'].to_numpy(), fidc_ii['TAB_II_VL_CARTEIRA'].to_numpy())
+    taxas = delinquency_by_fidc(selecao)
+    inadimplencia = charts.bars_or_histogram(taxas["Fundo"].to_numpy(), taxas["Inadimplência (%)"].to_numpy(),
+                                             charts.FAIXAS_INADIMPLENCIA, sufixo="%")
+    return {"carteira": carteira, "inadimplencia": inadimplencia,
+            "fundos": fund_view(selecao, fatos_fidc, tabela_rankings)}
+
+
+# Estrutura de cotas dos FIDCs da seleção: valor por classe somado e uma linha por fundo
+# (valor por classe, subordinação, séries e cotistas), nomes pela tabela fato
+def quota_view(selecao, motor, fatos_fidc):
+    estrutura = motor["estrutura"]
+    if selecao["cnpjs"] is not None:
+        estrutura = facts.fact_rows(estrutura, cnpj_keys(selecao["cnpjs"]))
+    nomes = fatos_fidc["DENOM_SOCIAL"].reindex(estrutura.index).astype(str).to_numpy()
+    fundos = estrutura.drop(columns="Outra").assign(Fundo=nomes)
+    fundos = fundos[["Fundo"] + list(fundos.columns[:-1])]
+    ordem = np.argsort(-estrutura[cotas.CLASSES].sum(axis=1).to_numpy(), kind="stable")
+    return {"classes": estrutura[cotas.CLASSES].sum(), "fundos": fundos.iloc[ordem]}
+
+
+# Evolução mensal (PL e inadimplência) dos FIDCs, carregando só as competências necessárias
+def gestora_history(cnpjs):
+    pl = history.pl_series(cnpjs).groupby("Competencia")["PL"].sum()
+    inadimplencia = history.delinquency_series(cnpjs).groupby("Competencia")[["Valor_Total", "Valor_Inadimplente"]].sum()
+    evolucao = pd.DataFrame({"PL": pl}).join(inadimplencia, how="outer")
+    evolucao["Taxa_Inadimplencia"] = (evolucao["Valor_Inadimplente"] / evolucao["Valor_Total"] * 100).fillna(0)
+    return evolucao.reset_index()
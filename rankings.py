@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+
+import facts
+
+# Indicadores de cada FIDC da competência, com posição e percentil contra o mercado inteiro e
+# contra os fundos do mesmo Tipo_Fundo. Montados de uma vez a partir da tabela fato (no ingest
+# ou na primeira carga); as páginas só buscam as linhas dos CNPJs da gestora.
+
+# Prazo representativo (dias) de cada faixa de vencimento da tabela VI: o meio da faixa.
+# A última faixa (acima de 1080 dias) é aberta e conta como 1440 dias.
+PRAZOS_VI = dict(zip(facts.COLUNAS_FATOS["VI"], [15, 45, 75, 135, 270, 540, 900, 1440]))
+
+
+def _ratio(numerador, denominador):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        razao = np.asarray(numerador, dtype="float64") / np.asarray(denominador, dtype="float64")
+    razao[~np.isfinite(razao)] = np.nan
+    return razao
+
+
+def _credit_rights(fatos):
+    return (fatos["TAB_VII_A1_2_VL_DIRCRED_RISCO"].to_numpy(dtype="float64")
+            + fatos["TAB_VII_A2_2_VL_DIRCRED_SEM_RISCO"].to_numpy(dtype="float64"))
+
+
+# Valor inadimplente sobre os direitos creditórios (%)
+def _delinquency_rate(fatos):
+    return _ratio(fatos["TAB_VII_A5_2_VL_DIRCRED_INAD"], _credit_rights(fatos)) * 100
+
+
+# Parcela dos direitos creditórios com aquisição substancial de risco (%)
+def _risk_share(fatos):
+    return _ratio(fatos["TAB_VII_A1_2_VL_DIRCRED_RISCO"], _credit_rights(fatos)) * 100
+
+
+# Prazo médio de vencimento (dias), ponderado pelo valor em cada faixa da tabela VI
+def _average_maturity(fatos):
+    valores = fatos[list(PRAZOS_VI)].to_numpy(dtype="float64")
+    return _ratio(valores @ np.array(list(PRAZOS_VI.values()), dtype="float64"), valores.sum(axis=1))
+
+
+def _net_assets(fatos):
+    return fatos["TAB_IV_A_VL_PL"].to_numpy(dtype="float64")
+
+
+# Indicador -> cálculo vetorizado sobre a tabela fato (NaN quando o fundo não tem a base)
+INDICADORES = {
+    "inadimplencia": _delinquency_rate,
+    "risco": _risk_share,
+    "prazo_medio": _average_maturity,
+    "pl": _net_assets,
+}
+
+
+# Posição (1 = maior valor) e percentil (% dos fundos com valor menor ou igual); fundos sem
+# o indicador ficam fora da contagem e sem posição
+def _ranks(serie):
+    return serie.rank(method="min", ascending=False), serie.rank(method="max", pct=True) * 100
+
+
+# Uma linha por CNPJ da tabela fato (mesmo índice inteiro ordenado), só com colunas float32:
+# para cada indicador, o valor, "_posicao"/"_percentil" no mercado e "_posicao_tipo"/
+# "_percentil_tipo" entre os fundos do mesmo Tipo_Fundo (NaN se o fundo não está no registro)
+def build_rankings(fatos):
+    tipos = fatos["Tipo_Fundo"]
+    colunas = {}
+    for nome, calcular in INDICADORES.items():
+        valores = pd.Series(calcular(fatos), index=fatos.index)
+        colunas[nome] = valores
+        colunas[f"{nome}_posicao"], colunas[f"{nome}_percentil"] = _ranks(valores)
+        colunas[f"{nome}_posicao_tipo"], colunas[f"{nome}_percentil_tipo"] = _ranks(
+            valores.groupby(tipos, observed=True))
+    return pd.DataFrame({nome: serie.to_numpy(dtype="float32") for nome, serie in colunas.items()},
+                        index=fatos.index)
@@ -0,0 +1,177 @@
+import re
+
+import pandas as pd
+
+# Tipos usados no registro:
+#   "str"      texto livre (CNPJs, nomes longos e únicos)
+#   "category" texto repetido, gravado como dicionário
+#   "date"     data em um dos FORMATOS_DATA
+#   demais     dtypes do pandas (float64, float32, Int32...)
+
+# Formatos de data aceitos, na ordem de tentativa (os cadastros misturam ISO e dd/mm/aaaa)
+FORMATOS_DATA = ["%Y-%m-%d", "%d/%m/%Y", "%Y-%m-%d %H:%M:%S"]
+
+# Colunas de identificação presentes em todas as tabelas do informe mensal de FIDC
+IDENTIFICACAO = {
+    "TP_FUNDO_CLASSE": "category",
+    "CNPJ_FUNDO_CLASSE": "str",
+    "DENOM_SOCIAL": "category",
+    "DT_COMPTC": "date",
+}
+
+# Tipo das colunas de valores pelo nome (vale a primeira regra que casar).
+# Percentuais e taxas cabem em float32; valores em reais ficam em float64.
+REGRAS_TIPOS = [
+    (re.compile(r"CPF_CNPJ|^CNPJ_"), "str"),
+    (re.compile(r"_NR_COTST"), "Int32"),
+    (re.compile(r"_PR_|RENTAB|_COMPRA_|_VENDA_"), "float32"),
+    (re.compile(r"^TAB_"), "float64"),
+]
+
+# Layouts das 16 tabelas do informe mensal. "linha" indica a granularidade:
+# uma linha por fundo ou uma por fundo x classe/série de cotas.
+LAYOUTS = {
+    "I": {
+        "descricao": "Ativo",
+        "linha": "fundo",
+        "tipos": {
+            "CLASSE_UNICA": "category", "ADMIN": "category", "CLASSE": "category",
+            "CONDOM": "category", "FUNDO_EXCLUSIVO": "category", "COTST_INTERESSE": "category",
+            "TP_PRAZO_CONVERSAO_COTA": "category", "TP_PRAZO_PAGTO_RESGATE": "category",
+            "PRAZO_CONVERSAO_COTA": "float32", "PRAZO_PAGTO_RESGATE": "float32",
+        },
+    },
+    "II": {"descricao": "Carteira por setor", "linha": "fundo", "tipos": {}},
+    "III": {"descricao": "Passivo", "linha": "fundo", "tipos": {}},
+    "IV": {"descricao": "Patrimônio líquido", "linha": "fundo", "tipos": {}},
+    "V": {"descricao": "Prazo dos direitos creditórios com aquisição substancial de riscos",
+          "linha": "fundo", "tipos": {}},
+    "VI": {"descricao": "Prazo dos direitos creditórios sem aquisição substancial de riscos",
+           "linha": "fundo", "tipos": {}},
+    "VII": {"descricao": "Aquisições, inadimplência e recompras", "linha": "fundo", "tipos": {}},
+    "IX": {"descricao": "Taxas de desconto nas compras e vendas", "linha": "fundo", "tipos": {}},
+    "X": {"descricao": "Risco dos devedores (SCR) e débitos tributários", "linha": "fundo", "tipos": {}},
+    "X_1": {"descricao": "Cotistas por classe/série", "linha": "classe_serie",
+            "tipos": {"TAB_X_CLASSE_SERIE": "category"}},
+    "X_1_1": {"descricao": "Cotistas por tipo de investidor", "linha": "fundo", "tipos": {}},
+    "X_2": {"descricao": "Quantidade e valor das cotas", "linha": "classe_serie",
+            "tipos": {"TAB_X_CLASSE_SERIE": "category"}},
+    "X_3": {"descricao": "Rentabilidade mensal", "linha": "classe_serie",
+            "tipos": {"TAB_X_CLASSE_SERIE": "category"}},
+    "X_5": {"descricao": "Liquidez", "linha": "fundo", "tipos": {}},
+    "X_6": {"descricao": "Desempenho esperado e realizado", "linha": "classe_serie",
+            "tipos": {"TAB_X_CLASSE_SERIE": "category"}},
+    "X_7": {"descricao": "Garantias", "linha": "fundo", "tipos": {}},
+}
+
+# Cadastros (registro de fundos e ofertas da Resolução 160)
+REGISTROS = {
+    "registro_fundo": {
+        "CNPJ_Fundo": "str",
+        "Tipo_Fundo": "category",
+        "Denominacao_Social": "str",
+        "Patrimonio_Liquido": "float64",
+    },
+    "oferta_resolucao_160": {
+        "CNPJ_Emissor": "str",
+        "Tipo_Oferta": "category",
+        "Status_Requerimento": "category",
+        "Valor_Mobiliario": "category",
+        "Valor_Total_Registrado": "float64",
+        "Data_Registro": "date",
+    },
+}
+
+# Colunas que cada visão precisa de cada tabela (projeção na leitura)
+VISOES = {
+    "dashboard": {
+        "registro_fundo": ["CNPJ_Fundo", "Denominacao_Social", "Tipo_Fundo", "Patrimonio_Liquido",
+                           "Administrador", "Gestor"],
+        "oferta_resolucao_160": ["Numero_Requerimento", "Nome_Emissor", "CNPJ_Emissor", "Tipo_Oferta",
+                                 "Valor_Total_Registrado", "Status_Requerimento", "Data_Registro",
+                                 "Valor_Mobiliario", "Gestor"],
+        "II": ["CNPJ_FUNDO_CLASSE", "DENOM_SOCIAL", "TAB_II_VL_CARTEIRA",
+               "TAB_II_A_VL_INDUST", "TAB_II_B_VL_IMOBIL", "TAB_II_C_VL_COMERC",
+               "TAB_II_D_VL_SERV", "TAB_II_E_VL_AGRONEG", "TAB_II_F_VL_FINANC",
+               "TAB_II_G_VL_CREDITO", "TAB_II_H_VL_FACTOR", "TAB_II_I_VL_SETOR_PUBLICO",
+               "TAB_II_J_VL_JUDICIAL", "TAB_II_K_VL_MARCA",
+               "TAB_II_F1_VL_CRED_PESSOA", "TAB_II_F2_VL_CRED_PESSOA_CONSIG",
+               "TAB_II_F3_VL_CRED_CORP", "TAB_II_F4_VL_MIDMARKET", "TAB_II_F5_VL_VEICULO",
+               "TAB_II_F6_VL_IMOBIL_EMPRESA", "TAB_II_F7_VL_IMOBIL_RESID", "TAB_II_F8_VL_OUTRO"],
+        "VI": ["CNPJ_FUNDO_CLASSE", "DENOM_SOCIAL",
+               "TAB_VI_A1_VL_PRAZO_VENC_30", "TAB_VI_A2_VL_PRAZO_VENC_60",
+               "TAB_VI_A3_VL_PRAZO_VENC_90", "TAB_VI_A6_VL_PRAZO_VENC_180",
+               "TAB_VI_A7_VL_PRAZO_VENC_360", "TAB_VI_A8_VL_PRAZO_VENC_720",
+               "TAB_VI_A9_VL_PRAZO_VENC_1080", "TAB_VI_A10_VL_PRAZO_VENC_MAIOR_1080"],
+        "VII": ["CNPJ_FUNDO_CLASSE", "DENOM_SOCIAL", "TAB_VII_A1_2_VL_DIRCRED_RISCO",
+                "TAB_VII_A2_2_VL_DIRCRED_SEM_RISCO", "TAB_VII_A5_2_VL_DIRCRED_INAD"],
+    },
+    "historico": {
+        "IV": ["CNPJ_FUNDO_CLASSE", "TAB_IV_A_VL_PL"],
+        "VII": ["CNPJ_FUNDO_CLASSE", "TAB_VII_A1_2_VL_DIRCRED_RISCO",
+                "TAB_VII_A2_2_VL_DIRCRED_SEM_RISCO", "TAB_VII_A5_2_VL_DIRCRED_INAD"],
+        "X_2": ["CNPJ_FUNDO_CLASSE", "TAB_X_CLASSE_SERIE", "TAB_X_QT_COTA", "TAB_X_VL_COTA"],
+    },
+}
+
+
+# Tipo declarado de uma coluna de uma tabela (None: deixa o pandas inferir)
+def column_type(tabela, coluna):
+    if tabela in REGISTROS:
+        return REGISTROS[tabela].get(coluna)
+    if coluna in IDENTIFICACAO:
+        return IDENTIFICACAO[coluna]
+    tipos = LAYOUTS[tabela]["tipos"] if tabela in LAYOUTS else {}
+    if coluna in tipos:
+        return tipos[coluna]
+    for padrao, tipo in REGRAS_TIPOS:
+        if padrao.search(coluna):
+            return tipo
+    return None
+
+
+# Dtype para pd.read_csv de uma coluna: textos e datas entram como str; com
+# somente_texto=True os números ficam por conta do pandas (conversão em apply_types)
+def _read_dtype(tabela, coluna, somente_texto=False):
+    tipo = column_type(tabela, coluna)
+    if tipo in ("str", "date"):
+        return str
+    if tipo == "category" or not somente_texto:
+        return tipo
+    return None
+
+
+# Argumentos de pd.read_csv: só as colunas pedidas (se houver) e seus dtypes explícitos
+def read_csv_options(tabela, cabecalho, colunas=None, somente_texto=False):
+    if colunas is not None:
+        pedidas = set(colunas)
+        cabecalho = [coluna for coluna in cabecalho if coluna in pedidas]
+    dtypes = {coluna: _read_dtype(tabela, coluna, somente_texto) for coluna in cabecalho}
+    return {
+        "usecols": list(cabecalho),
+        "dtype": {coluna: tipo for coluna, tipo in dtypes.items() if tipo is not None},
+    }
+
+
+# Converte textos de data testando cada formato só nas linhas que os anteriores não resolveram
+def parse_dates(serie):
+    datas = pd.Series(pd.NaT, index=serie.index, dtype="datetime64[ns]")
+    for formato in FORMATOS_DATA:
+        pendentes = datas.isna() & serie.notna()
+        if not pendentes.any():
+            break
+        datas[pendentes] = pd.to_datetime(serie[pendentes], format=formato, errors="coerce")
+    return datas
+
+
+# Aplica os tipos declarados que o read_csv não resolve: datas e números com lixo
+def apply_types(tabela, df):
+    for coluna in df.columns:
+        tipo = column_type(tabela, coluna)
+        if tipo in (None, "str", "category") or df[coluna].dtype == tipo:
+            continue
+        if tipo == "date":
+            df[coluna] = parse_dates(df[coluna])
+        else:
+            df[coluna] = pd.to_numeric(df[coluna], errors="coerce").astype(tipo)
+    return df
@@ -0,0 +1,112 @@
+import bisect
+
+import numpy as np
+
+from normalize import fold_name
+
+# Busca de gestoras para a barra lateral. Os nomes são comparados sem acentos (fold_name) e
+# grafias da mesma gestora (com e sem acento, com ou sem "LTDA"...) formam um único grupo,
+# representado pela grafia mais frequente. O índice, montado uma vez por versão dos dados,
+# responde por prefixo de palavra e por semelhança de trigramas (erros de digitação).
+
+# Formas societárias ignoradas no fim do nome ao agrupar grafias ("S.A." vira "S A").
+# Só o sufixo sai: letras e palavras no meio do nome distinguem gestoras ("GESTORA A", "GESTORA E")
+SUFIXOS_SOCIETARIOS = [("LTDA",), ("EIRELI",), ("SA",), ("S", "A")]
+
+# Semelhança mínima (trigramas em comum / trigramas da consulta) para entrar no resultado
+SEMELHANCA_MINIMA = 0.5
+
+LIMITE_RESULTADOS = 50
+
+
+# Chave do grupo de grafias: nome sem acentos e sem as formas societárias do fim
+def alias_key(nome):
+    palavras = fold_name(nome).split()
+    removido = True
+    while removido:
+        removido = False
+        for sufixo in SUFIXOS_SOCIETARIOS:
+            if len(palavras) > len(sufixo) and tuple(palavras[-len(sufixo):]) == sufixo:
+                palavras = palavras[:-len(sufixo)]
+                removido = True
+    return " ".join(palavras)
+
+
+# Agrupa as grafias de {nome: linhas} pela alias_key, sem nomes vazios.
+# Resultado: canônica -> grafias do grupo (a canônica, a com mais linhas, primeiro)
+def alias_groups(contagens):
+    grupos = {}
+    for nome in contagens:
+        if nome.strip():
+            grupos.setdefault(alias_key(nome), []).append(nome)
+    canonicas = {}
+    for nomes in grupos.values():
+        nomes.sort(key=lambda nome: (-contagens[nome], nome))
+        canonicas[nomes[0]] = nomes
+    return canonicas
+
+
+def _trigrams(texto):
+    texto = f"  {texto} "
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+# Índice de busca sobre os grupos de alias_groups: nomes canônicos em ordem alfabética,
+# palavras ordenadas (prefixo por bisect) e, para cada trigrama, as gestoras que o contêm.
+# Todas as grafias do grupo alimentam o índice da canônica.
+def build_search_index(canonicas, contagens):
+    nomes = sorted(canonicas)
+    palavras, trigramas = set(), {}
+    for posicao, nome in enumerate(nomes):
+        for grafia in canonicas[nome]:
+            dobrado = fold_name(grafia)
+            palavras.update((palavra, posicao) for palavra in dobrado.split())
+            for trigrama in _trigrams(dobrado):
+                trigramas.setdefault(trigrama, set()).add(posicao)
+
+    palavras = sorted(palavras)
+    linhas = np.array([sum(contagens[grafia] for grafia in canonicas[nome]) for nome in nomes], dtype=np.float64)
+    return {
+        "nomes": nomes,
+        # Linhas (fundos + ofertas) em [0, 1): desempate entre nomes igualmente parecidos
+        "peso": linhas / (linhas.max(initial=0) + 1),
+        "palavras": [palavra for palavra, _ in palavras],
+        "posicoes_palavras": np.array([posicao for _, posicao in palavras], dtype=np.intp),
+        "trigramas": {trigrama: np.fromiter(posicoes, dtype=np.intp) for trigrama, posicoes in trigramas.items()},
+    }
+
+
+# Gestoras com alguma palavra começando por `prefixo`
+def _prefix_matches(indice, prefixo):
+    inicio = bisect.bisect_left(indice["palavras"], prefixo)
+    fim = bisect.bisect_left(indice["palavras"], prefixo + "\uffff", lo=inicio)
+    return indice["posicoes_palavras"][inicio:fim]
+
+
+# Gestoras canônicas que casam com a consulta, das mais relevantes para as menos:
+# primeiro as que têm todas as palavras da consulta como prefixo de alguma palavra do nome,
+# depois as parecidas por trigramas; empates pelo número de linhas (fundos + ofertas).
+def search(indice, consulta, limite=LIMITE_RESULTADOS):
+    dobrada = fold_name(consulta)
+    if not dobrada:
+        return []
+    quantidade = len(indice["nomes"])
+
+    prefixo = np.ones(quantidade, dtype=bool)
+    for palavra in dobrada.split():
+        casadas = np.zeros(quantidade, dtype=bool)
+        casadas[_prefix_matches(indice, palavra)] = True
+        prefixo &= casadas
+
+    trigramas = _trigrams(dobrada)
+    postagens = [indice["trigramas"][trigrama] for trigrama in trigramas if trigrama in indice["trigramas"]]
+    comuns = np.bincount(np.concatenate(postagens), minlength=quantidade) if postagens else np.zeros(quantidade)
+    semelhanca = comuns / len(trigramas)
+
+    # Nota única: prefixo > semelhança > linhas (o peso das linhas é menor que um degrau de semelhança)
+    nota = prefixo * 4.0 + semelhanca * 2.0 + indice["peso"] / (len(trigramas) + 1)
+    candidatas = np.flatnonzero(prefixo | (semelhanca >= SEMELHANCA_MINIMA))
+    if len(candidatas) > limite:
+        candidatas = candidatas[np.argpartition(-nota[candidatas], limite - 1)[:limite]]
+    candidatas = candidatas[np.argsort(-nota[candidatas], kind="stable")]
+    return [indice["nomes"][posicao] for posicao in candidatas]
@@ -0,0 +1,388 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+import schemas
+import streaming
+import telemetry
+from normalize import normalize_cnpjs, normalize_names
+
+logger = logging.getLogger("dashboard.storage")
+
+# Caminho base para os arquivos
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Pasta onde ficam os snapshots colunares (Arrow IPC) e o manifesto
+SNAPSHOT_DIR = os.path.join(BASE_DIR, "snapshots")
+MANIFEST_FILE = "manifest.json"
+
+# Linhas dos CSVs que não puderam ser lidas, por snapshot (ver streaming.read_frames)
+QUARENTENA_DIR = os.path.join(SNAPSHOT_DIR, "quarentena")
+
+# Versão do formato dos snapshots; mudanças na limpeza invalidam os antigos
+VERSAO_SNAPSHOT = 3
+
+# Pasta e arquivos do informe mensal de FIDC: inf_mensal_fidc_YYYYMM/inf_mensal_fidc_tab_<tabela>_YYYYMM.csv
+PADRAO_PASTA_FIDC = re.compile(r"^inf_mensal_fidc_(\d{6})$")
+PADRAO_SNAPSHOT_FIDC = re.compile(r"^fidc_(\d{6})_tab_([IVX0-9_]+)$")
+
+# Fontes CSV da CVM e as colunas que precisam ser limpas antes do snapshot.
+# "tabela" é a chave do layout em schemas.py; colunas em "categorias" são
+# gravadas como categóricas (filtros comparam códigos).
+FONTES = {
+    "registro_fundo": {
+        "arquivo": "registro_fundo.csv",
+        "tabela": "registro_fundo",
+        "cnpj": ["CNPJ_Fundo"],
+        "nomes": ["Gestor", "Administrador"],
+        "categorias": ["Gestor", "Administrador"],
+    },
+    "oferta_resolucao_160": {
+        "arquivo": "oferta_resolucao_160.csv",
+        "tabela": "oferta_resolucao_160",
+        "cnpj": ["CNPJ_Emissor"],
+        "nomes": ["Gestor", "Nome_Lider", "Nome_Emissor"],
+        "categorias": ["Gestor", "Nome_Lider"],
+    },
+}
+
+
+# Nome do snapshot de uma tabela do informe mensal, ex.: fidc_202502_tab_X_2.
+# Sem competência, usa a mais recente (current_month)
+def fidc_table_name(tabela, competencia=None):
+    return f"fidc_{competencia or current_month()}_tab_{tabela}"
+
+
+def fidc_source(tabela, competencia):
+    return {
+        "arquivo": f"inf_mensal_fidc_{competencia}/inf_mensal_fidc_tab_{tabela}_{competencia}.csv",
+        "tabela": tabela,
+        "cnpj": ["CNPJ_FUNDO_CLASSE"],
+        "nomes": [],
+        "categorias": [],
+    }
+
+
+# Fonte de um snapshot: registros fixos em FONTES ou qualquer tabela de qualquer competência
+def source(nome):
+    if nome in FONTES:
+        return FONTES[nome]
+    encontrado = PADRAO_SNAPSHOT_FIDC.match(nome)
+    if encontrado is None:
+        raise KeyError(f"Fonte desconhecida: {nome}")
+    competencia, tabela = encontrado.groups()
+    return fidc_source(tabela, competencia)
+
+
+# Competências disponíveis, tanto em pastas de CSV quanto só em snapshots
+def available_months():
+    competencias = set()
+    for pasta in os.listdir(BASE_DIR):
+        encontrado = PADRAO_PASTA_FIDC.match(pasta)
+        if encontrado and os.path.isdir(os.path.join(BASE_DIR, pasta)):
+            competencias.add(encontrado.group(1))
+    for nome in read_manifest():
+        encontrado = PADRAO_SNAPSHOT_FIDC.match(nome)
+        if encontrado and os.path.exists(snapshot_path(nome)):
+            competencias.add(encontrado.group(1))
+    return sorted(competencias)
+
+
+# Competência mais recente, a usada pelo dashboard, pela API e pela exportação. Recalculada só
+# quando a pasta base (pasta de um mês novo) ou o manifesto (snapshot novo) mudam
+_competencia_atual = {"chave": None, "competencia": None}
+
+
+def current_month():
+    chave = (os.stat(BASE_DIR).st_mtime_ns, manifest_version())
+    if _competencia_atual["chave"] != chave:
+        competencias = available_months()
+        if not competencias:
+            raise FileNotFoundError(f"Nenhuma pasta inf_mensal_fidc_YYYYMM nem snapshot do informe em {BASE_DIR}")
+        _competencia_atual.update(chave=chave, competencia=competencias[-1])
+    return _competencia_atual["competencia"]
+
+
+# Leitura padrão dos CSVs da CVM
+def read_cvm_csv(caminho, **kwargs):
+    return pd.read_csv(caminho,
+                       encoding='latin1',
+                       sep=';',
+                       on_bad_lines='skip',
+                       low_memory=False,
+                       **kwargs)
+
+
+def _report_quarantine(nome, relatorio, caminho=None):
+    if relatorio["quarentena"]:
+        logger.warning("%s: %d linhas com número de campos inválido ficaram fora da tabela%s",
+                       nome, relatorio["quarentena"], f" (ver {caminho})" if caminho else "")
+
+
+# Lê o CSV inteiro de uma fonte com os dtypes do schema, só com as colunas pedidas (se houver).
+# Usado quando não há snapshot a gravar; as linhas inválidas são só contadas e avisadas.
+def read_source(nome, columns=None):
+    fonte = source(nome)
+    caminho_csv = os.path.join(BASE_DIR, fonte["arquivo"])
+    relatorio = {}
+    df = pd.concat(list(streaming.read_frames(caminho_csv, fonte["tabela"], columns, relatorio=relatorio)),
+                   ignore_index=True)
+    _report_quarantine(nome, relatorio)
+    # Blocos com categorias diferentes viram texto no concat: volta para categórica (ordem alfabética)
+    for coluna in df.columns:
+        if schemas.column_type(fonte["tabela"], coluna) == "category" and df[coluna].dtype != "category":
+            df[coluna] = df[coluna].astype("category")
+    with telemetry.span("storage.limpeza"):
+        return clean_table(df, fonte)
+
+
+# Aplica a limpeza de CNPJs e nomes definida para a fonte
+def clean_table(df, fonte):
+    for coluna in fonte["cnpj"]:
+        if coluna not in df:
+            continue
+        df[coluna] = normalize_cnpjs(df[coluna].astype(str))
+    for coluna in fonte["nomes"]:
+        if coluna not in df:
+            continue
+        df[coluna] = normalize_names(df[coluna], categorical=coluna in fonte["categorias"])
+    return df
+
+
+# Assinatura rápida do arquivo de origem (tamanho + data de modificação)
+def file_signature(caminho):
+    info = os.stat(caminho)
+    return {"tamanho": info.st_size, "mtime_ns": info.st_mtime_ns}
+
+
+# Hash do conteúdo, usado quando só a data de modificação mudou
+def file_hash(caminho):
+    sha1 = hashlib.sha1()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(1 << 20), b''):
+            sha1.update(bloco)
+    return sha1.hexdigest()
+
+
+def snapshot_path(nome):
+    return os.path.join(SNAPSHOT_DIR, f"{nome}.arrow")
+
+
+def quarantine_path(nome):
+    return os.path.join(QUARENTENA_DIR, f"{nome}.csv")
+
+
+# Manifesto em memória, relido só quando o arquivo muda (tamanho/data de modificação)
+_manifest_cache = {"chave": None, "manifest": {}}
+_manifest_lock = threading.Lock()
+
+
+def read_manifest():
+    caminho = os.path.join(SNAPSHOT_DIR, MANIFEST_FILE)
+    try:
+        info = os.stat(caminho)
+        chave = (info.st_mtime_ns, info.st_size)
+        if _manifest_cache["chave"] != chave:
+            with open(caminho, encoding='utf-8') as f:
+                _manifest_cache["manifest"] = json.load(f)
+            _manifest_cache["chave"] = chave
+    except (OSError, ValueError):
+        return {}
+    # Cópia rasa: quem altera o manifesto troca entradas inteiras antes de gravar
+    return dict(_manifest_cache["manifest"])
+
+
+# Atualiza uma entrada do manifesto (sessões do Streamlit rodam em threads)
+def update_manifest(nome, entrada):
+    update_manifest_entries({nome: entrada})
+
+
+# Atualiza várias entradas em uma única gravação (ingest paralelo: os processos gravam os
+# snapshots e só o processo principal escreve o manifesto)
+def update_manifest_entries(entradas):
+    with _manifest_lock:
+        manifest = read_manifest()
+        manifest.update(entradas)
+        write_manifest(manifest)
+
+
+# Versão de um snapshot (hash do conteúdo de origem); None se ainda não foi gerado
+def snapshot_version(nome):
+    entrada = read_manifest().get(nome)
+    if not entrada or entrada.get("versao") != VERSAO_SNAPSHOT:
+        return None
+    return entrada.get("sha1")
+
+
+# Versão conjunta de um grupo de snapshots, usada como chave dos caches do dashboard
+def data_version(nomes):
+    return tuple(snapshot_version(nome) for nome in nomes)
+
+
+# Muda a cada gravação do manifesto (qualquer snapshot novo ou atualizado)
+def manifest_version():
+    try:
+        return os.stat(os.path.join(SNAPSHOT_DIR, MANIFEST_FILE)).st_mtime_ns
+    except OSError:
+        return None
+
+
+# Grava o manifesto de forma atômica para não corromper leituras concorrentes
+def write_manifest(manifest):
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    destino = os.path.join(SNAPSHOT_DIR, MANIFEST_FILE)
+    temporario = f"{destino}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(temporario, destino)
+
+
+# Verifica se o snapshot ainda corresponde ao CSV de origem
+def snapshot_is_fresh(nome, manifest=None):
+    if manifest is None:
+        manifest = read_manifest()
+    entrada = manifest.get(nome)
+    if not entrada or not os.path.exists(snapshot_path(nome)):
+        return False
+    if entrada.get("versao") != VERSAO_SNAPSHOT:
+        return False
+
+    caminho_csv = os.path.join(BASE_DIR, source(nome)["arquivo"])
+    if not os.path.exists(caminho_csv):
+        # Sem o CSV, o snapshot é a única cópia disponível
+        return True
+
+    assinatura = file_signature(caminho_csv)
+    if assinatura == entrada["assinatura"]:
+        return True
+
+    # Arquivo tocado mas com o mesmo conteúdo: só atualiza a assinatura
+    if file_hash(caminho_csv) == entrada["sha1"]:
+        try:
+            update_manifest(nome, dict(entrada, assinatura=assinatura))
+        except OSError:
+            pass
+        return True
+    return False
+
+
+def snapshots_writable():
+    if os.path.isdir(SNAPSHOT_DIR):
+        return os.access(SNAPSHOT_DIR, os.W_OK)
+    return os.access(BASE_DIR, os.W_OK)
+
+
+# Grava a tabela Arrow em arquivo temporário e troca de forma atômica.
+# Sem compressão para que o arquivo possa ser mapeado em memória.
+def write_snapshot_file(nome, tabela):
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    temporario = f"{snapshot_path(nome)}.{os.getpid()}.{threading.get_ident()}.tmp"
+    feather.write_feather(tabela, temporario, compression='uncompressed')
+    os.replace(temporario, snapshot_path(nome))
+
+
+def _clean_block(df, fonte):
+    with telemetry.span("storage.limpeza"):
+        return clean_table(df, fonte)
+
+
+# Lê o CSV em blocos, limpa cada bloco e grava o arquivo do snapshot sem tocar no manifesto:
+# o pico de memória acompanha o tamanho do bloco (streaming.LINHAS_POR_BLOCO), não o do arquivo.
+# Devolve a entrada do manifesto; None quando o snapshot não pôde ser gravado.
+def write_snapshot(nome):
+    fonte = source(nome)
+    caminho_csv = os.path.join(BASE_DIR, fonte["arquivo"])
+    # Categóricas do schema ficam em ordem alfabética; as de nomes limpos, na ordem de aparição
+    ordenadas = {coluna for coluna in streaming.read_header(caminho_csv)
+                 if schemas.column_type(fonte["tabela"], coluna) == "category" and coluna not in fonte["nomes"]}
+    relatorio = {}
+    temporario = f"{snapshot_path(nome)}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+    try:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        blocos = streaming.read_frames(caminho_csv, fonte["tabela"], caminho_quarentena=quarantine_path(nome),
+                                       relatorio=relatorio)
+        linhas = streaming.write_frames((_clean_block(df, fonte) for df in blocos), temporario, ordenadas)
+        os.replace(temporario, snapshot_path(nome))
+    except (OSError, pa.ArrowException):
+        # Sem snapshot (disco somente leitura, tipos mistos...): segue com o CSV
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        return None
+
+    _report_quarantine(nome, relatorio, quarantine_path(nome))
+    return {
+        "arquivo": fonte["arquivo"],
+        "versao": VERSAO_SNAPSHOT,
+        "assinatura": file_signature(caminho_csv),
+        "sha1": file_hash(caminho_csv),
+        "linhas": linhas,
+        "quarentena": relatorio["quarentena"],
+    }
+
+
+# Grava o snapshot colunar do CSV e o registra no manifesto; False se não foi possível gravar
+def build_snapshot(nome):
+    entrada = write_snapshot(nome)
+    if entrada is None:
+        return False
+    try:
+        update_manifest(nome, entrada)
+    except OSError:
+        pass
+    return True
+
+
+# Converte sem consolidar colunas: números sem nulos viram arrays NumPy somente leitura
+# apontando para o arquivo mapeado (zero cópia, páginas compartilhadas entre processos)
+def arrow_to_pandas(tabela):
+    return tabela.to_pandas(split_blocks=True)
+
+
+# Carrega uma tabela do snapshot, recorrendo ao CSV só se ele faltar ou estiver velho
+def load_table(nome, columns=None):
+    if snapshot_is_fresh(nome):
+        with telemetry.span("storage.leitura_snapshot"):
+            tabela = feather.read_table(snapshot_path(nome), columns=columns, memory_map=True)
+            return arrow_to_pandas(tabela)
+
+    if not snapshots_writable() or not build_snapshot(nome):
+        # Sem onde gravar o snapshot: lê do CSV só as colunas pedidas
+        return read_source(nome, columns)
+
+    with telemetry.span("storage.leitura_snapshot"):
+        return arrow_to_pandas(feather.read_table(snapshot_path(nome), columns=columns, memory_map=True))
+
+
+# Grava um resultado derivado (agregados, rankings...) junto com as versões das fontes usadas
+def save_derived(nome, df, dependencias):
+    try:
+        write_snapshot_file(nome, pa.Table.from_pandas(df, preserve_index=True))
+
+        update_manifest(nome, {
+            "versao": VERSAO_SNAPSHOT,
+            "dependencias": {dep: snapshot_version(dep) for dep in dependencias},
+        })
+    except (OSError, pa.ArrowException):
+        pass
+
+
+# Lê um resultado derivado se ele foi gerado a partir das versões atuais das fontes
+def load_derived(nome, dependencias):
+    entrada = read_manifest().get(nome)
+    if not entrada or entrada.get("versao") != VERSAO_SNAPSHOT:
+        return None
+    atuais = {dep: snapshot_version(dep) for dep in dependencias}
+    if None in atuais.values() or entrada.get("dependencias") != atuais:
+        return None
+    try:
+        return arrow_to_pandas(feather.read_table(snapshot_path(nome), memory_map=True))
+    except (OSError, pa.ArrowException):
+        return None
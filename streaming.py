@@ -0,0 +1,217 @@
+import collections
+import csv
+import io
+import os
+import shutil
+import tempfile
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.feather as feather
+
+import schemas
+import telemetry
+
+# Leitura dos CSVs da CVM em blocos de linhas: cada bloco é convertido, limpo e gravado antes
+# do próximo, então o pico de memória depende do tamanho do bloco e não do arquivo.
+# Linhas com número de campos diferente do cabeçalho não entram na tabela: vão para um
+# arquivo de quarentena com o número da linha de origem, em vez de sumirem sem aviso.
+LINHAS_POR_BLOCO = int(os.environ.get("STORAGE_LINHAS_POR_BLOCO", "50000"))
+
+CODIFICACAO = "latin1"
+SEPARADOR = b";"
+ASPAS = b'"'
+
+# Linhas físicas que um registro com campo entre aspas pode ocupar (quebras de linha no texto)
+MAX_LINHAS_REGISTRO = 20
+
+
+def read_header(caminho):
+    with open(caminho, 'rb') as arquivo:
+        return _split_line(arquivo.readline())
+
+
+def _split_line(linha):
+    return next(csv.reader([linha.decode(CODIFICACAO).rstrip("\r\n")], delimiter=";"))
+
+
+# Campos do registro; None quando um campo entre aspas continua na próxima linha e -1 quando
+# as aspas estão malformadas. Aspas no meio de um campo são texto, como no pandas.
+def _field_count(registro):
+    if ASPAS not in registro:
+        return registro.count(SEPARADOR) + 1
+    try:
+        return len(next(csv.reader([registro.decode(CODIFICACAO)], delimiter=";", strict=True)))
+    except csv.Error as erro:
+        return None if "unexpected end of data" in str(erro) else -1
+
+
+# Blocos de até `linhas_por_bloco` registros válidos (bytes, sem o cabeçalho). Os inválidos vão
+# para quarentenar(número da linha, conteúdo). Um registro pode ocupar várias linhas (texto
+# entre aspas); se a aspa não fecha em MAX_LINHAS_REGISTRO linhas, só a primeira vai para a
+# quarentena e as seguintes são relidas. Linhas em branco são ignoradas, como no pandas.
+def _line_blocks(arquivo, campos, linhas_por_bloco, quarentenar):
+    linhas = enumerate(arquivo, start=2)
+    relidas = collections.deque()
+    bloco, pendente = [], []
+    while True:
+        proxima = relidas.popleft() if relidas else next(linhas, None)
+        if proxima is None and not pendente:
+            break
+        if proxima is None:
+            # Fim do arquivo com uma aspa aberta
+            contagem = None
+        else:
+            numero, linha = proxima
+            if not linha.endswith(b"\n"):
+                linha += b"\n"
+            if not pendente and not linha.strip():
+                continue
+            pendente.append((numero, linha))
+            contagem = _field_count(b"".join(parte for _, parte in pendente))
+            if contagem is None and len(pendente) < MAX_LINHAS_REGISTRO:
+                continue
+
+        if contagem == campos:
+            bloco.append(b"".join(parte for _, parte in pendente))
+        else:
+            quarentenar(*pendente[0])
+            relidas.extendleft(reversed(pendente[1:]))
+        pendente = []
+        if len(bloco) >= linhas_por_bloco:
+            yield b"".join(bloco)
+            bloco = []
+    if bloco:
+        yield b"".join(bloco)
+
+
+def _read_block(bloco, opcoes, **kwargs):
+    return pd.read_csv(io.BytesIO(bloco), encoding=CODIFICACAO, sep=";", low_memory=False, **opcoes, **kwargs)
+
+
+# Converte um bloco com os dtypes do schema (números fora do padrão: texto + coerção)
+def _typed_block(bloco, tabela, cabecalho, columns, **kwargs):
+    try:
+        df = _read_block(bloco, schemas.read_csv_options(tabela, cabecalho, columns), **kwargs)
+    except (ValueError, TypeError):
+        df = _read_block(bloco, schemas.read_csv_options(tabela, cabecalho, columns, somente_texto=True), **kwargs)
+    return schemas.apply_types(tabela, df)
+
+
+# DataFrames tipados de cada bloco do CSV, só com as colunas pedidas (se houver).
+# Com caminho_quarentena, as linhas inválidas são gravadas lá (cabeçalho LINHA_ORIGEM + colunas);
+# `relatorio` (dict) recebe as linhas lidas e as postas em quarentena.
+def read_frames(caminho, tabela, columns=None, linhas_por_bloco=None, caminho_quarentena=None, relatorio=None):
+    relatorio = {} if relatorio is None else relatorio
+    relatorio.update(linhas=0, quarentena=0)
+    if caminho_quarentena is not None and os.path.exists(caminho_quarentena):
+        os.remove(caminho_quarentena)
+
+    saida = []
+
+    def quarentenar(numero, linha):
+        relatorio["quarentena"] += 1
+        if caminho_quarentena is None:
+            return
+        if not saida:
+            os.makedirs(os.path.dirname(caminho_quarentena), exist_ok=True)
+            saida.append(open(caminho_quarentena, 'wb'))
+            saida[0].write(b"LINHA_ORIGEM;" + cabecalho_bruto)
+        saida[0].write(b"%d;" % numero + linha)
+
+    try:
+        with open(caminho, 'rb') as arquivo:
+            cabecalho_bruto = arquivo.readline()
+            cabecalho = _split_line(cabecalho_bruto)
+            for bloco in _line_blocks(arquivo, len(cabecalho), linhas_por_bloco or LINHAS_POR_BLOCO, quarentenar):
+                with telemetry.span("storage.leitura_csv"):
+                    df = _typed_block(bloco, tabela, cabecalho, columns, header=None, names=cabecalho)
+                relatorio["linhas"] += len(df)
+                yield df
+            if relatorio["linhas"] == 0:
+                # Nenhuma linha válida: só as colunas e os tipos, a partir do cabeçalho
+                yield _typed_block(cabecalho_bruto, tabela, cabecalho, columns)
+    finally:
+        if saida:
+            saida[0].close()
+
+
+# Tipo final de uma coluna que variou entre blocos (tipos inferidos pelo pandas):
+# números viram float64, o resto texto
+def _common_type(tipos):
+    tipos = {tipo for tipo in tipos if not pa.types.is_null(tipo)}
+    if len(tipos) <= 1:
+        return tipos.pop() if tipos else pa.null()
+    if all(pa.types.is_integer(tipo) or pa.types.is_floating(tipo) for tipo in tipos):
+        return pa.float64()
+    return pa.string()
+
+
+# Grava os blocos em um único arquivo Arrow IPC (o formato dos snapshots) sem juntar a tabela
+# em memória. O formato de arquivo exige um dicionário por coluna categórica para o arquivo
+# inteiro, então são duas passadas: (1) cada bloco vai para um arquivo temporário e os valores
+# das categorias são acumulados; (2) os blocos são relidos um a um, recodificados no dicionário
+# comum e anexados ao destino. Categorias de `ordenadas` ficam em ordem alfabética (como no
+# read_csv com dtype category); as demais na ordem de aparição (como no normalize_names).
+# Devolve o número de linhas gravadas.
+def write_frames(frames, destino, ordenadas=()):
+    pasta = tempfile.mkdtemp(prefix=".blocos.", dir=os.path.dirname(destino))
+    try:
+        blocos, tipos, categorias, esquema = [], {}, {}, None
+        for df in frames:
+            tabela = pa.Table.from_pandas(df, preserve_index=False)
+            if esquema is None:
+                esquema = tabela.schema
+            for campo in tabela.schema:
+                if pa.types.is_dictionary(campo.type):
+                    valores = categorias.setdefault(campo.name, {})
+                    for coluna in tabela.column(campo.name).chunks:
+                        valores.update(dict.fromkeys(coluna.dictionary.cast(pa.string()).to_pylist()))
+                else:
+                    tipos.setdefault(campo.name, set()).add(campo.type)
+            caminho = os.path.join(pasta, f"{len(blocos)}.arrow")
+            with telemetry.span("storage.gravacao_snapshot"):
+                feather.write_feather(tabela, caminho, compression='uncompressed')
+            blocos.append(caminho)
+
+        dicionarios = {
+            nome: pa.array(sorted(valores) if nome in ordenadas else list(valores), type=pa.string())
+            for nome, valores in categorias.items()
+        }
+        campos = [
+            pa.field(campo.name, pa.dictionary(pa.int32(), pa.string()))
+            if campo.name in dicionarios else pa.field(campo.name, _common_type(tipos[campo.name]))
+            for campo in esquema
+        ]
+        esquema = pa.schema(campos, metadata=esquema.metadata)
+
+        linhas = 0
+        with pa.OSFile(destino, 'wb') as saida, pa.ipc.new_file(saida, esquema) as escritor:
+            for caminho in blocos:
+                tabela = feather.read_table(caminho, memory_map=True)
+                colunas = []
+                for campo in esquema:
+                    coluna = tabela.column(campo.name)
+                    if campo.name in dicionarios:
+                        coluna = _recode(coluna, dicionarios[campo.name])
+                    colunas.append(coluna.cast(campo.type))
+                with telemetry.span("storage.gravacao_snapshot"):
+                    escritor.write_table(pa.Table.from_arrays(colunas, schema=esquema))
+                linhas += len(tabela)
+                del tabela, colunas
+                os.remove(caminho)
+        return linhas
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+
+# Troca o dicionário de uma coluna categórica pelo dicionário comum a todos os blocos
+def _recode(coluna, dicionario):
+    partes = []
+    for parte in coluna.chunks:
+        if not pa.types.is_dictionary(parte.type):
+            parte = parte.cast(pa.string()).dictionary_encode()
+        posicoes = pc.index_in(parte.dictionary.cast(pa.string()), value_set=dicionario).cast(pa.int32())
+        partes.append(pa.DictionaryArray.from_arrays(posicoes.take(parte.indices), dicionario))
+    return pa.chunked_array(partes, type=pa.dictionary(pa.int32(), pa.string()))
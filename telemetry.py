@@ -0,0 +1,192 @@
+import contextlib
+import functools
+import logging
+import os
+import threading
+import time
+
+# Instrumentação leve do dashboard: tempo de cada etapa (spans), acertos/falhas de cache
+# e uma linha de log por rerun. Desligada por padrão; com DASHBOARD_TELEMETRIA=1 liga.
+# Com DASHBOARD_METRICAS_ARQUIVO definido, os totais vão também para esse arquivo no
+# formato texto do Prometheus (coletor "textfile" do node_exporter).
+ATIVO = os.environ.get("DASHBOARD_TELEMETRIA", "") == "1"
+ARQUIVO_METRICAS = os.environ.get("DASHBOARD_METRICAS_ARQUIVO")
+
+logger = logging.getLogger("dashboard.telemetria")
+
+# Totais do processo: etapa -> [segundos, execuções]; função em cache -> [chamadas, falhas]
+_etapas = {}
+_caches = {}
+_reruns = [0]
+_lock = threading.Lock()
+
+# Etapas do rerun atual (cada sessão do Streamlit roda o script em sua própria thread)
+_rerun = threading.local()
+
+_SEM_MEDICAO = contextlib.nullcontext()
+
+
+# A linha por rerun sai em INFO; sem configuração de logging do app, vai para o stderr
+def _configure_logger():
+    if ATIVO and not logger.handlers:
+        manipulador = logging.StreamHandler()
+        manipulador.setFormatter(logging.Formatter("%(asctime)s %(name)s %(message)s"))
+        logger.addHandler(manipulador)
+        logger.setLevel(logging.INFO)
+
+
+def enable(ativo=True):
+    global ATIVO
+    ATIVO = ativo
+    _configure_logger()
+
+
+_configure_logger()
+
+
+def reset():
+    with _lock:
+        _etapas.clear()
+        _caches.clear()
+        _reruns[0] = 0
+
+
+class _Span:
+    __slots__ = ("nome", "inicio")
+
+    def __init__(self, nome):
+        self.nome = nome
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *erro):
+        _record(self.nome, time.perf_counter() - self.inicio)
+        return False
+
+
+# Mede o bloco `with span("nome"):`; desligado, devolve um contexto vazio compartilhado
+def span(nome):
+    if not ATIVO:
+        return _SEM_MEDICAO
+    return _Span(nome)
+
+
+def _record(nome, segundos):
+    etapas = getattr(_rerun, "etapas", None)
+    if etapas is not None:
+        etapas[nome] = etapas.get(nome, 0.0) + segundos
+    with _lock:
+        total = _etapas.setdefault(nome, [0.0, 0])
+        total[0] += segundos
+        total[1] += 1
+
+
+def _count_cache(nome, campo):
+    with _lock:
+        contagem = _caches.setdefault(nome, [0, 0])
+        contagem[campo] += 1
+    caches = getattr(_rerun, "caches", None)
+    if caches is not None:
+        caches.setdefault(nome, [0, 0])[campo] += 1
+
+
+# Envolve um decorador de cache do Streamlit contando chamadas e falhas (execuções do corpo):
+#   @telemetry.cached(st.cache_data(max_entries=2))
+# Desligado, aplica o decorador original sem nenhuma camada extra.
+def cached(decorador):
+    def aplicar(funcao):
+        if not ATIVO:
+            return decorador(funcao)
+        nome = funcao.__name__
+
+        @functools.wraps(funcao)
+        def executar(*args, **kwargs):
+            _count_cache(nome, 1)
+            return funcao(*args, **kwargs)
+
+        em_cache = decorador(executar)
+
+        @functools.wraps(funcao)
+        def chamar(*args, **kwargs):
+            _count_cache(nome, 0)
+            return em_cache(*args, **kwargs)
+
+        chamar.clear = em_cache.clear
+        return chamar
+    return aplicar
+
+
+def begin_run():
+    if not ATIVO:
+        return
+    _rerun.inicio = time.perf_counter()
+    _rerun.etapas = {}
+    _rerun.caches = {}
+
+
+# Etapas e caches do rerun atual: ({etapa: segundos}, {função: [chamadas, falhas]})
+def current_run():
+    return dict(getattr(_rerun, "etapas", {})), dict(getattr(_rerun, "caches", {}))
+
+
+# Fecha o rerun: registra o tempo total, escreve a linha de log e atualiza o arquivo de métricas
+def end_run():
+    if not ATIVO or getattr(_rerun, "etapas", None) is None:
+        return
+    _record("rerun", time.perf_counter() - _rerun.inicio)
+    with _lock:
+        _reruns[0] += 1
+    logger.info(_log_line(_rerun.etapas, _rerun.caches))
+    if ARQUIVO_METRICAS:
+        _write_metrics_file(ARQUIVO_METRICAS)
+    _rerun.etapas = None
+
+
+def _log_line(etapas, caches):
+    partes = [f"{nome}={segundos * 1000:.1f}ms" for nome, segundos in etapas.items()]
+    partes += [f"cache.{nome}={chamadas - falhas}/{chamadas}" for nome, (chamadas, falhas) in caches.items()]
+    return " ".join(partes)
+
+
+# Totais do processo no formato texto do Prometheus
+def prometheus_text():
+    with _lock:
+        etapas = {nome: list(total) for nome, total in _etapas.items()}
+        caches = {nome: list(contagem) for nome, contagem in _caches.items()}
+        reruns = _reruns[0]
+
+    linhas = [
+        "# HELP dashboard_reruns_total Execuções do script do dashboard.",
+        "# TYPE dashboard_reruns_total counter",
+        f"dashboard_reruns_total {reruns}",
+        "# HELP dashboard_etapa_segundos Tempo gasto em cada etapa.",
+        "# TYPE dashboard_etapa_segundos summary",
+    ]
+    for nome, (segundos, execucoes) in sorted(etapas.items()):
+        linhas.append(f'dashboard_etapa_segundos_sum{{etapa="{nome}"}} {segundos:.6f}')
+        linhas.append(f'dashboard_etapa_segundos_count{{etapa="{nome}"}} {execucoes}')
+    linhas += [
+        "# HELP dashboard_cache_chamadas_total Chamadas a funções em cache.",
+        "# TYPE dashboard_cache_chamadas_total counter",
+    ]
+    linhas += [f'dashboard_cache_chamadas_total{{funcao="{nome}"}} {chamadas}'
+               for nome, (chamadas, _) in sorted(caches.items())]
+    linhas += [
+        "# HELP dashboard_cache_falhas_total Chamadas que precisaram executar a função.",
+        "# TYPE dashboard_cache_falhas_total counter",
+    ]
+    linhas += [f'dashboard_cache_falhas_total{{funcao="{nome}"}} {falhas}'
+               for nome, (_, falhas) in sorted(caches.items())]
+    return "\n".join(linhas) + "\n"
+
+
+def _write_metrics_file(caminho):
+    temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(temporario, 'w', encoding='utf-8') as f:
+            f.write(prometheus_text())
+        os.replace(temporario, caminho)
+    except OSError:
+        logger.warning("Não foi possível gravar as métricas em %s", caminho)
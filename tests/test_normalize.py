@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+from normalize import clean_cnpj, clean_name, normalize_cnpjs, normalize_names
+
+CNPJS = [
+    "12.345.678/0001-90", "12345678000190", "345.678/0001-90", "", "  ", "abc",
+    "123.456.789/0001-234", "000.000.000/0000-00", "12.345.678/0001-90 ", "１２3",
+]
+NOMES = [
+    "Bamboo Gestão de Recursos Ltda.", "  itaú unibanco  asset 2 ", "XP Gestão S/A",
+    "Vinci Partners\tInvestimentos", "Kinea - Investimentos", "BTG PACTUAL ÿ ß", "", "123", "ção\nÇÃO",
+]
+
+
+# Coluna com valores repetidos e nulos, como as do cadastro
+def _column(valores, linhas=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    serie = pd.Series(np.array(valores, dtype=object)[rng.integers(0, len(valores), size=linhas)], dtype=object)
+    serie[rng.random(linhas) < 0.05] = np.nan
+    return serie
+
+
+# CNPJs passam por astype(str) antes da limpeza, como em storage.clean_table
+def test_normalize_cnpjs_matches_clean_cnpj():
+    cnpjs = _column(CNPJS).astype(str)
+    esperado = cnpjs.apply(clean_cnpj)
+    assert esperado.equals(normalize_cnpjs(cnpjs))
+    assert esperado.equals(normalize_cnpjs(cnpjs, categorical=True).astype(object))
+
+
+def test_normalize_names_matches_clean_name():
+    nomes = _column(NOMES)
+    esperado = nomes.apply(clean_name)
+    assert esperado.equals(normalize_names(nomes))
+    assert esperado.equals(normalize_names(nomes, categorical=True).astype(object))
+
+
+def test_empty_columns():
+    vazia = pd.Series([], dtype=object)
+    assert normalize_cnpjs(vazia).empty
+    assert normalize_names(vazia).empty
@@ -0,0 +1,25 @@
+import search
+
+
+def test_suffix_variants_share_a_key():
+    assert search.alias_key("BAMBOO GESTÃO DE RECURSOS LTDA") == search.alias_key("Bamboo Gestao de Recursos")
+    assert search.alias_key("GESTORA S.A.") == search.alias_key("GESTORA SA") == search.alias_key("GESTORA S A")
+    assert search.alias_key("GESTORA EIRELI") == search.alias_key("GESTORA")
+
+
+# Letras soltas e palavras no meio do nome não são forma societária
+def test_inner_letters_and_words_are_kept():
+    nomes = ["GESTORA A LTDA", "GESTORA E LTDA", "GESTORA S A", "BANCO A", "BANCO E"]
+    assert len({search.alias_key(nome) for nome in nomes}) == len(nomes)
+    assert search.alias_key("ITAU DE INVESTIMENTOS") != search.alias_key("ITAU INVESTIMENTOS")
+
+
+def test_alias_groups_keep_distinct_gestoras_apart():
+    contagens = {"GESTORA A LTDA": 3, "GESTORA E LTDA": 2, "GESTORA A": 1, "BANCO A": 5, "BANCO E": 4}
+    canonicas = search.alias_groups(contagens)
+    assert canonicas == {
+        "GESTORA A LTDA": ["GESTORA A LTDA", "GESTORA A"],
+        "GESTORA E LTDA": ["GESTORA E LTDA"],
+        "BANCO A": ["BANCO A"],
+        "BANCO E": ["BANCO E"],
+    }